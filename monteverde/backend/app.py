@@ -1,10 +1,15 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context, send_file
+import click
+import io
+import json
+import os
+import zipfile
 from flask_cors import CORS
 from datetime import datetime, timedelta
 import jwt
 from src.extensions import db
 from config import Config
-from sqlalchemy import extract, and_, func
+from sqlalchemy import func, case
 
 # ✅ IMPORTS DIRECTOS (más seguro)
 from src.models.mensaje import Mensaje
@@ -14,6 +19,33 @@ from src.models.curso import Curso
 from src.models.calificacion import Calificacion
 from src.models.asistencia import Asistencia
 from src.models.observacion import Observacion
+from src.services.calificaciones import upsert_calificaciones
+from src.services.importacion import leer_filas, importar_calificaciones
+from src.services.mensajes import (
+    query_mensajes_con_nombres, mensaje_con_nombres, difundir_a_curso,
+    mensajes_nuevos, notificar_mensajes, notificar_no_leidos
+)
+from src.services.eventos import eventos, formato_sse
+from src.services.conversaciones import (
+    registrar_mensajes, marcar_conversacion_leida, no_leidos_de,
+    query_bandeja, reconstruir_conversaciones
+)
+from src.services.lecturas import buffer_lecturas, marcar_leidos
+from src.services.boletines import cargar_boletines, generar_boletines
+from src.services.snapshots import TABLAS as TABLAS_SNAPSHOT, exportar_snapshots
+from src.services.migraciones import aplicar_migraciones, migraciones_pendientes, verificar_migraciones
+from src.services.exportacion import (
+    FORMATOS, generar_export, query_export_calificaciones, query_export_asistencia, query_export_observaciones
+)
+from src.cache import cache, coalescedor
+from src.instrumentacion import instrumentacion, detector, presupuesto_consultas, registro_lentas, perfilador
+from src.instrumentacion.planes import verificar_planes
+from src.utils.json_provider import init_json_provider
+from src.utils.serialization import RowEncoder, model_encoder
+from src.services.asistencia import (
+    estudiantes_existentes, normalizar_id, parsear_fecha, upsert_asistencias,
+    query_resumen_diario, reconstruir_asistencia_diaria
+)
 
 def create_app():
     app = Flask(__name__)
@@ -21,6 +53,16 @@ def create_app():
     
     # Inicializar extensiones
     db.init_app(app)
+    verificar_migraciones(app)
+    # Primero: sus hooks de request deben correr antes que los del cache
+    perfilador.init_app(app)
+    instrumentacion.init_app(app)
+    detector.init_app(app)
+    registro_lentas.init_app(app)
+    init_json_provider(app)
+    buffer_lecturas.init_app(app)
+    cache.init_app(app)
+    eventos.init_app(app)
     
     # CORS SIMPLE Y DIRECTO
     CORS(app, resources={
@@ -35,6 +77,35 @@ def create_app():
 
 app = create_app()
 
+# Serializadores por proyección (columnas, sin hidratar modelos) de los listados
+ENCODER_USUARIOS = model_encoder(Usuario)
+ENCODER_ESTUDIANTES_CURSO = model_encoder(
+    Estudiante,
+    ('curso_nombre', Curso.nombre),
+    ('nivel', Curso.nivel),
+    ('letra', Curso.letra)
+)
+ENCODER_CALIFICACIONES_BUSCAR = model_encoder(Calificacion, ('estudiante_nombre', Estudiante.nombre))
+ENCODER_ASISTENCIA_FECHA = RowEncoder([
+    ('id', Asistencia.id),
+    ('estudianteId', Asistencia.estudiante_id),
+    ('fecha', Asistencia.fecha),
+    ('estado', Asistencia.estado),
+    ('estudiante_nombre', Estudiante.nombre)
+])
+ENCODER_CALIFICACIONES_HIJO = RowEncoder([
+    ('id', Calificacion.id),
+    ('asignatura', Calificacion.asignatura),
+    ('periodo', Calificacion.periodo),
+    ('nota', Calificacion.nota),
+    ('fecha', Calificacion.fecha_registro)
+])
+ENCODER_ASISTENCIA_HIJO = RowEncoder([
+    ('id', Asistencia.id),
+    ('fecha', Asistencia.fecha),
+    ('estado', Asistencia.estado)
+])
+
 # =====================================================
 # RUTAS BÁSICAS / SALUD
 # =====================================================
@@ -118,6 +189,8 @@ def login():
 # CURSOS
 # =====================================================
 @app.route('/api/cursos', methods=['GET'])
+@cache.cacheado(['cursos', 'estudiantes'])
+@coalescedor.coalescido
 def get_cursos():
     """Obtener cursos con conteo de estudiantes."""
     try:
@@ -148,6 +221,9 @@ def get_cursos():
 # DASHBOARD DOCENTE
 # =====================================================
 @app.route('/api/docente/dashboard/<int:docente_id>', methods=['GET'])
+@presupuesto_consultas(3)
+@cache.depende_de(['cursos', 'estudiantes', 'mensajes', 'usuarios', 'contadores_mensajes'])
+@coalescedor.coalescido
 def get_docente_dashboard(docente_id):
     """Dashboard del docente."""
     try:
@@ -162,13 +238,17 @@ def get_docente_dashboard(docente_id):
         
         cursos_data = [{'id': c.id, 'nombre': c.nombre, 'nivel': c.nivel, 'letra': c.letra, 'total_estudiantes': c.total_estudiantes} for c in cursos]
         
-        # Mensajes no leídos para el docente
-        mensajes = Mensaje.query.filter_by(receptor_id=docente_id, leido=False).join(Usuario, Mensaje.emisor_id == Usuario.id).limit(3).all()
+        # Mensajes no leídos para el docente, con el nombre del emisor en el mismo JOIN
+        mensajes = db.session.query(Mensaje, Usuario.nombre.label('emisor_nombre')).join(
+            Usuario, Mensaje.emisor_id == Usuario.id
+        ).filter(
+            Mensaje.receptor_id == docente_id,
+            Mensaje.leido == False
+        ).limit(3).all()
         mensajes_data = []
-        for msg in mensajes:
-            msg_dict = msg.to_dict()
-            emisor = Usuario.query.get(msg.emisor_id)
-            msg_dict['emisor'] = emisor.nombre if emisor else 'Desconocido'
+        for fila in mensajes:
+            msg_dict = fila.Mensaje.to_dict()
+            msg_dict['emisor'] = fila.emisor_nombre or 'Desconocido'
             mensajes_data.append(msg_dict)
         
         # Tareas pendientes estáticas
@@ -184,7 +264,7 @@ def get_docente_dashboard(docente_id):
             'tareas_pendientes': tareas_pendientes,
             'estadisticas': {
                 'total_cursos': len(cursos_data),
-                'mensajes_no_leidos': len(mensajes_data),
+                'mensajes_no_leidos': no_leidos_de(docente_id),
                 'estudiantes_total': sum(c['total_estudiantes'] for c in cursos_data)
             }
         }
@@ -197,25 +277,19 @@ def get_docente_dashboard(docente_id):
 # MENSAJES (100% SQLAlchemy)
 # =====================================================
 @app.route('/api/mensajes/<int:usuario_id>', methods=['GET'])
+@cache.depende_de(['mensajes', 'usuarios'])
 def get_mensajes(usuario_id):
     """Obtener mensajes usando SQLAlchemy ORM."""
     try:
         print(f"🔍 Obteniendo mensajes para usuario: {usuario_id}")
         
-        mensajes = Mensaje.query.filter(
+        mensajes = query_mensajes_con_nombres().filter(
             (Mensaje.receptor_id == usuario_id) | (Mensaje.emisor_id == usuario_id)
         ).order_by(Mensaje.fecha.desc()).all()
         
         print(f"📧 Mensajes encontrados: {len(mensajes)}")
 
-        mensajes_data = []
-        for msg in mensajes:
-            msg_dict = msg.to_dict()
-            emisor = Usuario.query.get(msg.emisor_id)
-            receptor = Usuario.query.get(msg.receptor_id)
-            msg_dict['emisor_nombre'] = emisor.nombre if emisor else None
-            msg_dict['receptor_nombre'] = receptor.nombre if receptor else None
-            mensajes_data.append(msg_dict)
+        mensajes_data = [mensaje_con_nombres(fila) for fila in mensajes]
 
         return jsonify({'success': True, 'data': mensajes_data})
     except Exception as e:
@@ -223,22 +297,16 @@ def get_mensajes(usuario_id):
         return jsonify({'success': False, 'message': str(e)}), 500
 
 @app.route('/api/conversacion/<int:usuario1>/<int:usuario2>', methods=['GET'])
+@cache.depende_de(['mensajes', 'usuarios'])
 def get_conversacion_entre_usuarios(usuario1, usuario2):
     """Conversación entre dos usuarios."""
     try:
-        mensajes = Mensaje.query.filter(
+        mensajes = query_mensajes_con_nombres().filter(
             ((Mensaje.emisor_id == usuario1) & (Mensaje.receptor_id == usuario2)) |
             ((Mensaje.emisor_id == usuario2) & (Mensaje.receptor_id == usuario1))
         ).order_by(Mensaje.fecha.asc()).all()
         
-        mensajes_data = []
-        for msg in mensajes:
-            msg_dict = msg.to_dict()
-            emisor = Usuario.query.get(msg.emisor_id)
-            receptor = Usuario.query.get(msg.receptor_id)
-            msg_dict['emisor_nombre'] = emisor.nombre if emisor else None
-            msg_dict['receptor_nombre'] = receptor.nombre if receptor else None
-            mensajes_data.append(msg_dict)
+        mensajes_data = [mensaje_con_nombres(fila) for fila in mensajes]
             
         return jsonify({'success': True, 'data': mensajes_data})
     except Exception as e:
@@ -268,7 +336,10 @@ def enviar_mensaje_nuevo():
         )
         
         db.session.add(mensaje)
+        db.session.flush()
+        registrar_mensajes([mensaje])
         db.session.commit()
+        notificar_mensajes([mensaje])
         
         print(f"✅ Mensaje creado con ID: {mensaje.id}")
         return jsonify({'success': True, 'data': mensaje.to_dict()})
@@ -277,16 +348,50 @@ def enviar_mensaje_nuevo():
         print(f"❌ Error enviar mensaje: {e}")
         return jsonify({'success': False, 'message': str(e)}), 500
 
+@app.route('/api/mensajes/difundir', methods=['POST'])
+def difundir_mensaje_curso():
+    """Enviar un mensaje a todas las familias de un curso en una transacción."""
+    try:
+        data = request.get_json()
+        emisor_id = data.get('emisorId')
+        curso_id = data.get('cursoId')
+        asunto = data.get('asunto', 'Sin asunto')
+        cuerpo = data.get('cuerpo')
+        
+        if not all([emisor_id, curso_id, cuerpo]):
+            return jsonify({'success': False, 'message': 'Faltan campos requeridos'}), 400
+        if db.session.get(Curso, curso_id) is None:
+            return jsonify({'success': False, 'message': 'Curso no encontrado'}), 404
+        
+        mensajes = difundir_a_curso(emisor_id, curso_id, asunto, cuerpo)
+        db.session.commit()
+        notificar_mensajes(mensajes)
+        
+        print(f"✅ Mensaje difundido a {len(mensajes)} familias del curso {curso_id}")
+        return jsonify({'success': True, 'data': {
+            'enviados': len(mensajes),
+            'mensajes': [{'id': m.id, 'receptor_id': m.receptor_id} for m in mensajes]
+        }})
+    except Exception as e:
+        db.session.rollback()
+        print(f"❌ Error difundir mensaje: {e}")
+        return jsonify({'success': False, 'message': str(e)}), 500
+
 @app.route('/api/mensajes/marcar-leido/<int:mensaje_id>', methods=['PUT'])
 def marcar_mensaje_como_leido(mensaje_id):
     """Marcar mensaje como leído."""
     try:
-        mensaje = Mensaje.query.get(mensaje_id)
-        if not mensaje:
-            return jsonify({'success': False, 'message': 'Mensaje no encontrado'}), 404
-            
-        mensaje.leido = True
+        if buffer_lecturas.activo:
+            # Write-behind: se confirma ya y se escribe en el próximo lote
+            buffer_lecturas.agregar(mensaje_id)
+            return jsonify({'success': True, 'message': 'Mensaje marcado como leído'}), 202
+        
+        # SELECT ... FOR UPDATE + leido = 0: dos marcas concurrentes descuentan una sola vez
+        receptores = marcar_leidos([(mensaje_id, None)])
         db.session.commit()
+        if not receptores and db.session.get(Mensaje, mensaje_id) is None:
+            return jsonify({'success': False, 'message': 'Mensaje no encontrado'}), 404
+        notificar_no_leidos(receptores)
         
         return jsonify({'success': True, 'message': 'Mensaje marcado como leído'})
     except Exception as e:
@@ -294,32 +399,194 @@ def marcar_mensaje_como_leido(mensaje_id):
         print(f"❌ Error marcar leído: {e}")
         return jsonify({'success': False, 'message': str(e)}), 500
 
+@app.route('/api/conversacion/<int:usuario_id>/<int:otro_usuario_id>/marcar-leida', methods=['PUT'])
+def marcar_conversacion_como_leida(usuario_id, otro_usuario_id):
+    """Marcar como leídos los mensajes recibidos de otro usuario (hasta hastaMensajeId)."""
+    try:
+        data = request.get_json(silent=True) or {}
+        hasta_mensaje_id = data.get('hastaMensajeId')
+        
+        marcados = marcar_conversacion_leida(usuario_id, otro_usuario_id, hasta_mensaje_id)
+        db.session.commit()
+        if marcados:
+            notificar_no_leidos([usuario_id])
+        
+        return jsonify({
+            'success': True,
+            'message': f'{marcados} mensajes marcados como leídos',
+            'data': {'marcados': marcados, 'no_leidos': no_leidos_de(usuario_id)}
+        })
+    except Exception as e:
+        db.session.rollback()
+        print(f"❌ Error marcar conversación leída: {e}")
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+@app.route('/api/mensajes/no-leidos/<int:usuario_id>', methods=['GET'])
+@cache.depende_de(['contadores_mensajes'])
+def get_no_leidos(usuario_id):
+    """Total de mensajes sin leer del usuario."""
+    try:
+        return jsonify({'success': True, 'data': {'no_leidos': no_leidos_de(usuario_id)}})
+    except Exception as e:
+        print(f"❌ Error no leídos: {e}")
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+@app.route('/api/mensajes/bandeja/<int:usuario_id>', methods=['GET'])
+@cache.depende_de(['conversaciones', 'usuarios'])
+def get_bandeja(usuario_id):
+    """Bandeja de entrada: una fila por conversación."""
+    try:
+        limite = min(request.args.get('limite', 50, type=int), 200)
+        conversaciones = query_bandeja(usuario_id).limit(limite).all()
+        
+        bandeja_data = []
+        for fila in conversaciones:
+            conv_dict = fila.Conversacion.to_dict(usuario_id)
+            conv_dict['otro_usuario_nombre'] = fila.otro_usuario_nombre
+            bandeja_data.append(conv_dict)
+        
+        return jsonify({'success': True, 'data': bandeja_data})
+    except Exception as e:
+        print(f"❌ Error bandeja: {e}")
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+def _datos_del_token():
+    """Contenido del token (Authorization: Bearer o ?token= para EventSource); None si no es válido."""
+    token = request.args.get('token')
+    encabezado = request.headers.get('Authorization', '')
+    if encabezado.startswith('Bearer '):
+        token = encabezado[7:]
+    if not token:
+        return None
+    try:
+        return jwt.decode(token, app.config['SECRET_KEY'], algorithms=['HS256'])
+    except jwt.InvalidTokenError:
+        return None
+
+def _usuario_del_token():
+    """Id del usuario del token."""
+    datos = _datos_del_token()
+    return datos.get('user_id') if datos else None
+
+@app.route('/api/mensajes/stream', methods=['GET'])
+def stream_mensajes():
+    """Server-Sent Events con mensajes nuevos y no leídos del usuario del token."""
+    usuario_id = _usuario_del_token()
+    if usuario_id is None:
+        return jsonify({'success': False, 'message': 'Token inválido o ausente'}), 401
+    if not eventos.activo:
+        return jsonify({'success': False, 'message': 'Eventos en vivo desactivados'}), 503
+    
+    # Al reconectar, EventSource manda el último id recibido
+    desde = request.headers.get('Last-Event-ID') or request.args.get('desde')
+    desde = int(desde) if desde and desde.isdigit() else None
+    
+    # Suscribirse antes de leer la base para no perder lo que llegue entre medio
+    suscripcion = eventos.suscribir(usuario_id)
+    try:
+        pendientes = mensajes_nuevos(usuario_id, desde) if desde is not None else []
+        no_leidos = no_leidos_de(usuario_id)
+    except Exception as e:
+        suscripcion.cerrar()
+        print(f"❌ Error stream mensajes: {e}")
+        return jsonify({'success': False, 'message': str(e)}), 500
+    finally:
+        # El stream puede durar horas: no retener la conexión a la base
+        db.session.close()
+    ultimo_id = pendientes[-1]['id'] if pendientes else (desde or 0)
+    
+    def generar():
+        try:
+            yield 'retry: 3000\n\n'
+            for datos in pendientes:
+                yield formato_sse({'tipo': 'mensaje', 'id': datos['id'], 'datos': datos})
+            yield formato_sse({'tipo': 'no_leidos', 'datos': {'total': no_leidos}})
+            while True:
+                evento = suscripcion.obtener(eventos.keepalive)
+                if evento is None:
+                    # Comentario SSE: mantiene viva la conexión y detecta clientes caídos
+                    yield ': ping\n\n'
+                elif evento['tipo'] != 'mensaje' or evento['id'] > ultimo_id:
+                    yield formato_sse(evento)
+        finally:
+            suscripcion.cerrar()
+    
+    print(f"📡 Stream de mensajes abierto para usuario {usuario_id}")
+    return Response(generar(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+@app.route('/api/mensajes/eventos', methods=['GET'])
+def long_poll_mensajes():
+    """Long-poll (alternativa a SSE): mensajes con id > desde, esperando hasta timeout."""
+    try:
+        usuario_id = _usuario_del_token()
+        if usuario_id is None:
+            return jsonify({'success': False, 'message': 'Token inválido o ausente'}), 401
+        desde = request.args.get('desde', type=int)
+        espera = min(request.args.get('timeout', eventos.espera_max, type=float), eventos.espera_max)
+        
+        if desde is None:
+            # Primera llamada: solo el punto de partida
+            ultimo_id = db.session.query(func.max(Mensaje.id)).filter(Mensaje.receptor_id == usuario_id).scalar() or 0
+            return jsonify({'success': True, 'data': {
+                'mensajes': [], 'ultimo_id': ultimo_id, 'no_leidos': no_leidos_de(usuario_id)
+            }})
+        
+        suscripcion = eventos.suscribir(usuario_id) if eventos.activo else None
+        try:
+            mensajes = mensajes_nuevos(usuario_id, desde)
+            if not mensajes and suscripcion is not None and espera > 0:
+                db.session.close()
+                if suscripcion.obtener(espera) is not None:
+                    mensajes = mensajes_nuevos(usuario_id, desde)
+        finally:
+            if suscripcion is not None:
+                suscripcion.cerrar()
+        
+        return jsonify({'success': True, 'data': {
+            'mensajes': mensajes,
+            'ultimo_id': mensajes[-1]['id'] if mensajes else desde,
+            'no_leidos': no_leidos_de(usuario_id)
+        }})
+    except Exception as e:
+        print(f"❌ Error long-poll mensajes: {e}")
+        return jsonify({'success': False, 'message': str(e)}), 500
+
 # =====================================================
 # USUARIOS
 # =====================================================
 @app.route('/api/usuarios/familia', methods=['GET'])
+@cache.cacheado(['usuarios'])
 def get_familias():
     """Obtener usuarios familia."""
     try:
         print("👨‍👩‍👧‍👦 Solicitando familias...")
-        familias = Usuario.query.filter_by(rol='familia').order_by(Usuario.nombre).all()
+        familias = ENCODER_USUARIOS.all(
+            ENCODER_USUARIOS.query(db.session).filter(Usuario.rol == 'familia').order_by(Usuario.nombre)
+        )
         print(f"✅ Familias encontradas: {len(familias)}")
-        return jsonify({'success': True, 'data': [f.to_dict() for f in familias]})
+        return jsonify({'success': True, 'data': familias})
     except Exception as e:
         print(f"❌ Error familias: {e}")
         return jsonify({'success': False, 'message': str(e)}), 500
 
 @app.route('/api/usuarios/docentes', methods=['GET'])
+@cache.cacheado(['usuarios'])
 def get_docentes():
     """Obtener usuarios docentes."""
     try:
-        docentes = Usuario.query.filter_by(rol='docente').order_by(Usuario.nombre).all()
-        return jsonify({'success': True, 'data': [d.to_dict() for d in docentes]})
+        docentes = ENCODER_USUARIOS.all(
+            ENCODER_USUARIOS.query(db.session).filter(Usuario.rol == 'docente').order_by(Usuario.nombre)
+        )
+        return jsonify({'success': True, 'data': docentes})
     except Exception as e:
         print(f"❌ Error docentes: {e}")
         return jsonify({'success': False, 'message': str(e)}), 500
 
 @app.route('/api/usuario/<int:usuario_id>', methods=['GET'])
+@cache.depende_de(['usuarios'])
 def get_usuario_por_id_simple(usuario_id):
     """Obtener usuario por ID."""
     try:
@@ -335,18 +602,15 @@ def get_usuario_por_id_simple(usuario_id):
 # ESTUDIANTES
 # =====================================================
 @app.route('/api/estudiantes/por-curso/<int:curso_id>', methods=['GET'])
+@cache.cacheado(['estudiantes', 'cursos'])
 def get_estudiantes_por_curso(curso_id):
     """Estudiantes de un curso."""
     try:
-        estudiantes = db.session.query(Estudiante, Curso).join(Curso).filter(Estudiante.curso_id == curso_id).order_by(Estudiante.nombre).all()
-        
-        estudiantes_data = []
-        for estudiante, curso in estudiantes:
-            est_dict = estudiante.to_dict()
-            est_dict['curso_nombre'] = curso.nombre
-            est_dict['nivel'] = curso.nivel
-            est_dict['letra'] = curso.letra
-            estudiantes_data.append(est_dict)
+        estudiantes_data = ENCODER_ESTUDIANTES_CURSO.all(
+            ENCODER_ESTUDIANTES_CURSO.query(db.session).join(
+                Curso, Estudiante.curso_id == Curso.id
+            ).filter(Estudiante.curso_id == curso_id).order_by(Estudiante.nombre)
+        )
             
         return jsonify({'success': True, 'data': estudiantes_data})
     except Exception as e:
@@ -357,6 +621,7 @@ def get_estudiantes_por_curso(curso_id):
 # CALIFICACIONES
 # =====================================================
 @app.route('/api/calificaciones/buscar', methods=['GET'])
+@cache.depende_de(['calificaciones', 'estudiantes'])
 def get_calificaciones_por():
     """Buscar calificaciones con filtros."""
     try:
@@ -365,7 +630,9 @@ def get_calificaciones_por():
         periodo = request.args.get('periodo')
         print(f"🔍 Buscando calificaciones: curso={curso_id}, asignatura={asignatura}, periodo={periodo}")
         
-        query = db.session.query(Calificacion, Estudiante).join(Estudiante)
+        query = ENCODER_CALIFICACIONES_BUSCAR.query(db.session).join(
+            Estudiante, Calificacion.estudiante_id == Estudiante.id
+        )
         
         if curso_id:
             query = query.filter(Estudiante.curso_id == curso_id)
@@ -374,13 +641,7 @@ def get_calificaciones_por():
         if periodo:
             query = query.filter(Calificacion.periodo == periodo)
             
-        calificaciones = query.order_by(Estudiante.nombre).all()
-        
-        calificaciones_data = []
-        for calificacion, estudiante in calificaciones:
-            cal_dict = calificacion.to_dict()
-            cal_dict['estudiante_nombre'] = estudiante.nombre
-            calificaciones_data.append(cal_dict)
+        calificaciones_data = ENCODER_CALIFICACIONES_BUSCAR.all(query.order_by(Estudiante.nombre))
             
         print(f"📊 Calificaciones encontradas: {len(calificaciones_data)}")
         return jsonify({'success': True, 'data': calificaciones_data})
@@ -400,44 +661,71 @@ def guardar_calificaciones():
             
         print(f"💾 Guardando {len(calificaciones)} calificaciones")
         
-        for calif in calificaciones:
-            estudiante_id = calif.get('estudianteId')
-            asignatura = calif.get('asignatura')
-            periodo = calif.get('periodo')
-            nota = calif.get('nota')
-            
-            existing = Calificacion.query.filter_by(
-                estudiante_id=estudiante_id,
-                asignatura=asignatura,
-                periodo=periodo
-            ).first()
-            
-            if existing:
-                existing.nota = nota
-                existing.fecha_registro = datetime.now()
-                print(f"📝 Actualizada calificación para estudiante {estudiante_id}")
-            else:
-                nueva_cal = Calificacion(
-                    estudiante_id=estudiante_id,
-                    asignatura=asignatura,
-                    periodo=periodo,
-                    nota=nota,
-                    fecha_registro=datetime.now()
-                )
-                db.session.add(nueva_cal)
-                print(f"✅ Nueva calificación para estudiante {estudiante_id}")
+        filas = [{
+            'estudiante_id': calif.get('estudianteId'),
+            'asignatura': calif.get('asignatura'),
+            'periodo': calif.get('periodo'),
+            'nota': calif.get('nota')
+        } for calif in calificaciones]
         
+        # Un solo INSERT ... ON DUPLICATE KEY UPDATE por bloque
+        conteo = upsert_calificaciones(filas)
         db.session.commit()
-        return jsonify({'success': True, 'message': f'Se guardaron {len(calificaciones)} calificaciones correctamente'})
+        
+        print(f"✅ Calificaciones creadas: {conteo['creadas']}, actualizadas: {conteo['actualizadas']}")
+        return jsonify({
+            'success': True,
+            'message': f'Se guardaron {len(calificaciones)} calificaciones correctamente',
+            'data': conteo
+        })
     except Exception as e:
         db.session.rollback()
         print(f"❌ Error guardar calificaciones: {e}")
         return jsonify({'success': False, 'message': str(e)}), 500
 
+@app.route('/api/calificaciones/importar', methods=['POST'])
+def importar_calificaciones_archivo():
+    """Importar calificaciones desde un CSV/XLSX (campo 'archivo').
+
+    Con ?progreso=1 responde NDJSON: un evento por lote y el resumen al final.
+    """
+    archivo = request.files.get('archivo')
+    if not archivo or not archivo.filename:
+        return jsonify({'success': False, 'message': 'Debe adjuntar un archivo CSV o XLSX'}), 400
+    try:
+        filas = leer_filas(archivo.stream, archivo.filename)
+        eventos = importar_calificaciones(filas)
+        # Leer el primer lote aquí para que los errores de formato respondan 400
+        primero = next(eventos)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except Exception as e:
+        print(f"❌ Error importar calificaciones: {e}")
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+    print(f"📥 Importando calificaciones desde {archivo.filename}")
+    if request.args.get('progreso', 'false').lower() in ('1', 'true'):
+        def generar():
+            yield json.dumps(primero) + '\n'
+            for evento in eventos:
+                yield json.dumps(evento) + '\n'
+        return Response(stream_with_context(generar()), mimetype='application/x-ndjson')
+
+    resumen = primero
+    try:
+        for resumen in eventos:
+            pass
+    except Exception as e:
+        print(f"❌ Error importar calificaciones: {e}")
+        return jsonify({'success': False, 'message': str(e)}), 500
+    print(f"✅ Importación: {resumen['creadas']} creadas, {resumen['actualizadas']} actualizadas, {resumen['con_error']} con error")
+    return jsonify({'success': True, 'data': resumen})
+
 # =====================================================
 # ASISTENCIA
 # =====================================================
 @app.route('/api/asistencia/por-fecha', methods=['GET'])
+@cache.depende_de(['asistencia', 'estudiantes'])
 def get_asistencia_por_fecha():
     """Asistencia por curso y fecha."""
     try:
@@ -450,21 +738,14 @@ def get_asistencia_por_fecha():
             
         fecha_obj = datetime.strptime(fecha, '%Y-%m-%d').date()
         
-        asistencias = db.session.query(Asistencia, Estudiante).join(Estudiante).filter(
-            Estudiante.curso_id == curso_id,
-            Asistencia.fecha == fecha_obj
-        ).order_by(Estudiante.nombre).all()
-        
-        asistencia_data = []
-        for asistencia, estudiante in asistencias:
-            asist_dict = {
-                'id': asistencia.id,
-                'estudianteId': asistencia.estudiante_id,
-                'fecha': asistencia.fecha.isoformat() if asistencia.fecha else None,
-                'estado': asistencia.estado,
-                'estudiante_nombre': estudiante.nombre
-            }
-            asistencia_data.append(asist_dict)
+        asistencia_data = ENCODER_ASISTENCIA_FECHA.all(
+            ENCODER_ASISTENCIA_FECHA.query(db.session).join(
+                Estudiante, Asistencia.estudiante_id == Estudiante.id
+            ).filter(
+                Estudiante.curso_id == curso_id,
+                Asistencia.fecha == fecha_obj
+            ).order_by(Estudiante.nombre)
+        )
             
         print(f"📊 Registros de asistencia encontrados: {len(asistencia_data)}")
         return jsonify({'success': True, 'data': asistencia_data})
@@ -484,34 +765,27 @@ def guardar_asistencia():
             
         print(f"💾 Guardando {len(marcas)} registros de asistencia")
         
-        for marca in marcas:
-            estudiante_id = marca.get('estudianteId')
-            fecha = marca.get('fecha')
-            estado = marca.get('estado')
-            
-            if not all([estudiante_id, fecha, estado]):
-                continue
-                
-            fecha_obj = datetime.strptime(fecha, '%Y-%m-%d').date()
-            
-            existing = Asistencia.query.filter_by(
-                estudiante_id=estudiante_id,
-                fecha=fecha_obj
-            ).first()
-            
-            if existing:
-                existing.estado = estado
-                print(f"📝 Actualizada asistencia para estudiante {estudiante_id}")
-            else:
-                nueva_asist = Asistencia(
-                    estudiante_id=estudiante_id,
-                    fecha=fecha_obj,
-                    estado=estado
-                )
-                db.session.add(nueva_asist)
-                print(f"✅ Nueva asistencia para estudiante {estudiante_id}")
+        # Validar estudiantes con una sola consulta IN
+        completas = [m for m in marcas if all([m.get('estudianteId'), m.get('fecha'), m.get('estado')])]
+        existentes = estudiantes_existentes(m.get('estudianteId') for m in completas)
         
+        fechas_cache = {}
+        filas = []
+        for marca in completas:
+            estudiante_id = normalizar_id(marca.get('estudianteId'))
+            if estudiante_id not in existentes:
+                return jsonify({'success': False, 'message': f"Estudiante {marca.get('estudianteId')} no encontrado"}), 404
+            filas.append({
+                'estudiante_id': estudiante_id,
+                'fecha': parsear_fecha(marca.get('fecha'), fechas_cache),
+                'estado': marca.get('estado')
+            })
+        
+        resultados = upsert_asistencias(filas, existentes)
         db.session.commit()
+        
+        creados = sum(1 for r in resultados if r['accion'] == 'creado')
+        print(f"✅ Asistencia creada: {creados}, actualizada: {len(resultados) - creados}")
         return jsonify({'success': True, 'message': f'Se guardaron {len(marcas)} registros de asistencia correctamente'})
     except Exception as e:
         db.session.rollback()
@@ -519,6 +793,7 @@ def guardar_asistencia():
         return jsonify({'success': False, 'message': str(e)}), 500
 
 @app.route('/api/asistencia/estadisticas', methods=['GET'])
+@cache.depende_de(['asistencia_diaria', 'estudiantes'])
 def get_estadisticas_asistencia():
     """Estadísticas de asistencia."""
     try:
@@ -532,15 +807,10 @@ def get_estadisticas_asistencia():
         
         total_estudiantes = Estudiante.query.filter_by(curso_id=curso_id).count()
         
-        estadisticas = db.session.query(
-            Asistencia.estado,
-            func.count(Asistencia.id).label('cantidad')
-        ).join(Estudiante).filter(
-            Estudiante.curso_id == curso_id,
-            Asistencia.fecha == fecha_obj
-        ).group_by(Asistencia.estado).all()
+        # Resumen diario precalculado: una fila por (curso, fecha)
+        resumen = query_resumen_diario(curso_id, fecha_obj, fecha_obj).first()
         
-        por_estado = {est.estado: est.cantidad for est in estadisticas}
+        por_estado = resumen.por_estado() if resumen else {}
         registrados = sum(por_estado.values())
         
         stats = {
@@ -555,10 +825,32 @@ def get_estadisticas_asistencia():
         print(f"❌ Error estadísticas asistencia: {e}")
         return jsonify({'success': False, 'message': str(e)}), 500
 
+@app.route('/api/asistencia/calendario', methods=['GET'])
+@cache.depende_de(['asistencia_diaria'])
+def get_calendario_asistencia():
+    """Resumen diario de asistencia de un curso entre dos fechas."""
+    try:
+        curso_id = request.args.get('cursoId')
+        desde = request.args.get('desde')
+        hasta = request.args.get('hasta')
+        
+        if not curso_id or not desde or not hasta:
+            return jsonify({'success': False, 'message': 'cursoId, desde y hasta son requeridos'}), 400
+            
+        desde_obj = datetime.strptime(desde, '%Y-%m-%d').date()
+        hasta_obj = datetime.strptime(hasta, '%Y-%m-%d').date()
+        
+        dias = query_resumen_diario(curso_id, desde_obj, hasta_obj).all()
+        return jsonify({'success': True, 'data': [dia.to_dict() for dia in dias]})
+    except Exception as e:
+        print(f"❌ Error calendario asistencia: {e}")
+        return jsonify({'success': False, 'message': str(e)}), 500
+
 # =====================================================
 # OBSERVACIONES ✅ CORREGIDO
 # =====================================================
 @app.route('/api/observaciones/por-curso/<int:curso_id>', methods=['GET'])
+@cache.depende_de(['observaciones', 'estudiantes', 'usuarios'])
 def get_observaciones_por_curso(curso_id):
     """Observaciones por curso - CONSULTA CORREGIDA."""
     try:
@@ -646,60 +938,73 @@ def agregar_observacion():
 # FAMILIA - DASHBOARD Y REPORTES
 # =====================================================
 @app.route('/api/familia/dashboard/<int:familia_id>', methods=['GET'])
+@presupuesto_consultas(3)
+@cache.depende_de(['usuarios', 'estudiantes', 'cursos', 'calificaciones', 'asistencia', 'observaciones'], por_dia=True)
 def get_familia_dashboard(familia_id):
     """Dashboard familiar."""
     try:
-        # Obtener el usuario familia y su estudiante asociado
-        familia = Usuario.query.get(familia_id)
-        if not familia or familia.rol != 'familia':
+        ahora = datetime.now()
+        inicio_mes = ahora.date().replace(day=1)
+        inicio_mes_siguiente = (inicio_mes + timedelta(days=32)).replace(day=1)
+        
+        # Estadísticas como subconsultas correlacionadas: un solo round trip
+        notas = db.session.query(Calificacion).filter(Calificacion.estudiante_id == Estudiante.id)
+        asistencias_mes = db.session.query(Asistencia).filter(
+            Asistencia.estudiante_id == Estudiante.id,
+            Asistencia.fecha >= inicio_mes,
+            Asistencia.fecha < inicio_mes_siguiente
+        )
+        observaciones_mes = db.session.query(Observacion).filter(
+            Observacion.estudiante_id == Estudiante.id,
+            Observacion.fecha >= ahora.date() - timedelta(days=30)
+        )
+        
+        fila = db.session.query(
+            Usuario.rol,
+            Usuario.estudiante_id,
+            Estudiante.id.label('est_id'),
+            Estudiante.nombre.label('est_nombre'),
+            Estudiante.curso_id,
+            Curso.nombre.label('curso_nombre'),
+            Curso.nivel,
+            Curso.letra,
+            notas.with_entities(func.avg(Calificacion.nota)).scalar_subquery().label('promedio'),
+            notas.with_entities(func.count(Calificacion.id)).scalar_subquery().label('total_notas'),
+            asistencias_mes.with_entities(func.count(Asistencia.id)).scalar_subquery().label('total_dias'),
+            asistencias_mes.with_entities(
+                func.sum(case((Asistencia.estado == 'PRESENTE', 1), else_=0))
+            ).scalar_subquery().label('dias_presentes'),
+            observaciones_mes.with_entities(func.count(Observacion.id)).scalar_subquery().label('observaciones_mes')
+        ).outerjoin(
+            Estudiante, Estudiante.id == Usuario.estudiante_id
+        ).outerjoin(
+            Curso, Curso.id == Estudiante.curso_id
+        ).filter(Usuario.id == familia_id).first()
+        
+        if not fila or fila.rol != 'familia':
             return jsonify({'success': False, 'message': 'Familia no encontrada'}), 404
             
-        if not familia.estudiante_id:
+        if not fila.estudiante_id or not fila.est_id:
             return jsonify({'success': True, 'data': {'hijos': [], 'total_hijos': 0}})
-            
-        estudiante = Estudiante.query.get(familia.estudiante_id)
-        if not estudiante:
-            return jsonify({'success': True, 'data': {'hijos': [], 'total_hijos': 0}})
-            
-        curso = Curso.query.get(estudiante.curso_id)
         
         print(f"🏠 Estudiantes encontrados para familia {familia_id}: 1")
         
-        # Calcular estadísticas del estudiante
-        calificaciones = Calificacion.query.filter_by(estudiante_id=estudiante.id).all()
-        promedio = sum(c.nota for c in calificaciones) / len(calificaciones) if calificaciones else 0
-        
-        # Asistencia del mes actual
-        asistencias_mes = Asistencia.query.filter(
-            Asistencia.estudiante_id == estudiante.id,
-            extract('month', Asistencia.fecha) == datetime.now().month,
-            extract('year', Asistencia.fecha) == datetime.now().year
-        ).all()
-        
-        dias_presentes = len([a for a in asistencias_mes if a.estado == 'Presente'])
-        total_dias = len(asistencias_mes)
+        dias_presentes = int(fila.dias_presentes or 0)
+        total_dias = int(fila.total_dias or 0)
         asistencia_porcentaje = (dias_presentes / total_dias * 100) if total_dias > 0 else 100
         
-        # Observaciones recientes (último mes)
-        observaciones_mes = Observacion.query.filter(
-            and_(
-                Observacion.estudiante_id == estudiante.id,
-                Observacion.fecha >= datetime.now().date() - timedelta(days=30)
-            )
-        ).count()
-        
         hijo_data = {
-            'id': estudiante.id,
-            'nombre': estudiante.nombre,
-            'grado': f"{curso.nivel}{curso.letra}" if curso and curso.nivel and curso.letra else 'Sin grado',
-            'curso': curso.nombre if curso else 'Sin curso',
-            'curso_id': estudiante.curso_id,
-            'promedio': float(promedio),
-            'total_notas': len(calificaciones),
+            'id': fila.est_id,
+            'nombre': fila.est_nombre,
+            'grado': f"{fila.nivel}{fila.letra}" if fila.nivel and fila.letra else 'Sin grado',
+            'curso': fila.curso_nombre if fila.curso_nombre else 'Sin curso',
+            'curso_id': fila.curso_id,
+            'promedio': float(fila.promedio or 0),
+            'total_notas': int(fila.total_notas or 0),
             'asistencia_porcentaje': asistencia_porcentaje,
             'dias_presentes': dias_presentes,
             'total_dias': total_dias,
-            'observaciones_mes': observaciones_mes
+            'observaciones_mes': int(fila.observaciones_mes or 0)
         }
         
         print(f"✅ Dashboard familia generado: {[hijo_data]}")
@@ -715,23 +1020,15 @@ def get_familia_dashboard(familia_id):
         return jsonify({'success': False, 'message': str(e)}), 500
 
 @app.route('/api/familia/hijo-calificaciones/<int:estudiante_id>', methods=['GET'])
+@cache.depende_de(['calificaciones'])
 def get_calificaciones_hijo(estudiante_id):
     """Calificaciones de un hijo."""
     try:
-        calificaciones = Calificacion.query.filter_by(estudiante_id=estudiante_id).order_by(
-            Calificacion.fecha_registro.desc(), Calificacion.asignatura
-        ).all()
-        
-        calificaciones_data = []
-        for cal in calificaciones:
-            cal_dict = {
-                'id': cal.id,
-                'asignatura': cal.asignatura,
-                'periodo': cal.periodo,
-                'nota': cal.nota,
-                'fecha': cal.fecha_registro.isoformat() if cal.fecha_registro else None
-            }
-            calificaciones_data.append(cal_dict)
+        calificaciones_data = ENCODER_CALIFICACIONES_HIJO.all(
+            ENCODER_CALIFICACIONES_HIJO.query(db.session).filter(
+                Calificacion.estudiante_id == estudiante_id
+            ).order_by(Calificacion.fecha_registro.desc(), Calificacion.asignatura)
+        )
         
         print(f"📊 Calificaciones encontradas para estudiante {estudiante_id}: {len(calificaciones_data)}")
         return jsonify({'success': True, 'data': calificaciones_data})
@@ -740,19 +1037,15 @@ def get_calificaciones_hijo(estudiante_id):
         return jsonify({'success': False, 'message': str(e)}), 500
 
 @app.route('/api/familia/hijo-asistencia/<int:estudiante_id>', methods=['GET'])
+@cache.depende_de(['asistencia'])
 def get_asistencia_hijo(estudiante_id):
     """Asistencia de un hijo."""
     try:
-        asistencias = Asistencia.query.filter_by(estudiante_id=estudiante_id).order_by(Asistencia.fecha.desc()).all()
-        
-        asistencias_data = []
-        for asist in asistencias:
-            asist_dict = {
-                'id': asist.id,
-                'fecha': asist.fecha.isoformat() if asist.fecha else None,
-                'estado': asist.estado
-            }
-            asistencias_data.append(asist_dict)
+        asistencias_data = ENCODER_ASISTENCIA_HIJO.all(
+            ENCODER_ASISTENCIA_HIJO.query(db.session).filter(
+                Asistencia.estudiante_id == estudiante_id
+            ).order_by(Asistencia.fecha.desc())
+        )
             
         return jsonify({'success': True, 'data': asistencias_data})
     except Exception as e:
@@ -760,6 +1053,7 @@ def get_asistencia_hijo(estudiante_id):
         return jsonify({'success': False, 'message': str(e)}), 500
 
 @app.route('/api/familia/hijo-observaciones/<int:estudiante_id>', methods=['GET'])
+@cache.depende_de(['observaciones', 'usuarios'])
 def get_observaciones_hijo(estudiante_id):
     """Observaciones de un hijo."""
     try:
@@ -785,6 +1079,268 @@ def get_observaciones_hijo(estudiante_id):
         print(f"❌ Error observaciones hijo: {e}")
         return jsonify({'success': False, 'message': str(e)}), 500
 
+# =====================================================
+# BOLETINES
+# =====================================================
+@app.route('/api/boletines/curso/<int:curso_id>', methods=['GET'])
+@cache.depende_de(['cursos', 'estudiantes', 'calificaciones', 'asistencia', 'observaciones', 'usuarios'])
+def get_boletines_curso(curso_id):
+    """Boletines de todo un curso para un periodo (formato json, o html/pdf en un .zip)."""
+    periodo = request.args.get('periodo')
+    formato = request.args.get('formato', 'json').lower()
+    if not periodo:
+        return jsonify({'success': False, 'message': 'periodo es requerido'}), 400
+    try:
+        if formato == 'json':
+            boletines = cargar_boletines(curso_id, periodo)
+            return jsonify({'success': True, 'data': boletines})
+
+        archivos = generar_boletines(curso_id, periodo, formato)
+        contenido = io.BytesIO()
+        with zipfile.ZipFile(contenido, 'w', zipfile.ZIP_DEFLATED) as zip_boletines:
+            for nombre, datos in archivos:
+                zip_boletines.writestr(nombre, datos)
+        print(f"📄 Boletines generados: {len(archivos)} ({formato})")
+        return Response(
+            contenido.getvalue(),
+            mimetype='application/zip',
+            headers={'Content-Disposition': f'attachment; filename=boletines-{curso_id}-{periodo}.zip'}
+        )
+    except LookupError as e:
+        return jsonify({'success': False, 'message': str(e)}), 404
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except Exception as e:
+        print(f"❌ Error boletines: {e}")
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+# =====================================================
+# EXPORTACIONES (streaming NDJSON / CSV)
+# =====================================================
+def _parametros_export():
+    """Leer formato, cursoId, desde y hasta; lanza ValueError si no son válidos."""
+    formato = request.args.get('formato', 'ndjson').lower()
+    if formato not in FORMATOS:
+        raise ValueError(f"formato debe ser uno de: {', '.join(FORMATOS)}")
+    desde = request.args.get('desde')
+    hasta = request.args.get('hasta')
+    return {
+        'formato': formato,
+        'curso_id': request.args.get('cursoId', type=int),
+        'desde': datetime.strptime(desde, '%Y-%m-%d').date() if desde else None,
+        'hasta': datetime.strptime(hasta, '%Y-%m-%d').date() if hasta else None
+    }
+
+def _respuesta_export(nombre, encoder, query, formato):
+    """Respuesta en streaming: las filas se envían a medida que llegan del cursor."""
+    print(f"📤 Exportando {nombre} ({formato})")
+    return Response(
+        stream_with_context(generar_export(encoder, query, formato)),
+        mimetype=FORMATOS[formato],
+        headers={'Content-Disposition': f'attachment; filename={nombre}.{formato}'}
+    )
+
+@app.route('/api/exportar/calificaciones', methods=['GET'])
+@cache.depende_de(['calificaciones', 'estudiantes'])
+def exportar_calificaciones():
+    """Exportar calificaciones por curso/periodo/asignatura."""
+    try:
+        params = _parametros_export()
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    encoder, query = query_export_calificaciones(
+        params['curso_id'], request.args.get('periodo'), request.args.get('asignatura')
+    )
+    return _respuesta_export('calificaciones', encoder, query, params['formato'])
+
+@app.route('/api/exportar/asistencia', methods=['GET'])
+@cache.depende_de(['asistencia', 'estudiantes'])
+def exportar_asistencia():
+    """Exportar asistencia por curso y rango de fechas (desde/hasta YYYY-MM-DD)."""
+    try:
+        params = _parametros_export()
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    encoder, query = query_export_asistencia(params['curso_id'], params['desde'], params['hasta'])
+    return _respuesta_export('asistencia', encoder, query, params['formato'])
+
+@app.route('/api/exportar/observaciones', methods=['GET'])
+@cache.depende_de(['observaciones', 'estudiantes', 'usuarios'])
+def exportar_observaciones():
+    """Exportar observaciones por curso y rango de fechas (desde/hasta YYYY-MM-DD)."""
+    try:
+        params = _parametros_export()
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    encoder, query = query_export_observaciones(params['curso_id'], params['desde'], params['hasta'])
+    return _respuesta_export('observaciones', encoder, query, params['formato'])
+
+# =====================================================
+# ADMINISTRACIÓN
+# =====================================================
+@app.route('/api/admin/consultas-lentas', methods=['GET'])
+def get_consultas_lentas():
+    """Consultas lentas agrupadas por forma, con su EXPLAIN (solo admin)."""
+    try:
+        datos = _datos_del_token()
+        if not datos or datos.get('rol') != 'admin':
+            return jsonify({'success': False, 'message': 'Solo administradores'}), 403
+        if not registro_lentas.activo:
+            return jsonify({'success': False, 'message': 'Log de consultas lentas desactivado (CONSULTAS_LENTAS_MS)'}), 503
+        
+        limite = min(request.args.get('limite', 20, type=int), 200)
+        orden = request.args.get('orden', 'total')
+        if orden not in ('total', 'max', 'veces'):
+            return jsonify({'success': False, 'message': 'orden debe ser total, max o veces'}), 400
+        
+        return jsonify({'success': True, 'data': {
+            'umbral_ms': registro_lentas.umbral * 1000,
+            'consultas': registro_lentas.top(limite, orden)
+        }})
+    except Exception as e:
+        print(f"❌ Error consultas lentas: {e}")
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+def _es_admin():
+    datos = _datos_del_token()
+    return bool(datos) and datos.get('rol') == 'admin'
+
+@app.route('/api/admin/perfilador/token', methods=['POST'])
+def crear_token_perfilador():
+    """Token firmado para perfilar requests con el encabezado X-Perfilar (solo admin)."""
+    if not _es_admin():
+        return jsonify({'success': False, 'message': 'Solo administradores'}), 403
+    if not perfilador.activo:
+        return jsonify({'success': False, 'message': 'Perfilador desactivado (PERFILADOR_ACTIVO)'}), 503
+    
+    data = request.get_json(silent=True) or {}
+    minutos = min(max(int(data.get('minutos', 15)), 1), 24 * 60)
+    return jsonify({'success': True, 'data': {
+        'encabezado': 'X-Perfilar',
+        'token': perfilador.firmar(minutos * 60),
+        'minutos': minutos
+    }})
+
+@app.route('/api/admin/perfiles', methods=['GET'])
+def get_perfiles():
+    """Perfiles guardados con su resumen de tiempos (solo admin)."""
+    if not _es_admin():
+        return jsonify({'success': False, 'message': 'Solo administradores'}), 403
+    if not perfilador.activo:
+        return jsonify({'success': False, 'message': 'Perfilador desactivado (PERFILADOR_ACTIVO)'}), 503
+    return jsonify({'success': True, 'data': perfilador.listar()})
+
+@app.route('/api/admin/perfiles/<perfil_id>', methods=['GET'])
+def get_perfil(perfil_id):
+    """Resumen de un perfil, o el .prof completo con ?descargar=1 (solo admin)."""
+    if not _es_admin():
+        return jsonify({'success': False, 'message': 'Solo administradores'}), 403
+    if not perfilador.activo:
+        return jsonify({'success': False, 'message': 'Perfilador desactivado (PERFILADOR_ACTIVO)'}), 503
+    
+    if request.args.get('descargar'):
+        ruta = perfilador.ruta(perfil_id)
+        if ruta is None:
+            return jsonify({'success': False, 'message': 'Perfil no encontrado'}), 404
+        return send_file(os.path.abspath(ruta), as_attachment=True, download_name=f'{perfil_id}.prof')
+    
+    resumen = perfilador.obtener(perfil_id)
+    if resumen is None:
+        return jsonify({'success': False, 'message': 'Perfil no encontrado'}), 404
+    return jsonify({'success': True, 'data': resumen})
+
+# =====================================================
+# COMANDOS CLI (flask --app app <comando>)
+# =====================================================
+@app.cli.command('migrar')
+@click.option('--listar', is_flag=True, help='Solo mostrar las migraciones pendientes')
+def migrar_cmd(listar):
+    """Aplicar las migraciones pendientes de database/migraciones."""
+    if listar:
+        pendientes = migraciones_pendientes()
+        print(f"📋 Migraciones pendientes: {', '.join(pendientes) if pendientes else 'ninguna'}")
+        return
+    aplicadas = aplicar_migraciones()
+    for version in aplicadas:
+        print(f"✅ Migración aplicada: {version}")
+    if not aplicadas:
+        print("✅ La base ya está al día")
+
+@app.cli.command('verificar-planes')
+@click.option('--filas-min', default=None, type=int, help='Filas estimadas desde las que un scan o filesort es regresión')
+def verificar_planes_cmd(filas_min):
+    """EXPLAIN de las consultas críticas; termina con error si alguna perdió su índice."""
+    fallidas = 0
+    for nombre, plan, problemas in verificar_planes(filas_min):
+        if problemas:
+            fallidas += 1
+            print(f"❌ {nombre}: {'; '.join(problemas)}")
+        else:
+            print(f"✅ {nombre}")
+        for fila in plan:
+            print(f"    {fila.get('table')}: type={fila.get('type')} key={fila.get('key')} rows={fila.get('rows')} {fila.get('Extra') or ''}")
+    if fallidas:
+        raise SystemExit(1)
+
+@app.cli.command('firmar-perfilador')
+@click.option('--minutos', default=15, show_default=True, help='Validez del token')
+def firmar_perfilador_cmd(minutos):
+    """Token para perfilar requests con el encabezado X-Perfilar."""
+    print(f"🔬 X-Perfilar: {perfilador.firmar(minutos * 60)}")
+
+@app.cli.command('reconstruir-conversaciones')
+def reconstruir_conversaciones_cmd():
+    """Recalcular conversaciones y contadores de no leídos desde mensajes."""
+    total = reconstruir_conversaciones()
+    print(f"✅ Conversaciones reconstruidas: {total}")
+
+@app.cli.command('reconstruir-asistencia-diaria')
+@click.option('--desde', default=None, help='Fecha inicial YYYY-MM-DD (opcional)')
+@click.option('--hasta', default=None, help='Fecha final YYYY-MM-DD (opcional)')
+def reconstruir_asistencia_diaria_cmd(desde, hasta):
+    """Recalcular el resumen diario de asistencia por curso."""
+    desde_obj = datetime.strptime(desde, '%Y-%m-%d').date() if desde else None
+    hasta_obj = datetime.strptime(hasta, '%Y-%m-%d').date() if hasta else None
+    total = reconstruir_asistencia_diaria(desde_obj, hasta_obj)
+    print(f"✅ Días de asistencia reconstruidos: {total}")
+
+@app.cli.command('importar-calificaciones')
+@click.argument('archivo', type=click.Path(exists=True, dir_okay=False))
+def importar_calificaciones_cmd(archivo):
+    """Importar calificaciones desde un CSV/XLSX, en lotes con commit propio."""
+    with open(archivo, 'rb') as contenido:
+        for evento in importar_calificaciones(leer_filas(contenido, archivo)):
+            print(f"⏳ {evento['procesadas']} filas procesadas ({evento['con_error']} con error)")
+    for error in evento['errores']:
+        print(f"❌ Fila {error['fila']}: {'; '.join(error['errores'])}")
+    print(f"✅ Calificaciones creadas: {evento['creadas']}, actualizadas: {evento['actualizadas']}")
+
+@app.cli.command('generar-boletines')
+@click.option('--curso', 'curso_id', required=True, type=int, help='ID del curso')
+@click.option('--periodo', required=True, help='Periodo, p.ej. 2025-P2')
+@click.option('--formato', default='html', type=click.Choice(['html', 'json', 'pdf']))
+@click.option('--destino', required=True, help='Directorio de salida')
+@click.option('--procesos', default=None, type=int, help='Procesos para renderizar (por defecto BOLETINES_PROCESOS)')
+def generar_boletines_cmd(curso_id, periodo, formato, destino, procesos):
+    """Generar los boletines de un curso en un solo job."""
+    os.makedirs(destino, exist_ok=True)
+    procesos = procesos or app.config.get('BOLETINES_PROCESOS') or os.cpu_count() or 1
+    archivos = generar_boletines(curso_id, periodo, formato, procesos)
+    for nombre, datos in archivos:
+        with open(os.path.join(destino, nombre), 'wb') as archivo:
+            archivo.write(datos)
+    print(f"✅ Boletines generados: {len(archivos)} en {destino}")
+
+@app.cli.command('snapshot-analitica')
+@click.option('--destino', required=True, help='Directorio donde escribir los archivos Parquet')
+@click.option('--tabla', 'tablas', multiple=True, type=click.Choice(list(TABLAS_SNAPSHOT)), help='Tabla a exportar (repetible; por defecto todas)')
+@click.option('--completo', is_flag=True, help='Reescribir desde cero en lugar de agregar solo filas nuevas o modificadas')
+def snapshot_analitica_cmd(destino, tablas, completo):
+    """Escribir snapshots Parquet (incrementales, particionados) para análisis."""
+    resultado = exportar_snapshots(destino, list(tablas) or None, completo)
+    for tabla, filas in resultado.items():
+        print(f"✅ {tabla}: {filas} filas nuevas o modificadas")
+
 # =====================================================
 # MAIN
 # =====================================================
@@ -15,7 +15,80 @@ class Config:
     )
     
     SQLALCHEMY_TRACK_MODIFICATIONS = False
-    SQLALCHEMY_ECHO = True  # Para ver queries SQL en desarrollo
+    # Para ver queries SQL en desarrollo (SQLALCHEMY_ECHO=true); en producción usar /metrics
+    SQLALCHEMY_ECHO = os.environ.get('SQLALCHEMY_ECHO', 'false').lower() == 'true'
+    
+    # Escrituras masivas (filas por sentencia INSERT)
+    BULK_CHUNK_SIZE = 500
+    
+    # Confirmaciones de lectura diferidas (write-behind), desactivado por defecto
+    LECTURAS_DIFERIDAS = os.environ.get('LECTURAS_DIFERIDAS', 'false').lower() == 'true'
+    LECTURAS_LOTE_MAX = 200      # Marcas acumuladas que fuerzan la escritura
+    LECTURAS_DEMORA_MAX = 2.0    # Segundos máximos antes de escribir
+    
+    # Cache de lecturas: 'memoria' (por proceso), 'sqlite' (compartido entre workers) o 'ninguno'
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'memoria')
+    CACHE_SQLITE_RUTA = os.environ.get('CACHE_SQLITE_RUTA', os.path.join('instance', 'cache.sqlite3'))
+    CACHE_TTL = 300              # Segundos que una entrada se considera fresca
+    CACHE_OBSOLETO_TTL = 3600    # Segundos extra que se sirve obsoleta si la BD falla
+    CACHE_MAX_ENTRADAS = 1024
+    HTTP_CONDICIONAL = CACHE_BACKEND == 'sqlite'  # ETag / Last-Modified; requiere el backend compartido
+    COALESCER_ESPERA_MAX = 10.0  # Segundos que un request espera al idéntico en curso
+    
+    # Importación de calificaciones (CSV/XLSX): filas por lote/commit y errores reportados
+    IMPORTACION_LOTE = 1000
+    IMPORTACION_MAX_ERRORES = 1000
+    ASIGNATURAS_VALIDAS = None   # None: las que ya existen en calificaciones
+    PERIODOS_VALIDOS = None
+    
+    # Boletines: procesos del comando generar-boletines (None = núcleos de la CPU; los requests renderizan en línea) y fechas por periodo
+    BOLETINES_PROCESOS = None
+    PERIODOS_FECHAS = {}         # {'2025-P1': ('2025-03-01', '2025-07-15')}; por defecto el año del periodo
+    
+    # Exportaciones en streaming: filas por lectura del cursor y por trozo enviado
+    EXPORTACION_LOTE = 1000
+    
+    # Snapshots analíticos (flask --app app snapshot-analitica): base de lectura opcional (réplica)
+    ANALITICA_DATABASE_URI = os.environ.get('ANALITICA_DATABASE_URI')
+    SNAPSHOT_LOTE = 5000
+    SNAPSHOT_SOLAPAMIENTO = 600  # Segundos que cada corrida relee antes de la marca (commits tardíos)
+    
+    # Serialización JSON con orjson (opcional; mismos bytes que el JSON estándar)
+    JSON_ORJSON = os.environ.get('JSON_ORJSON', 'true').lower() == 'true'
+    
+    # Eventos en vivo (SSE / long-poll): 'memoria' (por proceso), 'redis' (entre workers) o 'ninguno'
+    EVENTOS_BACKEND = os.environ.get('EVENTOS_BACKEND', 'memoria')
+    EVENTOS_REDIS_URL = os.environ.get('EVENTOS_REDIS_URL', 'redis://localhost:6379/0')
+    EVENTOS_KEEPALIVE = 15.0     # Segundos entre pings del stream SSE
+    EVENTOS_ESPERA_MAX = 25.0    # Espera máxima de un long-poll
+    EVENTOS_CAPACIDAD = 256      # Eventos encolados por cliente antes de descartar
+    
+    # Métricas por endpoint en /metrics (formato Prometheus). Con METRICAS_TOKEN exige
+    # 'Authorization: Bearer <token>'; sin token solo responde a localhost (detrás de un proxy, definir el token)
+    METRICAS_ACTIVAS = os.environ.get('METRICAS_ACTIVAS', 'true').lower() == 'true'
+    METRICAS_TOKEN = os.environ.get('METRICAS_TOKEN')
+    
+    # Detector de N+1 y presupuestos de consultas (@presupuesto_consultas), para desarrollo y tests
+    CONSULTAS_DETECTOR = os.environ.get('CONSULTAS_DETECTOR', 'false').lower() == 'true'
+    CONSULTAS_REPETICIONES_MAX = 5  # Misma forma de sentencia más veces que esto en un request = posible N+1
+    CONSULTAS_ESTRICTO = os.environ.get('CONSULTAS_ESTRICTO', 'false').lower() == 'true'  # Exceder = error
+    
+    # Log de consultas lentas con EXPLAIN (archivo rotativo + /api/admin/consultas-lentas); 0 lo desactiva
+    CONSULTAS_LENTAS_MS = int(os.environ.get('CONSULTAS_LENTAS_MS', '200'))
+    CONSULTAS_LENTAS_ARCHIVO = os.environ.get('CONSULTAS_LENTAS_ARCHIVO', os.path.join('instance', 'consultas_lentas.log'))
+    CONSULTAS_LENTAS_MAX_BYTES = 5 * 1024 * 1024
+    CONSULTAS_LENTAS_RESPALDOS = 3
+    CONSULTAS_LENTAS_EXPLAIN_CADA = 300  # Segundos entre EXPLAIN de una misma forma de sentencia
+    
+    # Perfilador opt-in por request (encabezado X-Perfilar con token firmado por un admin)
+    PERFILADOR_ACTIVO = os.environ.get('PERFILADOR_ACTIVO', 'true').lower() == 'true'
+    PERFILADOR_DIRECTORIO = os.environ.get('PERFILADOR_DIRECTORIO', os.path.join('instance', 'perfiles'))
+    PERFILADOR_MAX_PERFILES = 50
+    
+    # Migraciones (flask --app app migrar) y verificación de planes (flask --app app verificar-planes)
+    MIGRACIONES_DIRECTORIO = None  # None: database/migraciones del repositorio
+    MIGRACIONES_VERIFICAR = True   # Con MySQL, no arrancar si hay migraciones pendientes
+    PLANES_FILAS_MIN = 1000        # Filas estimadas desde las que un full scan o filesort es regresión
     
     # JWT Config
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY')
@@ -0,0 +1,226 @@
+import hashlib
+import hmac
+import time
+from datetime import date, datetime, timezone
+from functools import wraps
+from flask import request, make_response, current_app, g
+from sqlalchemy import event
+from src.cache.backends import BackendMemoria, BackendSQLite
+from src.cache.coalescencia import coalescedor
+
+class Cache:
+    """Cache read-through para respuestas GET con invalidación por etiquetas.
+
+    Las etiquetas son nombres de tabla. Cada entrada guarda las versiones de
+    sus etiquetas al calcularse; un commit que escribe en una tabla sube su
+    versión y deja obsoletas las entradas que dependen de ella. Las entradas
+    obsoletas se conservan CACHE_OBSOLETO_TTL segundos más para responder si
+    la base de datos falla (5xx) en lugar de propagar el error.
+    """
+
+    def __init__(self, app=None):
+        self.backend = None
+        self.ttl = 300
+        self.obsoleto_ttl = 0
+        self.condicional = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        tipo = app.config.get('CACHE_BACKEND', 'memoria')
+        self.ttl = app.config.get('CACHE_TTL', 300)
+        self.obsoleto_ttl = app.config.get('CACHE_OBSOLETO_TTL', 3600)
+        max_entradas = app.config.get('CACHE_MAX_ENTRADAS', 1024)
+        if tipo == 'memoria':
+            self.backend = BackendMemoria(max_entradas)
+        elif tipo == 'sqlite':
+            self.backend = BackendSQLite(app.config['CACHE_SQLITE_RUTA'], max_entradas)
+        elif tipo == 'ninguno':
+            self.backend = None
+        else:
+            raise ValueError(f'CACHE_BACKEND desconocido: {tipo}')
+
+        if self.backend is not None:
+            from src.extensions import db
+            _registrar_invalidacion(db.session, self)
+
+        # Con 'memoria' las versiones son de cada proceso: una escritura en otro
+        # worker o desde un comando CLI no cambiaría el ETag y un cliente con
+        # uno viejo recibiría 304 indefinidamente. Solo con backend compartido.
+        self.condicional = app.config.get('HTTP_CONDICIONAL', False) and tipo == 'sqlite'
+        if app.config.get('HTTP_CONDICIONAL', False) and tipo == 'memoria':
+            print("⚠️ HTTP_CONDICIONAL desactivado: requiere CACHE_BACKEND='sqlite' (compartido entre workers)")
+        if self.condicional:
+            self._secreto = str(app.config['SECRET_KEY']).encode('utf-8')
+            app.before_request(self._validar_condicional)
+            app.after_request(self._agregar_validadores)
+
+    @property
+    def activo(self):
+        return self.backend is not None
+
+    def obtener(self, clave, etiquetas):
+        """Retorna (valor, fresco); (None, False) si no hay entrada utilizable"""
+        entrada = self.backend.leer(clave)
+        if entrada is None:
+            return None, False
+        valor, expira, versiones = entrada
+        ahora = time.time()
+        if ahora > expira + self.obsoleto_ttl:
+            return None, False
+        fresco = ahora <= expira and self.backend.versiones(etiquetas) == versiones
+        return valor, fresco
+
+    def guardar(self, clave, valor, versiones, ttl=None):
+        """Guardar con la foto de versiones tomada ANTES de calcular el valor"""
+        expira = time.time() + (ttl if ttl is not None else self.ttl)
+        self.backend.escribir(clave, valor, expira, versiones)
+
+    def invalidar(self, etiquetas):
+        if self.activo and etiquetas:
+            self.backend.invalidar(sorted(etiquetas))
+
+    def limpiar(self):
+        if self.activo:
+            self.backend.limpiar()
+
+    def cacheado(self, etiquetas, ttl=None):
+        """Decorador para vistas GET que retornan JSON.
+
+        La clave es la ruta más los parámetros de la query string ordenados.
+        Solo se guardan respuestas 200; ante un 5xx se responde con la
+        última versión obsoleta si existe.
+        """
+        etiquetas = tuple(etiquetas)
+
+        def decorador(vista):
+            @self.depende_de(etiquetas)
+            @wraps(vista)
+            def envoltura(*args, **kwargs):
+                if not self.activo or request.method != 'GET':
+                    return vista(*args, **kwargs)
+
+                clave = _clave_request()
+                valor, fresco = self.obtener(clave, etiquetas)
+                if fresco:
+                    return _respuesta(valor, 'HIT')
+
+                versiones = self.backend.versiones(etiquetas)
+                respuesta = make_response(vista(*args, **kwargs))
+                if respuesta.status_code == 200 and respuesta.is_json:
+                    self.guardar(clave, respuesta.get_data(), versiones, ttl)
+                    respuesta.headers['X-Cache'] = 'MISS'
+                elif respuesta.status_code >= 500 and valor is not None:
+                    print(f"⚠️ Sirviendo cache obsoleto para {request.path}")
+                    return _respuesta(valor, 'STALE')
+                return respuesta
+            return envoltura
+        return decorador
+
+    def depende_de(self, etiquetas, por_dia=False):
+        """Declarar las tablas de las que depende una vista GET.
+
+        Con eso la respuesta lleva ETag y Last-Modified calculados desde los
+        contadores de versión de esas tablas, y un If-None-Match o
+        If-Modified-Since vigente se responde 304 antes de ejecutar la vista.
+        por_dia=True para vistas cuyo resultado cambia con la fecha de hoy.
+        """
+        def decorador(vista):
+            vista._depende_de = (tuple(etiquetas), por_dia)
+            return vista
+        return decorador
+
+    def _validar_condicional(self):
+        if request.method not in ('GET', 'HEAD'):
+            return None
+        vista = current_app.view_functions.get(request.endpoint)
+        dependencias = getattr(vista, '_depende_de', None)
+        if dependencias is None:
+            return None
+
+        etiquetas, por_dia = dependencias
+        versiones = self.backend.versiones(etiquetas)
+        partes = [
+            self.backend.epoca,
+            request.full_path,
+            request.headers.get('Authorization', ''),
+            ','.join(f'{etiqueta}:{version}' for etiqueta, version in sorted(versiones.items()))
+        ]
+        if por_dia:
+            partes.append(date.today().isoformat())
+        etag = hmac.new(self._secreto, '|'.join(partes).encode('utf-8'), hashlib.sha1).hexdigest()
+        # Resolución de 1 s: si hubo cambios en el segundo en curso, Last-Modified
+        # no distinguiría uno posterior en ese mismo segundo, así que se omite
+        segundo = int(self.backend.modificado(etiquetas))
+        modificado = datetime.fromtimestamp(segundo, timezone.utc) if segundo < int(time.time()) else None
+        g._etag, g._modificado = etag, modificado
+
+        if request.if_none_match:
+            vigente = request.if_none_match.contains(etag)
+        elif request.if_modified_since and modificado and not por_dia:
+            vigente = modificado <= request.if_modified_since
+        else:
+            vigente = False
+        if vigente:
+            respuesta = current_app.response_class(status=304)
+            self._poner_validadores(respuesta, etag, modificado)
+            return respuesta
+        return None
+
+    def _agregar_validadores(self, respuesta):
+        etag = g.pop('_etag', None)
+        if etag is not None and respuesta.status_code == 200:
+            self._poner_validadores(respuesta, etag, g.pop('_modificado'))
+        return respuesta
+
+    @staticmethod
+    def _poner_validadores(respuesta, etag, modificado):
+        respuesta.set_etag(etag)
+        if modificado is not None:
+            respuesta.last_modified = modificado
+        respuesta.headers['Cache-Control'] = 'private, no-cache'
+        respuesta.vary.add('Authorization')
+
+def _clave_request():
+    params = sorted(request.args.items(multi=True))
+    consulta = '&'.join(f'{k}={v}' for k, v in params)
+    return f'{request.path}?{consulta}'
+
+def _respuesta(valor, estado):
+    respuesta = current_app.response_class(valor, mimetype='application/json')
+    respuesta.headers['X-Cache'] = estado
+    return respuesta
+
+def _registrar_invalidacion(session, cache):
+    """Invalidar etiquetas (tablas) escritas por la sesión al hacer commit.
+
+    Cubre tanto el flush del ORM como INSERT/UPDATE/DELETE ejecutados con
+    db.session.execute(); en rollback las tablas pendientes se descartan.
+    """
+    def tablas_pendientes(sesion):
+        return sesion.info.setdefault('cache_tablas', set())
+
+    @event.listens_for(session, 'after_flush')
+    def al_flush(sesion, contexto):
+        for objeto in list(sesion.new) + list(sesion.dirty) + list(sesion.deleted):
+            tabla = getattr(objeto, '__table__', None)
+            if tabla is not None:
+                tablas_pendientes(sesion).add(tabla.name)
+
+    @event.listens_for(session, 'do_orm_execute')
+    def al_ejecutar(estado):
+        if estado.is_insert or estado.is_update or estado.is_delete:
+            tabla = getattr(estado.statement, 'table', None)
+            nombre = getattr(tabla, 'name', None)
+            if nombre:
+                tablas_pendientes(estado.session).add(nombre)
+
+    @event.listens_for(session, 'after_commit')
+    def al_commit(sesion):
+        cache.invalidar(sesion.info.pop('cache_tablas', None))
+
+    @event.listens_for(session, 'after_rollback')
+    def al_rollback(sesion):
+        sesion.info.pop('cache_tablas', None)
+
+cache = Cache()
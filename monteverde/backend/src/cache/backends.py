@@ -0,0 +1,155 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+class BackendMemoria:
+    """Cache en memoria del proceso: LRU acotado por número de entradas.
+
+    Cada entrada guarda (valor, expira, versiones), donde versiones es la foto
+    de las versiones de sus etiquetas al momento de calcularla. Las versiones
+    parten de 0 en cada proceso: epoca distingue un reinicio de otro.
+    """
+
+    def __init__(self, max_entradas=1024):
+        self.max_entradas = max_entradas
+        self.epoca = uuid.uuid4().hex
+        self.inicio = time.time()
+        self._entradas = OrderedDict()
+        self._versiones = {}
+        self._modificado = {}
+        self._lock = threading.Lock()
+
+    def leer(self, clave):
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is not None:
+                self._entradas.move_to_end(clave)
+            return entrada
+
+    def escribir(self, clave, valor, expira, versiones):
+        with self._lock:
+            self._entradas[clave] = (valor, expira, versiones)
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+
+    def versiones(self, etiquetas):
+        with self._lock:
+            return {etiqueta: self._versiones.get(etiqueta, 0) for etiqueta in etiquetas}
+
+    def modificado(self, etiquetas):
+        """Último momento (epoch) en que se invalidó alguna de las etiquetas"""
+        with self._lock:
+            return max([self.inicio] + [self._modificado.get(etiqueta, 0) for etiqueta in etiquetas])
+
+    def invalidar(self, etiquetas):
+        ahora = time.time()
+        with self._lock:
+            for etiqueta in etiquetas:
+                self._versiones[etiqueta] = self._versiones.get(etiqueta, 0) + 1
+                self._modificado[etiqueta] = ahora
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+
+class BackendSQLite:
+    """Cache compartido entre procesos del mismo servidor en un archivo SQLite.
+
+    Las versiones de etiquetas viven en el mismo archivo, así que una
+    invalidación en un worker la ven todos los demás.
+    """
+
+    def __init__(self, ruta, max_entradas=10000):
+        self.ruta = ruta
+        self.max_entradas = max_entradas
+        self._local = threading.local()
+        directorio = os.path.dirname(ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        conexion = self._conexion()
+        conexion.execute('PRAGMA journal_mode=WAL')
+        conexion.execute(
+            'CREATE TABLE IF NOT EXISTS entradas ('
+            'clave TEXT PRIMARY KEY, valor BLOB NOT NULL, expira REAL NOT NULL, versiones TEXT NOT NULL)'
+        )
+        conexion.execute(
+            'CREATE TABLE IF NOT EXISTS etiquetas ('
+            'etiqueta TEXT PRIMARY KEY, version INTEGER NOT NULL, modificado REAL NOT NULL)'
+        )
+        conexion.execute('CREATE TABLE IF NOT EXISTS meta (id INTEGER PRIMARY KEY, epoca TEXT NOT NULL, inicio REAL NOT NULL)')
+        conexion.execute(
+            'INSERT OR IGNORE INTO meta (id, epoca, inicio) VALUES (1, ?, ?)', (uuid.uuid4().hex, time.time())
+        )
+        conexion.commit()
+        self.epoca, self.inicio = conexion.execute('SELECT epoca, inicio FROM meta WHERE id = 1').fetchone()
+
+    def _conexion(self):
+        conexion = getattr(self._local, 'conexion', None)
+        if conexion is None:
+            conexion = sqlite3.connect(self.ruta, timeout=5)
+            self._local.conexion = conexion
+        return conexion
+
+    def leer(self, clave):
+        fila = self._conexion().execute(
+            'SELECT valor, expira, versiones FROM entradas WHERE clave = ?', (clave,)
+        ).fetchone()
+        if fila is None:
+            return None
+        return (bytes(fila[0]), fila[1], json.loads(fila[2]))
+
+    def escribir(self, clave, valor, expira, versiones):
+        conexion = self._conexion()
+        with conexion:
+            conexion.execute(
+                'INSERT OR REPLACE INTO entradas (clave, valor, expira, versiones) VALUES (?, ?, ?, ?)',
+                (clave, valor, expira, json.dumps(versiones))
+            )
+            # Acotar tamaño: descartar primero las que vencen antes
+            conexion.execute(
+                'DELETE FROM entradas WHERE clave IN ('
+                'SELECT clave FROM entradas ORDER BY expira DESC LIMIT -1 OFFSET ?)',
+                (self.max_entradas,)
+            )
+
+    def versiones(self, etiquetas):
+        etiquetas = list(etiquetas)
+        if not etiquetas:
+            return {}
+        marcadores = ', '.join('?' * len(etiquetas))
+        filas = self._conexion().execute(
+            f'SELECT etiqueta, version FROM etiquetas WHERE etiqueta IN ({marcadores})', etiquetas
+        ).fetchall()
+        actuales = dict(filas)
+        return {etiqueta: actuales.get(etiqueta, 0) for etiqueta in etiquetas}
+
+    def modificado(self, etiquetas):
+        """Último momento (epoch) en que se invalidó alguna de las etiquetas"""
+        etiquetas = list(etiquetas)
+        if not etiquetas:
+            return self.inicio
+        marcadores = ', '.join('?' * len(etiquetas))
+        fila = self._conexion().execute(
+            f'SELECT MAX(modificado) FROM etiquetas WHERE etiqueta IN ({marcadores})', etiquetas
+        ).fetchone()
+        return max(self.inicio, fila[0] or 0)
+
+    def invalidar(self, etiquetas):
+        ahora = time.time()
+        conexion = self._conexion()
+        with conexion:
+            conexion.executemany(
+                'INSERT INTO etiquetas (etiqueta, version, modificado) VALUES (?, 1, ?) '
+                'ON CONFLICT(etiqueta) DO UPDATE SET version = version + 1, modificado = excluded.modificado',
+                [(etiqueta, ahora) for etiqueta in etiquetas]
+            )
+
+    def limpiar(self):
+        conexion = self._conexion()
+        with conexion:
+            conexion.execute('DELETE FROM entradas')
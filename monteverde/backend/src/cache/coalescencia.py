@@ -0,0 +1,63 @@
+import threading
+from functools import wraps
+from flask import request, make_response, current_app
+
+class _Vuelo:
+    """Cálculo en curso de una llave; los seguidores esperan en 'listo'"""
+
+    def __init__(self):
+        self.listo = threading.Event()
+        self.resultado = None  # (cuerpo, status, headers) o None si no se puede compartir
+
+class Coalescedor:
+    """Single-flight para vistas GET dentro de un worker.
+
+    Requests idénticos concurrentes (misma ruta, mismos parámetros y mismo
+    Authorization) comparten una sola ejecución de la vista: el primero la
+    calcula y los demás reciben una copia de su respuesta. Si el líder no
+    termina en COALESCER_ESPERA_MAX segundos, o su respuesta es un stream,
+    cada seguidor ejecuta la vista por su cuenta.
+    """
+
+    def __init__(self):
+        self._vuelos = {}
+        self._lock = threading.Lock()
+
+    def coalescido(self, vista):
+        @wraps(vista)
+        def envoltura(*args, **kwargs):
+            if request.method != 'GET':
+                return vista(*args, **kwargs)
+
+            clave = _clave_vuelo()
+            with self._lock:
+                vuelo = self._vuelos.get(clave)
+                lider = vuelo is None
+                if lider:
+                    vuelo = self._vuelos[clave] = _Vuelo()
+
+            if not lider:
+                espera = current_app.config.get('COALESCER_ESPERA_MAX', 10.0)
+                if vuelo.listo.wait(espera) and vuelo.resultado is not None:
+                    cuerpo, status, headers = vuelo.resultado
+                    return current_app.response_class(cuerpo, status=status, headers=headers)
+                return vista(*args, **kwargs)
+
+            try:
+                respuesta = make_response(vista(*args, **kwargs))
+                if not respuesta.is_streamed:
+                    headers = [(k, v) for k, v in respuesta.headers if k.lower() != 'content-length']
+                    vuelo.resultado = (respuesta.get_data(), respuesta.status_code, headers)
+                return respuesta
+            finally:
+                with self._lock:
+                    del self._vuelos[clave]
+                vuelo.listo.set()
+        return envoltura
+
+def _clave_vuelo():
+    params = sorted(request.args.items(multi=True))
+    consulta = '&'.join(f'{k}={v}' for k, v in params)
+    return (request.path, consulta, request.headers.get('Authorization', ''))
+
+coalescedor = Coalescedor()
@@ -0,0 +1,119 @@
+import hmac
+import time
+from flask import request, g, has_request_context, current_app, jsonify
+from sqlalchemy import event
+from src.instrumentacion.metricas import Registro, BUCKETS_CONSULTAS
+from src.instrumentacion.consultas import (
+    detector, presupuesto_consultas, limite_consultas, normalizar_sentencia, ConsultasExcedidas
+)
+from src.instrumentacion.lentas import registro_lentas
+from src.instrumentacion.perfilador import perfilador
+
+FUERA_DE_REQUEST = '(fuera de request)'
+
+_LOCALES = ('127.0.0.1', '::1')
+
+class Instrumentacion:
+    """Métricas por endpoint: latencia, tiempo en BD, consultas y filas.
+
+    Se alimenta de los eventos before/after_cursor_execute del engine y de
+    los hooks de request de Flask, y se expone en /metrics en formato de
+    texto de Prometheus. Los valores son por proceso (cada worker expone los
+    suyos). En respuestas en streaming la latencia se mide hasta que la
+    vista retorna, no hasta el último byte.
+    """
+
+    def __init__(self, app=None):
+        self.activo = False
+        self.registro = Registro()
+        self.requests = self.registro.contador(
+            'monteverde_http_requests_total', 'Requests atendidos', ('endpoint', 'metodo', 'estado'))
+        self.latencia = self.registro.histograma(
+            'monteverde_http_request_duration_seconds', 'Latencia de la vista por endpoint', ('endpoint', 'metodo'))
+        self.tiempo_bd = self.registro.histograma(
+            'monteverde_db_time_per_request_seconds', 'Tiempo total en la base por request', ('endpoint',))
+        self.consultas_request = self.registro.histograma(
+            'monteverde_db_queries_per_request', 'Consultas SQL por request', ('endpoint',), buckets=BUCKETS_CONSULTAS)
+        self.consultas = self.registro.contador(
+            'monteverde_db_queries_total', 'Consultas SQL ejecutadas', ('endpoint',))
+        self.segundos_bd = self.registro.contador(
+            'monteverde_db_time_seconds_total', 'Segundos acumulados en la base', ('endpoint',))
+        self.filas = self.registro.contador(
+            'monteverde_db_rows_total', 'Filas retornadas por SELECT', ('endpoint',))
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.activo = app.config.get('METRICAS_ACTIVAS', True)
+        if not self.activo:
+            return
+        from src.extensions import db
+        with app.app_context():
+            self.escuchar_engine(db.engine)
+        app.before_request(self._inicio_request)
+        app.after_request(self._fin_request)
+        app.add_url_rule('/metrics', 'metrics', self._exponer, methods=['GET'])
+
+    def escuchar_engine(self, engine):
+        event.listen(engine, 'before_cursor_execute', self._antes_de_consulta)
+        event.listen(engine, 'after_cursor_execute', self._despues_de_consulta)
+
+    def _antes_de_consulta(self, conexion, cursor, sentencia, parametros, contexto, executemany):
+        conexion.info.setdefault('_instrumentacion_inicio', []).append(time.perf_counter())
+
+    def _despues_de_consulta(self, conexion, cursor, sentencia, parametros, contexto, executemany):
+        inicios = conexion.info.get('_instrumentacion_inicio')
+        if not inicios:
+            return
+        duracion = time.perf_counter() - inicios.pop()
+        # Con cursor en buffer (PyMySQL por defecto) rowcount de un SELECT son las filas leídas
+        filas = max(cursor.rowcount, 0) if cursor.description is not None else 0
+
+        if has_request_context() and '_instr_inicio' in g:
+            g._instr_consultas += 1
+            g._instr_tiempo_bd += duracion
+            g._instr_filas += filas
+        else:
+            endpoint = (FUERA_DE_REQUEST,)
+            self.consultas.sumar(endpoint)
+            self.segundos_bd.sumar(endpoint, duracion)
+            self.filas.sumar(endpoint, filas)
+
+    def _inicio_request(self):
+        g._instr_inicio = time.perf_counter()
+        g._instr_consultas = 0
+        g._instr_tiempo_bd = 0.0
+        g._instr_filas = 0
+
+    def _fin_request(self, respuesta):
+        if '_instr_inicio' not in g:
+            return respuesta
+        duracion = time.perf_counter() - g._instr_inicio
+        endpoint = request.endpoint or '(sin ruta)'
+        self.requests.sumar((endpoint, request.method, str(respuesta.status_code)))
+        self.latencia.observar((endpoint, request.method), duracion)
+        self.tiempo_bd.observar((endpoint,), g._instr_tiempo_bd)
+        self.consultas_request.observar((endpoint,), g._instr_consultas)
+        self.consultas.sumar((endpoint,), g._instr_consultas)
+        self.segundos_bd.sumar((endpoint,), g._instr_tiempo_bd)
+        self.filas.sumar((endpoint,), g._instr_filas)
+        # Las consultas posteriores (p.ej. durante un stream) ya no se atribuyen al request
+        g.pop('_instr_inicio')
+        return respuesta
+
+    def _exponer(self):
+        """Con METRICAS_TOKEN exige 'Authorization: Bearer <token>'; sin token solo
+        responde a conexiones locales directas (no reenviadas por un proxy)"""
+        token = current_app.config.get('METRICAS_TOKEN')
+        if token:
+            recibido = request.headers.get('Authorization', '')
+            if not hmac.compare_digest(recibido, f'Bearer {token}'):
+                return jsonify({'success': False, 'message': 'No autorizado'}), 401
+        elif request.remote_addr not in _LOCALES or 'X-Forwarded-For' in request.headers:
+            return jsonify({'success': False, 'message': 'Métricas solo desde localhost sin METRICAS_TOKEN'}), 403
+        return current_app.response_class(
+            self.registro.exponer(),
+            content_type='text/plain; version=0.0.4; charset=utf-8'
+        )
+
+instrumentacion = Instrumentacion()
@@ -0,0 +1,131 @@
+import re
+from collections import Counter
+from contextlib import contextmanager
+from flask import request, g, current_app
+from sqlalchemy import event
+
+_LITERALES = [
+    (re.compile(r"'(?:[^'\\]|\\.|'')*'"), '?'),
+    (re.compile(r'\b\d+(?:\.\d+)?\b'), '?'),
+    (re.compile(r'%s|%\(\w+\)s|:\w+|\?'), '?'),
+    # IN (?, ?, ?) y VALUES (...), (...) con cualquier cantidad de elementos
+    (re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)'), '(?)'),
+    (re.compile(r'\(\?\)(?:\s*,\s*\(\?\))+'), '(?)'),
+    (re.compile(r'\s+'), ' ')
+]
+
+class ConsultasExcedidas(AssertionError):
+    """Un request o bloque superó su presupuesto de consultas o repitió una forma (N+1)"""
+
+def normalizar_sentencia(sentencia):
+    """Forma de una sentencia SQL: literales y parámetros como '?', listas IN colapsadas"""
+    for patron, reemplazo in _LITERALES:
+        sentencia = patron.sub(reemplazo, sentencia)
+    return sentencia.strip()
+
+def analizar(sentencias, maximo=None, repeticiones=None):
+    """Problemas de una lista de sentencias: total sobre el máximo y formas repetidas.
+
+    Retorna una lista de textos (vacía si está todo bien).
+    """
+    problemas = []
+    if maximo is not None and len(sentencias) > maximo:
+        problemas.append(f'{len(sentencias)} consultas (presupuesto {maximo})')
+    if repeticiones is not None:
+        for forma, veces in Counter(normalizar_sentencia(s) for s in sentencias).most_common():
+            if veces <= repeticiones:
+                break
+            problemas.append(f'{veces}x (posible N+1): {forma[:200]}')
+    return problemas
+
+def presupuesto_consultas(maximo, repeticiones=None):
+    """Declarar el máximo de consultas SQL de una vista (y opcionalmente de repeticiones).
+
+    Solo tiene efecto con CONSULTAS_DETECTOR activo; sin repeticiones se
+    usa CONSULTAS_REPETICIONES_MAX.
+    """
+    def decorador(vista):
+        vista._presupuesto_consultas = (maximo, repeticiones)
+        return vista
+    return decorador
+
+class DetectorConsultas:
+    """Detector de N+1 y de presupuestos de consultas por request (desarrollo y tests).
+
+    Guarda las sentencias de cada request y al terminar las agrupa por forma
+    normalizada: una forma que se repite más de CONSULTAS_REPETICIONES_MAX
+    veces, o un total sobre el presupuesto declarado con
+    @presupuesto_consultas, se reporta en consola. Con CONSULTAS_ESTRICTO el
+    request falla con ConsultasExcedidas. Desactivado no registra nada.
+    """
+
+    def __init__(self, app=None):
+        self.activo = False
+        self.repeticiones = 5
+        self.estricto = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.activo = app.config.get('CONSULTAS_DETECTOR', False)
+        if not self.activo:
+            return
+        self.repeticiones = app.config.get('CONSULTAS_REPETICIONES_MAX', 5)
+        self.estricto = app.config.get('CONSULTAS_ESTRICTO', False)
+        from src.extensions import db
+        with app.app_context():
+            event.listen(db.engine, 'before_cursor_execute', self._al_ejecutar)
+        app.before_request(self._inicio_request)
+        app.after_request(self._fin_request)
+
+    def _al_ejecutar(self, conexion, cursor, sentencia, parametros, contexto, executemany):
+        sentencias = g.get('_consultas_sentencias') if g else None
+        if sentencias is not None:
+            sentencias.append(sentencia)
+
+    def _inicio_request(self):
+        g._consultas_sentencias = []
+
+    def _fin_request(self, respuesta):
+        sentencias = g.pop('_consultas_sentencias', None)
+        if sentencias is None:
+            return respuesta
+        vista = current_app.view_functions.get(request.endpoint)
+        maximo, repeticiones = getattr(vista, '_presupuesto_consultas', (None, None))
+        problemas = analizar(sentencias, maximo, repeticiones if repeticiones is not None else self.repeticiones)
+        respuesta.headers['X-Consultas'] = str(len(sentencias))
+        if problemas:
+            detalle = '; '.join(problemas)
+            print(f"⚠️ Consultas {request.method} {request.path} ({request.endpoint}): {detalle}")
+            if self.estricto:
+                raise ConsultasExcedidas(f'{request.endpoint}: {detalle}')
+        return respuesta
+
+@contextmanager
+def limite_consultas(maximo=None, repeticiones=None, engine=None):
+    """Helper de tests: falla si el bloque ejecuta más de 'maximo' consultas o repite una forma.
+
+        with limite_consultas(3, repeticiones=1):
+            cliente.get('/api/docente/dashboard/1')
+
+    Escucha el engine directamente, así que funciona con o sin
+    CONSULTAS_DETECTOR. Entrega la lista de sentencias capturadas.
+    """
+    if engine is None:
+        from src.extensions import db
+        engine = db.engine
+    sentencias = []
+
+    def capturar(conexion, cursor, sentencia, parametros, contexto, executemany):
+        sentencias.append(sentencia)
+
+    event.listen(engine, 'before_cursor_execute', capturar)
+    try:
+        yield sentencias
+    finally:
+        event.remove(engine, 'before_cursor_execute', capturar)
+    problemas = analizar(sentencias, maximo, repeticiones)
+    if problemas:
+        raise ConsultasExcedidas('; '.join(problemas))
+
+detector = DetectorConsultas()
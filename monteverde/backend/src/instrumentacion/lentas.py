@@ -0,0 +1,208 @@
+import glob
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import date, datetime
+from decimal import Decimal
+from logging.handlers import RotatingFileHandler
+from flask import request, has_request_context
+from sqlalchemy import event
+from src.instrumentacion.consultas import normalizar_sentencia
+
+# Sentencias que admiten EXPLAIN
+_EXPLICABLES = ('select', 'update', 'delete', 'insert', 'replace', 'with')
+
+def redactar(parametros):
+    """Parámetros para el log: números, fechas y booleanos tal cual; textos solo su largo"""
+    def valor(v):
+        if v is None or isinstance(v, (bool, int, float, Decimal)):
+            return v if not isinstance(v, Decimal) else str(v)
+        if isinstance(v, (date, datetime)):
+            return v.isoformat()
+        if isinstance(v, (str, bytes)):
+            return f'<{type(v).__name__} len={len(v)}>'
+        return f'<{type(v).__name__}>'
+
+    if isinstance(parametros, dict):
+        return {k: valor(v) for k, v in parametros.items()}
+    if isinstance(parametros, (list, tuple)):
+        return [valor(v) for v in parametros]
+    return valor(parametros)
+
+class RegistroLentas:
+    """Log de consultas lentas con EXPLAIN automático.
+
+    Toda sentencia que tarda CONSULTAS_LENTAS_MS o más se encola con su
+    forma normalizada, parámetros redactados y el endpoint que la ejecutó.
+    Un hilo aparte corre EXPLAIN en otra conexión del pool (una vez por
+    forma cada CONSULTAS_LENTAS_EXPLAIN_CADA segundos) y escribe una línea
+    JSON en un archivo rotativo; el request nunca espera al EXPLAIN.
+    """
+
+    def __init__(self, app=None):
+        self.activo = False
+        self.engine = None
+        self.umbral = 0.2
+        self.explain_cada = 300
+        self.ruta = None
+        self._cola = queue.Queue(maxsize=200)
+        self._explicadas = {}
+        self._hilo = None
+        self._lock = threading.Lock()
+        self._logger = None
+        self._max_bytes = 5 * 1024 * 1024
+        self._respaldos = 3
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        umbral_ms = app.config.get('CONSULTAS_LENTAS_MS')
+        self.activo = bool(umbral_ms)
+        if not self.activo:
+            return
+        self.umbral = umbral_ms / 1000.0
+        self.explain_cada = app.config.get('CONSULTAS_LENTAS_EXPLAIN_CADA', 300)
+        self.ruta = app.config['CONSULTAS_LENTAS_ARCHIVO']
+        self._max_bytes = app.config.get('CONSULTAS_LENTAS_MAX_BYTES', 5 * 1024 * 1024)
+        self._respaldos = app.config.get('CONSULTAS_LENTAS_RESPALDOS', 3)
+
+        from src.extensions import db
+        with app.app_context():
+            self.engine = db.engine
+        event.listen(self.engine, 'before_cursor_execute', self._antes)
+        event.listen(self.engine, 'after_cursor_execute', self._despues)
+
+    def _antes(self, conexion, cursor, sentencia, parametros, contexto, executemany):
+        conexion.info.setdefault('_lentas_inicio', []).append(time.perf_counter())
+
+    def _despues(self, conexion, cursor, sentencia, parametros, contexto, executemany):
+        inicios = conexion.info.get('_lentas_inicio')
+        if not inicios:
+            return
+        duracion = time.perf_counter() - inicios.pop()
+        if duracion < self.umbral or conexion.get_execution_options().get('consultas_lentas_omitir'):
+            return
+
+        entrada = {
+            'fecha': datetime.now().isoformat(timespec='seconds'),
+            'duracion_ms': round(duracion * 1000, 1),
+            'forma': normalizar_sentencia(sentencia),
+            'parametros': None if executemany else redactar(parametros),
+            'filas': cursor.rowcount,
+            'endpoint': None
+        }
+        if has_request_context():
+            entrada['endpoint'] = f'{request.method} {request.endpoint or request.path}'
+        try:
+            # La sentencia y los parámetros reales solo viajan en memoria, para el EXPLAIN
+            self._cola.put_nowait((entrada, sentencia, None if executemany else parametros))
+        except queue.Full:
+            return
+        self._iniciar_hilo()
+
+    def _iniciar_hilo(self):
+        if self._hilo is not None:
+            return
+        with self._lock:
+            if self._hilo is None:
+                self._hilo = threading.Thread(target=self._ciclo, name='consultas-lentas', daemon=True)
+                self._hilo.start()
+
+    def _abrir_log(self):
+        """Logger del archivo rotativo; el directorio y el archivo se crean con la primera entrada"""
+        if self._logger is not None:
+            return self._logger
+        os.makedirs(os.path.dirname(os.path.abspath(self.ruta)), exist_ok=True)
+        logger = logging.getLogger('monteverde.consultas_lentas')
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        if not logger.handlers:
+            manejador = RotatingFileHandler(self.ruta, maxBytes=self._max_bytes, backupCount=self._respaldos, encoding='utf-8')
+            manejador.setFormatter(logging.Formatter('%(message)s'))
+            logger.addHandler(manejador)
+        self._logger = logger
+        return logger
+
+    def _ciclo(self):
+        while True:
+            entrada, sentencia, parametros = self._cola.get()
+            try:
+                entrada['explain'] = self._explicar(entrada['forma'], sentencia, parametros)
+                self._abrir_log().info(json.dumps(entrada, ensure_ascii=False, default=str))
+            except Exception as e:
+                print(f"⚠️ Error registrando consulta lenta: {e}")
+
+    def _explicar(self, forma, sentencia, parametros):
+        """EXPLAIN en una conexión aparte; None si no aplica o ya se explicó hace poco"""
+        if parametros is None or sentencia.lstrip().split(None, 1)[0].lower() not in _EXPLICABLES:
+            return None
+        ahora = time.monotonic()
+        ultima = self._explicadas.get(forma)
+        if ultima is not None and ahora - ultima < self.explain_cada:
+            return None
+        self._explicadas[forma] = ahora
+
+        prefijo = 'EXPLAIN QUERY PLAN ' if self.engine.dialect.name == 'sqlite' else 'EXPLAIN '
+        with self.engine.connect().execution_options(consultas_lentas_omitir=True) as conexion:
+            resultado = conexion.exec_driver_sql(prefijo + sentencia, parametros)
+            columnas = list(resultado.keys())
+            filas = [dict(zip(columnas, fila)) for fila in resultado]
+            # EXPLAIN de un INSERT/UPDATE no debe dejar nada abierto
+            conexion.rollback()
+        return filas
+
+    def archivos(self):
+        """Archivo actual y respaldos rotados"""
+        if not self.ruta:
+            return []
+        return [self.ruta] + sorted(glob.glob(self.ruta + '.*'))
+
+    def top(self, limite=20, orden='total'):
+        """Agregado por forma de las entradas del archivo (todas las rotaciones).
+
+        Al leer del archivo incluye las consultas de todos los workers.
+        orden: 'total' (tiempo acumulado), 'max' o 'veces'.
+        """
+        grupos = {}
+        for ruta in self.archivos():
+            if not os.path.exists(ruta):
+                continue
+            with open(ruta, encoding='utf-8') as archivo:
+                for linea in archivo:
+                    try:
+                        entrada = json.loads(linea)
+                    except ValueError:
+                        continue
+                    grupo = grupos.get(entrada['forma'])
+                    if grupo is None:
+                        grupo = grupos[entrada['forma']] = {
+                            'forma': entrada['forma'],
+                            'veces': 0,
+                            'total_ms': 0.0,
+                            'max_ms': 0.0,
+                            'ultima': None,
+                            'endpoints': {},
+                            'explain': None
+                        }
+                    grupo['veces'] += 1
+                    grupo['total_ms'] += entrada['duracion_ms']
+                    grupo['max_ms'] = max(grupo['max_ms'], entrada['duracion_ms'])
+                    if grupo['ultima'] is None or entrada['fecha'] > grupo['ultima']:
+                        grupo['ultima'] = entrada['fecha']
+                        grupo['parametros'] = entrada.get('parametros')
+                    if entrada.get('endpoint'):
+                        grupo['endpoints'][entrada['endpoint']] = grupo['endpoints'].get(entrada['endpoint'], 0) + 1
+                    if entrada.get('explain') is not None:
+                        grupo['explain'] = entrada['explain']
+
+        clave = {'total': 'total_ms', 'max': 'max_ms', 'veces': 'veces'}.get(orden, 'total_ms')
+        resultado = sorted(grupos.values(), key=lambda g: g[clave], reverse=True)[:limite]
+        for grupo in resultado:
+            grupo['total_ms'] = round(grupo['total_ms'], 1)
+            grupo['promedio_ms'] = round(grupo['total_ms'] / grupo['veces'], 1)
+        return resultado
+
+registro_lentas = RegistroLentas()
@@ -0,0 +1,105 @@
+import threading
+
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_CONSULTAS = (1, 2, 5, 10, 20, 50, 100, 200)
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _etiquetas(nombres, valores, extra=None):
+    pares = [f'{n}="{_escapar(v)}"' for n, v in zip(nombres, valores)]
+    if extra:
+        pares.append(extra)
+    return '{' + ','.join(pares) + '}' if pares else ''
+
+def _numero(valor):
+    if isinstance(valor, float):
+        return repr(valor) if valor != int(valor) else f'{valor:.1f}'
+    return str(valor)
+
+class Contador:
+    """Contador monótono con etiquetas (counter de Prometheus)"""
+
+    tipo = 'counter'
+
+    def __init__(self, nombre, ayuda, etiquetas=()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self._valores = {}
+        self._lock = threading.Lock()
+
+    def sumar(self, valores, cantidad=1):
+        with self._lock:
+            self._valores[valores] = self._valores.get(valores, 0) + cantidad
+
+    def lineas(self):
+        with self._lock:
+            valores = sorted(self._valores.items())
+        for clave, total in valores:
+            yield f'{self.nombre}{_etiquetas(self.etiquetas, clave)} {_numero(total)}'
+
+class Histograma:
+    """Histograma con buckets fijos y etiquetas (histogram de Prometheus)"""
+
+    tipo = 'histogram'
+
+    def __init__(self, nombre, ayuda, etiquetas=(), buckets=BUCKETS_LATENCIA):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observar(self, valores, valor):
+        with self._lock:
+            serie = self._series.get(valores)
+            if serie is None:
+                # [conteo por bucket..., suma, total]
+                serie = self._series[valores] = [0] * len(self.buckets) + [0.0, 0]
+            for i, limite in enumerate(self.buckets):
+                if valor <= limite:
+                    serie[i] += 1
+                    break
+            serie[-2] += valor
+            serie[-1] += 1
+
+    def lineas(self):
+        with self._lock:
+            series = sorted((clave, list(serie)) for clave, serie in self._series.items())
+        for clave, serie in series:
+            acumulado = 0
+            for limite, conteo in zip(self.buckets, serie):
+                acumulado += conteo
+                le = 'le="%s"' % _numero(limite)
+                yield f'{self.nombre}_bucket{_etiquetas(self.etiquetas, clave, le)} {acumulado}'
+            le = 'le="+Inf"'
+            yield f'{self.nombre}_bucket{_etiquetas(self.etiquetas, clave, le)} {serie[-1]}'
+            yield f'{self.nombre}_sum{_etiquetas(self.etiquetas, clave)} {_numero(serie[-2])}'
+            yield f'{self.nombre}_count{_etiquetas(self.etiquetas, clave)} {serie[-1]}'
+
+class Registro:
+    """Conjunto de métricas que se exponen juntas en /metrics"""
+
+    def __init__(self):
+        self._metricas = []
+
+    def contador(self, *args, **kwargs):
+        metrica = Contador(*args, **kwargs)
+        self._metricas.append(metrica)
+        return metrica
+
+    def histograma(self, *args, **kwargs):
+        metrica = Histograma(*args, **kwargs)
+        self._metricas.append(metrica)
+        return metrica
+
+    def exponer(self):
+        """Formato de texto de Prometheus (versión 0.0.4)"""
+        salida = []
+        for metrica in self._metricas:
+            salida.append(f'# HELP {metrica.nombre} {metrica.ayuda}')
+            salida.append(f'# TYPE {metrica.nombre} {metrica.tipo}')
+            salida.extend(metrica.lineas())
+        return '\n'.join(salida) + '\n'
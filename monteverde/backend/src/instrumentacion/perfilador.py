@@ -0,0 +1,199 @@
+import cProfile
+import hashlib
+import hmac
+import json
+import os
+import pstats
+import threading
+import time
+import uuid
+from datetime import datetime
+from flask import request, g
+
+ENCABEZADO = 'X-Perfilar'
+PARAMETRO = '_perfilar'
+
+# Funciones cuyo tiempo acumulado se reporta por separado: (parte de la ruta del archivo, nombre)
+_SQL = (
+    ('sqlalchemy/engine/default.py', 'do_execute'),
+    ('sqlalchemy/engine/default.py', 'do_executemany'),
+    ('sqlalchemy/engine/default.py', 'do_execute_no_params')
+)
+_SERIALIZACION = (
+    ('flask/json/__init__.py', 'jsonify'),
+    ('src/utils/serialization.py', '__call__'),
+    ('src/models/', 'to_dict')
+)
+
+def _coincide(funcion, patrones):
+    archivo, _, nombre = funcion
+    archivo = archivo.replace(os.sep, '/')
+    return any(nombre == n and a in archivo for a, n in patrones)
+
+def resumir(estadisticas, total):
+    """Separar el tiempo del request en SQL, serialización y resto de Python"""
+    sql = serializacion = 0.0
+    consultas = 0
+    for funcion, (_, llamadas, _, acumulado, _) in estadisticas.stats.items():
+        if _coincide(funcion, _SQL):
+            sql += acumulado
+            consultas += llamadas
+        elif _coincide(funcion, _SERIALIZACION):
+            serializacion += acumulado
+    return {
+        'total_ms': round(total * 1000, 1),
+        'sql_ms': round(sql * 1000, 1),
+        'serializacion_ms': round(serializacion * 1000, 1),
+        'python_ms': round(max(total - sql - serializacion, 0) * 1000, 1),
+        'consultas': consultas
+    }
+
+def _top_funciones(estadisticas, cantidad=25):
+    filas = sorted(estadisticas.stats.items(), key=lambda item: item[1][3], reverse=True)[:cantidad]
+    return [{
+        'funcion': f'{os.path.basename(archivo)}:{linea}({nombre})',
+        'llamadas': llamadas,
+        'propio_ms': round(propio * 1000, 2),
+        'acumulado_ms': round(acumulado * 1000, 2)
+    } for (archivo, linea, nombre), (_, llamadas, propio, acumulado, _) in filas]
+
+class Perfilador:
+    """Perfilado opt-in de un request puntual con cProfile.
+
+    Se activa solo si el request trae el encabezado X-Perfilar (o el
+    parámetro _perfilar) con un token firmado por un admin (firmar()). El
+    perfil completo se guarda como .prof (pstats; se abre con snakeviz o
+    flameprof para ver el flame graph) junto a un .json con el resumen de
+    tiempo SQL / serialización / Python. Apagado no agrega nada a la ruta
+    de un request normal salvo mirar si el encabezado está presente.
+    """
+
+    def __init__(self, app=None):
+        self.activo = False
+        self.directorio = None
+        self.maximo = 50
+        self._secreto = b''
+        # cProfile admite un solo perfilador activo por proceso (3.12+ falla con ValueError)
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.activo = app.config.get('PERFILADOR_ACTIVO', False)
+        if not self.activo:
+            return
+        self.directorio = app.config['PERFILADOR_DIRECTORIO']
+        self.maximo = app.config.get('PERFILADOR_MAX_PERFILES', 50)
+        self._secreto = str(app.config['SECRET_KEY']).encode('utf-8')
+        app.before_request(self._inicio_request)
+        app.after_request(self._fin_request)
+        app.teardown_request(self._descartar)
+
+    def firmar(self, segundos=900):
+        """Token para el encabezado X-Perfilar, válido por 'segundos'"""
+        expira = str(int(time.time()) + int(segundos))
+        firma = hmac.new(self._secreto, f'perfilar:{expira}'.encode('ascii'), hashlib.sha256).hexdigest()
+        return f'{expira}.{firma}'
+
+    def verificar(self, token):
+        expira, _, firma = (token or '').partition('.')
+        if not expira.isdigit() or int(expira) < time.time():
+            return False
+        esperada = hmac.new(self._secreto, f'perfilar:{expira}'.encode('ascii'), hashlib.sha256).hexdigest()
+        return hmac.compare_digest(firma, esperada)
+
+    def _inicio_request(self):
+        token = request.headers.get(ENCABEZADO) or request.args.get(PARAMETRO)
+        if token is None or not self.verificar(token):
+            return
+        # Si ya hay otro request perfilándose, este corre sin perfil
+        if not self._lock.acquire(blocking=False):
+            print(f"⚠️ Perfil omitido en {request.path}: hay otro request perfilándose")
+            return
+        perfilador = cProfile.Profile()
+        try:
+            perfilador.enable()
+        except ValueError:
+            self._lock.release()
+            return
+        g._perfil = (perfilador, time.perf_counter())
+
+    def _fin_request(self, respuesta):
+        perfil = g.pop('_perfil', None)
+        if perfil is None:
+            return respuesta
+        perfilador, inicio = perfil
+        perfilador.disable()
+        self._lock.release()
+        total = time.perf_counter() - inicio
+        try:
+            respuesta.headers['X-Perfil-Id'] = self._guardar(perfilador, total, respuesta)
+        except Exception as e:
+            print(f"⚠️ Error guardando perfil: {e}")
+        return respuesta
+
+    def _descartar(self, error):
+        """Si el request terminó en excepción no pasa por after_request: soltar el perfil"""
+        perfil = g.pop('_perfil', None)
+        if perfil is not None:
+            perfil[0].disable()
+            self._lock.release()
+
+    def _guardar(self, perfilador, total, respuesta):
+        perfil_id = datetime.now().strftime('%Y%m%dT%H%M%S') + '-' + uuid.uuid4().hex[:8]
+        estadisticas = pstats.Stats(perfilador)
+        os.makedirs(self.directorio, exist_ok=True)
+        estadisticas.dump_stats(os.path.join(self.directorio, f'{perfil_id}.prof'))
+        resumen = {
+            'id': perfil_id,
+            'fecha': datetime.now().isoformat(timespec='seconds'),
+            'metodo': request.method,
+            'ruta': request.path,
+            'parametros': {k: v for k, v in request.args.items() if k != PARAMETRO},
+            'endpoint': request.endpoint,
+            'estado': respuesta.status_code,
+            **resumir(estadisticas, total),
+            'funciones': _top_funciones(estadisticas)
+        }
+        with open(os.path.join(self.directorio, f'{perfil_id}.json'), 'w', encoding='utf-8') as archivo:
+            json.dump(resumen, archivo, ensure_ascii=False, indent=2)
+        self._descartar_antiguos()
+        print(f"🔬 Perfil {perfil_id}: {resumen['total_ms']} ms ({resumen['sql_ms']} ms SQL) en {request.path}")
+        return perfil_id
+
+    def _descartar_antiguos(self):
+        ids = sorted(n[:-5] for n in os.listdir(self.directorio) if n.endswith('.json'))
+        for perfil_id in ids[:-self.maximo]:
+            for extension in ('.json', '.prof'):
+                ruta = os.path.join(self.directorio, perfil_id + extension)
+                if os.path.exists(ruta):
+                    os.remove(ruta)
+
+    def listar(self):
+        """Resúmenes (sin funciones) de los perfiles guardados, del más reciente al más antiguo"""
+        perfiles = []
+        if not os.path.isdir(self.directorio):
+            return perfiles
+        for nombre in sorted(os.listdir(self.directorio), reverse=True):
+            if nombre.endswith('.json'):
+                resumen = self.obtener(nombre[:-5])
+                if resumen is not None:
+                    resumen.pop('funciones', None)
+                    perfiles.append(resumen)
+        return perfiles
+
+    def obtener(self, perfil_id):
+        ruta = self.ruta(perfil_id, '.json')
+        if ruta is None:
+            return None
+        with open(ruta, encoding='utf-8') as archivo:
+            return json.load(archivo)
+
+    def ruta(self, perfil_id, extension='.prof'):
+        """Ruta de un archivo del perfil; None si no existe o el id no es válido"""
+        if not perfil_id or not all(c.isalnum() or c in '-T' for c in perfil_id):
+            return None
+        ruta = os.path.join(self.directorio, perfil_id + extension)
+        return ruta if os.path.exists(ruta) else None
+
+perfilador = Perfilador()
@@ -0,0 +1,97 @@
+from datetime import date
+from flask import current_app
+from sqlalchemy import select, and_, or_
+from src.extensions import db
+from src.models.asistencia import Asistencia
+from src.models.calificacion import Calificacion
+from src.models.estudiante import Estudiante
+from src.models.mensaje import Mensaje
+from src.models.observacion import Observacion
+from src.models.usuario import Usuario
+
+def consultas_criticas():
+    """Consultas de los endpoints más usados con el índice que deben aprovechar.
+
+    Cada entrada es (nombre, sentencia, índice_esperado, permitir_filesort).
+    Se permite filesort donde el orden lo impone otra tabla del join (nombre
+    del estudiante) o un OR de dos rangos, siempre sobre pocas filas.
+    """
+    return [
+        ('dashboard docente: mensajes no leídos',
+         select(Mensaje.id, Usuario.nombre).join(Usuario, Mensaje.emisor_id == Usuario.id).where(
+             Mensaje.receptor_id == 1, Mensaje.leido == False
+         ).limit(3),
+         'receptor_leido_fecha', False),
+        ('conversación entre dos usuarios',
+         select(Mensaje).where(or_(
+             and_(Mensaje.emisor_id == 1, Mensaje.receptor_id == 2),
+             and_(Mensaje.emisor_id == 2, Mensaje.receptor_id == 1)
+         )).order_by(Mensaje.fecha),
+         'emisor_receptor_fecha', True),
+        ('observaciones de un estudiante por fecha',
+         select(Observacion).where(
+             Observacion.estudiante_id == 1, Observacion.fecha >= date(date.today().year, 1, 1)
+         ).order_by(Observacion.fecha.desc()),
+         'estudiante_fecha', False),
+        ('asistencia por fecha',
+         select(Asistencia.id, Asistencia.estudiante_id, Asistencia.estado).where(Asistencia.fecha == date.today()),
+         'fecha_estudiante', False),
+        ('calificaciones por asignatura y periodo',
+         select(Calificacion.id, Calificacion.nota, Estudiante.nombre).join(
+             Estudiante, Calificacion.estudiante_id == Estudiante.id
+         ).where(
+             Calificacion.asignatura == 'Matemáticas', Calificacion.periodo == '2025-P1'
+         ).order_by(Estudiante.nombre),
+         'asignatura_periodo', True),
+        ('familias ordenadas por nombre',
+         select(Usuario.id, Usuario.nombre).where(Usuario.rol == 'familia').order_by(Usuario.nombre),
+         'rol_nombre', False),
+    ]
+
+def evaluar_plan(filas, indice, permitir_filesort=False, filas_min=1000):
+    """Problemas de un EXPLAIN de MySQL/MariaDB (lista de dicts por tabla).
+
+    Falla si el índice esperado no está entre los candidatos de ninguna
+    tabla, y, en tablas con al menos filas_min filas estimadas, si hay full
+    scan (type ALL), una tabla sin índice o filesort no permitido. Con menos
+    filas el optimizador puede preferir un scan y no se considera regresión.
+    """
+    problemas = []
+    candidatos = set()
+    for fila in filas:
+        for columna in ('possible_keys', 'key'):
+            candidatos.update(k for k in (fila.get(columna) or '').split(',') if k)
+        estimadas = int(fila.get('rows') or 0)
+        extra = fila.get('Extra') or ''
+        tabla = fila.get('table')
+        if estimadas < filas_min:
+            continue
+        if fila.get('type') == 'ALL':
+            problemas.append(f'full scan de {tabla} (~{estimadas} filas)')
+        elif not fila.get('key') and fila.get('type') not in (None, 'system', 'const'):
+            problemas.append(f'{tabla} sin índice')
+        if 'Using filesort' in extra and not permitir_filesort:
+            problemas.append(f'filesort en {tabla} (~{estimadas} filas)')
+    if indice and indice not in candidatos:
+        problemas.append(f'el índice {indice} no aparece en el plan (¿falta la migración?)')
+    return problemas
+
+def verificar_planes(filas_min=None):
+    """EXPLAIN de cada consulta crítica contra la base configurada.
+
+    Retorna una lista de (nombre, plan, problemas). Solo MySQL/MariaDB.
+    """
+    filas_min = filas_min if filas_min is not None else current_app.config.get('PLANES_FILAS_MIN', 1000)
+    engine = db.engine
+    if engine.dialect.name != 'mysql':
+        raise RuntimeError('La verificación de planes requiere MySQL/MariaDB')
+
+    resultados = []
+    with engine.connect() as conexion:
+        for nombre, sentencia, indice, permitir_filesort in consultas_criticas():
+            sql = str(sentencia.compile(dialect=engine.dialect, compile_kwargs={'literal_binds': True}))
+            resultado = conexion.exec_driver_sql('EXPLAIN ' + sql.replace('%', '%%'))
+            columnas = list(resultado.keys())
+            plan = [dict(zip(columnas, fila)) for fila in resultado]
+            resultados.append((nombre, plan, evaluar_plan(plan, indice, permitir_filesort, filas_min)))
+    return resultados
@@ -3,11 +3,19 @@ from datetime import date
 
 class Asistencia(db.Model):
     __tablename__ = 'asistencia'
+    __table_args__ = (
+        db.Index('fecha_estudiante', 'fecha', 'estudiante_id'),
+        db.Index('asistencia_actualizado', 'actualizado'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     estudiante_id = db.Column(db.Integer, db.ForeignKey('estudiantes.id'), nullable=False)
     fecha = db.Column(db.Date, nullable=False)
     estado = db.Column(db.Enum('PRESENTE', 'AUSENTE', 'TARDE', 'JUSTIFICADO'), nullable=False)
+    # Último alta o cambio (ON UPDATE en MySQL); marca de agua de los snapshots incrementales
+    actualizado = db.Column(db.DateTime, nullable=False, server_default=db.func.current_timestamp(), onupdate=db.func.current_timestamp())
+    
+    CAMPOS_DICT = ('id', 'estudiante_id', 'fecha', 'estado')
     
     def to_dict(self):
         return {
@@ -0,0 +1,37 @@
+from src.extensions import db
+
+# Resumen diario de asistencia por curso, mantenido por las escrituras de asistencia
+class AsistenciaDiaria(db.Model):
+    __tablename__ = 'asistencia_diaria'
+    __table_args__ = (
+        db.UniqueConstraint('curso_id', 'fecha', name='curso_fecha'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    curso_id = db.Column(db.Integer, db.ForeignKey('cursos.id'), nullable=False)
+    fecha = db.Column(db.Date, nullable=False)
+    presentes = db.Column(db.Integer, nullable=False, default=0)
+    ausentes = db.Column(db.Integer, nullable=False, default=0)
+    tardes = db.Column(db.Integer, nullable=False, default=0)
+    justificados = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<AsistenciaDiaria {self.curso_id} {self.fecha}>'
+
+    def por_estado(self):
+        """Conteos con las llaves del enum de asistencia (solo estados con registros)"""
+        conteos = {
+            'PRESENTE': self.presentes,
+            'AUSENTE': self.ausentes,
+            'TARDE': self.tardes,
+            'JUSTIFICADO': self.justificados
+        }
+        return {estado: cantidad for estado, cantidad in conteos.items() if cantidad}
+
+    def to_dict(self):
+        return {
+            'curso_id': self.curso_id,
+            'fecha': self.fecha.isoformat() if self.fecha else None,
+            'por_estado': self.por_estado(),
+            'registrados': self.presentes + self.ausentes + self.tardes + self.justificados
+        }
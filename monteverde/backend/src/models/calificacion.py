@@ -3,6 +3,10 @@ from datetime import datetime
 
 class Calificacion(db.Model):
     __tablename__ = 'calificaciones'
+    __table_args__ = (
+        db.Index('asignatura_periodo', 'asignatura', 'periodo', 'estudiante_id'),
+        db.Index('calificaciones_actualizado', 'actualizado'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     estudiante_id = db.Column(db.Integer, db.ForeignKey('estudiantes.id'), nullable=False)
@@ -10,10 +14,14 @@ class Calificacion(db.Model):
     periodo = db.Column(db.String(20), nullable=False)
     nota = db.Column(db.Float, nullable=False)  # ← Cambié Decimal por Float
     fecha_registro = db.Column(db.DateTime, default=datetime.utcnow)
+    # A diferencia de fecha_registro, cambia también cuando un upsert corrige la nota
+    actualizado = db.Column(db.DateTime, nullable=False, server_default=db.func.current_timestamp(), onupdate=db.func.current_timestamp())
     
     def __repr__(self):
         return f'<Calificacion {self.estudiante_id} - {self.asignatura}: {self.nota}>'
     
+    CAMPOS_DICT = ('id', 'estudiante_id', 'asignatura', 'periodo', 'nota', 'fecha_registro')
+    
     def to_dict(self):
         return {
             'id': self.id,
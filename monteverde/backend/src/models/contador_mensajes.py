@@ -0,0 +1,17 @@
+from src.extensions import db
+
+# Mensajes sin leer por usuario, mantenido al enviar y al marcar como leído
+class ContadorMensajes(db.Model):
+    __tablename__ = 'contadores_mensajes'
+
+    usuario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), primary_key=True)
+    no_leidos = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<ContadorMensajes {self.usuario_id}: {self.no_leidos}>'
+
+    def to_dict(self):
+        return {
+            'usuario_id': self.usuario_id,
+            'no_leidos': self.no_leidos
+        }
@@ -0,0 +1,38 @@
+from src.extensions import db
+
+# Resumen por par de usuarios (usuario_a_id < usuario_b_id) para la bandeja de entrada
+class Conversacion(db.Model):
+    __tablename__ = 'conversaciones'
+    __table_args__ = (
+        db.UniqueConstraint('usuario_a_id', 'usuario_b_id', name='par_usuarios'),
+        db.Index('bandeja_a', 'usuario_a_id', 'ultima_fecha'),
+        db.Index('bandeja_b', 'usuario_b_id', 'ultima_fecha'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    usuario_a_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=False)
+    usuario_b_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=False)
+    ultimo_mensaje_id = db.Column(db.Integer, db.ForeignKey('mensajes.id'), nullable=False)
+    ultima_fecha = db.Column(db.DateTime, nullable=False)
+    no_leidos_a = db.Column(db.Integer, nullable=False, default=0)  # Recibidos por usuario_a sin leer
+    no_leidos_b = db.Column(db.Integer, nullable=False, default=0)  # Recibidos por usuario_b sin leer
+
+    def __repr__(self):
+        return f'<Conversacion {self.usuario_a_id}-{self.usuario_b_id}>'
+
+    def to_dict(self, usuario_id=None):
+        """Serializar; con usuario_id se expresa desde el punto de vista de ese usuario"""
+        data = {
+            'id': self.id,
+            'usuario_a_id': self.usuario_a_id,
+            'usuario_b_id': self.usuario_b_id,
+            'ultimo_mensaje_id': self.ultimo_mensaje_id,
+            'ultima_fecha': self.ultima_fecha.isoformat() if self.ultima_fecha else None,
+            'no_leidos_a': self.no_leidos_a,
+            'no_leidos_b': self.no_leidos_b
+        }
+        if usuario_id is not None:
+            es_a = usuario_id == self.usuario_a_id
+            data['otro_usuario_id'] = self.usuario_b_id if es_a else self.usuario_a_id
+            data['no_leidos'] = self.no_leidos_a if es_a else self.no_leidos_b
+        return data
@@ -11,6 +11,8 @@ class Curso(db.Model):
     def __repr__(self):
         return f'<Curso {self.nombre}>'
     
+    CAMPOS_DICT = ('id', 'nombre', 'nivel', 'letra')
+    
     def to_dict(self):
         return {
             'id': self.id,
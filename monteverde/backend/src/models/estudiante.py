@@ -16,6 +16,8 @@ class Estudiante(db.Model):
     def __repr__(self):
         return f'<Estudiante {self.nombre}>'
     
+    CAMPOS_DICT = ('id', 'nombre', 'curso_id')
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -2,16 +2,22 @@ from .usuario import Usuario
 from .estudiante import Estudiante
 from .curso import Curso
 from .asistencia import Asistencia
+from .asistencia_diaria import AsistenciaDiaria
 from .calificacion import Calificacion
 from .mensaje import Mensaje
 from .observacion import Observacion
+from .conversacion import Conversacion
+from .contador_mensajes import ContadorMensajes
 
 __all__ = [
     'Usuario',
     'Estudiante', 
     'Curso',
     'Asistencia',
+    'AsistenciaDiaria',
     'Calificacion',
     'Mensaje',
-    'Observacion'
+    'Observacion',
+    'Conversacion',
+    'ContadorMensajes'
 ]
@@ -3,6 +3,10 @@ from datetime import datetime
 
 class Mensaje(db.Model):
     __tablename__ = 'mensajes'
+    __table_args__ = (
+        db.Index('receptor_leido_fecha', 'receptor_id', 'leido', 'fecha'),
+        db.Index('emisor_receptor_fecha', 'emisor_id', 'receptor_id', 'fecha'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     emisor_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=False)
@@ -19,6 +23,8 @@ class Mensaje(db.Model):
     def __repr__(self):
         return f'<Mensaje {self.id}: {self.asunto}>'
     
+    CAMPOS_DICT = ('id', 'emisor_id', 'receptor_id', 'asunto', 'cuerpo', 'fecha', 'leido')
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -3,6 +3,10 @@ from datetime import datetime
 
 class Observacion(db.Model):
     __tablename__ = 'observaciones'
+    __table_args__ = (
+        db.Index('estudiante_fecha', 'estudiante_id', 'fecha'),
+        db.Index('observaciones_actualizado', 'actualizado'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     estudiante_id = db.Column(db.Integer, db.ForeignKey('estudiantes.id'), nullable=False)
@@ -11,6 +15,7 @@ class Observacion(db.Model):
     # ✅ VERIFICAR que estos valores coincidan con tu BD:
     tipo = db.Column(db.Enum('POSITIVA', 'NEGATIVA', 'NEUTRAL'), nullable=False)  # O los valores que tengas
     detalle = db.Column(db.Text, nullable=False)
+    actualizado = db.Column(db.DateTime, nullable=False, server_default=db.func.current_timestamp(), onupdate=db.func.current_timestamp())
     
     # Relaciones
     docente = db.relationship('Usuario', backref='observaciones_creadas')
@@ -18,6 +23,8 @@ class Observacion(db.Model):
     def __repr__(self):
         return f'<Observacion {self.estudiante_id} - {self.tipo}>'
     
+    CAMPOS_DICT = ('id', 'estudiante_id', 'docente_id', 'fecha', 'tipo', 'detalle')
+    
     def to_dict(self):
         return {
             'id': self.id,
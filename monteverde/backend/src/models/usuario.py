@@ -5,6 +5,9 @@ from datetime import datetime
 
 class Usuario(db.Model):
     __tablename__ = 'usuarios'
+    __table_args__ = (
+        db.Index('rol_nombre', 'rol', 'nombre'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     nombre = db.Column(db.String(100), nullable=False)
@@ -27,6 +30,8 @@ class Usuario(db.Model):
         """Verificar contraseña"""
         return check_password_hash(self.password, password)
     
+    CAMPOS_DICT = ('id', 'nombre', 'email', 'rol', 'estudiante_id')
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -2,30 +2,37 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required
 from src.extensions import db
 from src.models.asistencia import Asistencia
-from src.models.estudiante import Estudiante
-from src.utils.auth_helpers import role_required, get_current_user
+from src.services.asistencia import (
+    ESTADOS_VALIDOS, estudiantes_existentes, normalizar_id, parsear_fecha, upsert_asistencias
+)
+from src.utils.auth_helpers import role_required, get_current_user, get_current_rol
+from src.utils.pagination import paginate_from_request
+from src.cache import cache
 from datetime import datetime, date
 
 asistencia_bp = Blueprint('asistencia', __name__, url_prefix='/asistencia')
 
 @asistencia_bp.route('/', methods=['GET'])
 @jwt_required()
+@cache.depende_de(['asistencia', 'usuarios'])
 def list_asistencia():
     """Listar registros de asistencia"""
     try:
-        current_user = get_current_user()
+        rol = get_current_rol()
         
         # Parámetros
         estudiante_id = request.args.get('estudiante_id', type=int)
         fecha = request.args.get('fecha')
         estado = request.args.get('estado')
-        page = request.args.get('page', 1, type=int)
-        per_page = min(request.args.get('per_page', 50, type=int), 100)
         
         query = Asistencia.query
         
         # Filtros según rol
-        if current_user.rol == 'familia':
+        if rol == 'familia':
+            # Solo las familias necesitan el usuario completo (estudiante_id)
+            current_user = get_current_user()
+            if not current_user:
+                return jsonify({'message': 'Usuario no encontrado'}), 404
             if not estudiante_id or current_user.estudiante_id != estudiante_id:
                 return jsonify({'message': 'Solo puedes ver asistencia de tu estudiante'}), 403
             query = query.filter_by(estudiante_id=estudiante_id)
@@ -47,13 +54,16 @@ def list_asistencia():
                 return jsonify({'message': f'Estado debe ser uno de: {estados_validos}'}), 400
             query = query.filter_by(estado=estado)
         
-        asistencias = query.order_by(
-            Asistencia.fecha.desc()
-        ).paginate(page=page, per_page=per_page, error_out=False)
+        try:
+            asistencias, pagination = paginate_from_request(
+                query, [(Asistencia.fecha, 'desc'), (Asistencia.id, 'desc')], default_per_page=50
+            )
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
         
         # Incluir información del estudiante
         result = []
-        for asist in asistencias.items:
+        for asist in asistencias:
             asist_dict = asist.to_dict()
             asist_dict['estudiante'] = {
                 'id': asist.estudiante.id,
@@ -63,12 +73,7 @@ def list_asistencia():
         
         return jsonify({
             'asistencias': result,
-            'pagination': {
-                'page': asistencias.page,
-                'pages': asistencias.pages,
-                'per_page': asistencias.per_page,
-                'total': asistencias.total
-            }
+            'pagination': pagination
         }), 200
     except Exception as e:
         return jsonify({'message': 'Error al obtener asistencias', 'error': str(e)}), 500
@@ -86,10 +91,17 @@ def create_asistencia_multiple():
         if not isinstance(data['asistencias'], list):
             return jsonify({'message': '"asistencias" debe ser un array'}), 400
         
-        estados_validos = ['PRESENTE', 'AUSENTE', 'TARDE', 'JUSTIFICADO']
-        resultados = []
+        items = data['asistencias']
+        
+        # Validar todos los estudiantes con una sola consulta
+        existentes = estudiantes_existentes(
+            item['estudiante_id'] for item in items if isinstance(item, dict) and 'estudiante_id' in item
+        )
+        
+        fechas_cache = {}
+        marcas = []
         
-        for item in data['asistencias']:
+        for item in items:
             required_fields = ['estudiante_id', 'fecha', 'estado']
             if not all(k in item for k in required_fields):
                 return jsonify({
@@ -97,53 +109,33 @@ def create_asistencia_multiple():
                 }), 400
             
             # Validar estado
-            if item['estado'] not in estados_validos:
+            if item['estado'] not in ESTADOS_VALIDOS:
                 return jsonify({
-                    'message': f'Estado debe ser uno de: {estados_validos}'
+                    'message': f'Estado debe ser uno de: {ESTADOS_VALIDOS}'
                 }), 400
             
             # Validar fecha
             try:
-                fecha_asist = datetime.strptime(item['fecha'], '%Y-%m-%d').date()
-            except ValueError:
+                fecha_asist = parsear_fecha(item['fecha'], fechas_cache)
+            except (TypeError, ValueError):
                 return jsonify({
                     'message': 'Formato de fecha inválido (usar YYYY-MM-DD)'
                 }), 400
             
             # Verificar estudiante
-            estudiante = Estudiante.query.get(item['estudiante_id'])
-            if not estudiante:
+            estudiante_id = normalizar_id(item['estudiante_id'])
+            if estudiante_id not in existentes:
                 return jsonify({
                     'message': f'Estudiante {item["estudiante_id"]} no encontrado'
                 }), 404
             
-            # Verificar si ya existe registro para esa fecha/estudiante
-            existing = Asistencia.query.filter_by(
-                estudiante_id=item['estudiante_id'],
-                fecha=fecha_asist
-            ).first()
-            
-            if existing:
-                # Actualizar existente
-                existing.estado = item['estado']
-                resultados.append({
-                    'estudiante_id': item['estudiante_id'],
-                    'accion': 'actualizado',
-                    'asistencia': existing.to_dict()
-                })
-            else:
-                # Crear nuevo
-                asistencia = Asistencia(
-                    estudiante_id=item['estudiante_id'],
-                    fecha=fecha_asist,
-                    estado=item['estado']
-                )
-                db.session.add(asistencia)
-                resultados.append({
-                    'estudiante_id': item['estudiante_id'],
-                    'accion': 'creado',
-                    'asistencia': asistencia.to_dict()
-                })
+            marcas.append({
+                'estudiante_id': estudiante_id,
+                'fecha': fecha_asist,
+                'estado': item['estado']
+            })
+        
+        resultados = upsert_asistencias(marcas, existentes)
         
         db.session.commit()
         
@@ -158,6 +150,7 @@ def create_asistencia_multiple():
 
 @asistencia_bp.route('/estados', methods=['GET'])
 @jwt_required()
+@cache.depende_de([])
 def list_estados():
     """Obtener estados de asistencia disponibles"""
     return jsonify({
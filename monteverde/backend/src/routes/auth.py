@@ -5,6 +5,7 @@ from flask_jwt_extended import (
 )
 from src.extensions import db
 from src.models.usuario import Usuario
+from src.cache import cache
 from datetime import timedelta
 
 auth_bp = Blueprint('auth', __name__, url_prefix='/auth')
@@ -105,6 +106,7 @@ def refresh():
 
 @auth_bp.route('/profile', methods=['GET'])
 @jwt_required()
+@cache.depende_de(['usuarios'])
 def get_profile():
     """Obtener perfil del usuario actual"""
     try:
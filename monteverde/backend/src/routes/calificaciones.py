@@ -1,31 +1,40 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required
+from sqlalchemy.orm import joinedload
 from src.extensions import db
 from src.models.calificacion import Calificacion
 from src.models.estudiante import Estudiante
-from src.utils.auth_helpers import role_required, get_current_user
+from src.utils.auth_helpers import role_required, get_current_user, get_current_rol
+from src.utils.pagination import paginate_from_request
+from src.cache import cache
+from src.instrumentacion import presupuesto_consultas
 from datetime import datetime
 
 calificaciones_bp = Blueprint('calificaciones', __name__, url_prefix='/calificaciones')
 
 @calificaciones_bp.route('/', methods=['GET'])
+@presupuesto_consultas(3)
 @jwt_required()
+@cache.depende_de(['calificaciones', 'usuarios'])
 def list_calificaciones():
     """Listar calificaciones con filtros"""
     try:
-        current_user = get_current_user()
+        rol = get_current_rol()
         
         # Parámetros de filtro
         estudiante_id = request.args.get('estudiante_id', type=int)
         asignatura = request.args.get('asignatura')
         periodo = request.args.get('periodo')
-        page = request.args.get('page', 1, type=int)
-        per_page = min(request.args.get('per_page', 20, type=int), 100)
         
-        query = Calificacion.query
+        # El estudiante viene en el mismo SELECT (evita una consulta por calificación)
+        query = Calificacion.query.options(joinedload(Calificacion.estudiante))
         
         # Filtros según rol
-        if current_user.rol == 'familia':
+        if rol == 'familia':
+            # Solo las familias necesitan el usuario completo (estudiante_id)
+            current_user = get_current_user()
+            if not current_user:
+                return jsonify({'message': 'Usuario no encontrado'}), 404
             if not estudiante_id or current_user.estudiante_id != estudiante_id:
                 return jsonify({'message': 'Solo puedes ver calificaciones de tu estudiante'}), 403
             query = query.filter_by(estudiante_id=estudiante_id)
@@ -38,13 +47,16 @@ def list_calificaciones():
         if periodo:
             query = query.filter_by(periodo=periodo)
         
-        calificaciones = query.order_by(
-            Calificacion.fecha_registro.desc()
-        ).paginate(page=page, per_page=per_page, error_out=False)
+        try:
+            calificaciones, pagination = paginate_from_request(
+                query, [(Calificacion.fecha_registro, 'desc'), (Calificacion.id, 'desc')]
+            )
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
         
         # Incluir información del estudiante
         result = []
-        for calif in calificaciones.items:
+        for calif in calificaciones:
             calif_dict = calif.to_dict()
             if calif.estudiante:
                 calif_dict['estudiante'] = {
@@ -55,12 +67,7 @@ def list_calificaciones():
         
         return jsonify({
             'calificaciones': result,
-            'pagination': {
-                'page': calificaciones.page,
-                'pages': calificaciones.pages,
-                'per_page': calificaciones.per_page,
-                'total': calificaciones.total
-            }
+            'pagination': pagination
         }), 200
     except Exception as e:
         return jsonify({'message': 'Error al obtener calificaciones', 'error': str(e)}), 500
@@ -162,6 +169,7 @@ def update_calificacion(calificacion_id):
 
 @calificaciones_bp.route('/periodos', methods=['GET'])
 @jwt_required()
+@cache.cacheado(['calificaciones'])
 def list_periodos():
     """Obtener lista de períodos únicos"""
     try:
@@ -174,6 +182,7 @@ def list_periodos():
 
 @calificaciones_bp.route('/asignaturas', methods=['GET'])
 @jwt_required()
+@cache.cacheado(['calificaciones'])
 def list_asignaturas():
     """Obtener lista de asignaturas únicas"""
     try:
@@ -4,37 +4,34 @@ from src.extensions import db
 from src.models.curso import Curso
 from src.models.estudiante import Estudiante
 from src.utils.auth_helpers import role_required, get_current_user
+from src.utils.pagination import paginate_from_request
+from src.cache import cache
 
 cursos_bp = Blueprint('cursos', __name__, url_prefix='/cursos')
 
 @cursos_bp.route('/', methods=['GET'])
 @jwt_required()
+@cache.depende_de(['cursos'])
 def list_cursos():
     """Listar todos los cursos"""
     try:
-        page = request.args.get('page', 1, type=int)
-        per_page = min(request.args.get('per_page', 10, type=int), 100)
-        
-        cursos = Curso.query.paginate(
-            page=page, per_page=per_page, error_out=False
-        )
+        try:
+            cursos, pagination = paginate_from_request(
+                Curso.query, [(Curso.id, 'asc')], default_per_page=10
+            )
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
         
         return jsonify({
-            'cursos': [curso.to_dict() for curso in cursos.items],
-            'pagination': {
-                'page': cursos.page,
-                'pages': cursos.pages,
-                'per_page': cursos.per_page,
-                'total': cursos.total,
-                'has_next': cursos.has_next,
-                'has_prev': cursos.has_prev
-            }
+            'cursos': [curso.to_dict() for curso in cursos],
+            'pagination': pagination
         }), 200
     except Exception as e:
         return jsonify({'message': 'Error al obtener cursos', 'error': str(e)}), 500
 
 @cursos_bp.route('/<int:curso_id>', methods=['GET'])
 @jwt_required()
+@cache.depende_de(['cursos', 'estudiantes'])
 def get_curso(curso_id):
     """Obtener curso específico con estudiantes"""
     try:
@@ -1,33 +1,39 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required
+from sqlalchemy.orm import joinedload
 from src.extensions import db
 from src.models.estudiante import Estudiante
 from src.models.curso import Curso
-from src.utils.auth_helpers import role_required, get_current_user
+from src.utils.auth_helpers import role_required, get_current_user, get_current_rol
+from src.utils.pagination import paginate_from_request
+from src.cache import cache
+from src.instrumentacion import presupuesto_consultas
 
 estudiantes_bp = Blueprint('estudiantes', __name__, url_prefix='/estudiantes')
 
 @estudiantes_bp.route('/', methods=['GET'])
+@presupuesto_consultas(2)
 @role_required('admin', 'docente')
+@cache.depende_de(['estudiantes', 'usuarios'])
 def list_estudiantes():
     """Listar estudiantes con filtros"""
     try:
-        page = request.args.get('page', 1, type=int)
-        per_page = min(request.args.get('per_page', 20, type=int), 100)
         curso_id = request.args.get('curso_id', type=int)
         
-        query = Estudiante.query
+        # El curso viene en el mismo SELECT (evita una consulta por estudiante)
+        query = Estudiante.query.options(joinedload(Estudiante.curso))
         
         if curso_id:
             query = query.filter_by(curso_id=curso_id)
         
-        estudiantes = query.paginate(
-            page=page, per_page=per_page, error_out=False
-        )
+        try:
+            estudiantes, pagination = paginate_from_request(query, [(Estudiante.id, 'asc')])
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
         
         # Incluir información del curso
         result = []
-        for estudiante in estudiantes.items:
+        for estudiante in estudiantes:
             est_dict = estudiante.to_dict()
             if estudiante.curso:
                 est_dict['curso'] = estudiante.curso.to_dict()
@@ -35,25 +41,22 @@ def list_estudiantes():
         
         return jsonify({
             'estudiantes': result,
-            'pagination': {
-                'page': estudiantes.page,
-                'pages': estudiantes.pages,
-                'per_page': estudiantes.per_page,
-                'total': estudiantes.total
-            }
+            'pagination': pagination
         }), 200
     except Exception as e:
         return jsonify({'message': 'Error al obtener estudiantes', 'error': str(e)}), 500
 
 @estudiantes_bp.route('/<int:estudiante_id>', methods=['GET'])
 @jwt_required()
+@cache.depende_de(['estudiantes', 'usuarios'])
 def get_estudiante(estudiante_id):
     """Obtener estudiante específico"""
     try:
-        current_user = get_current_user()
-        
         # Verificar permisos
-        if current_user.rol == 'familia':
+        if get_current_rol() == 'familia':
+            current_user = get_current_user()
+            if not current_user:
+                return jsonify({'message': 'Usuario no encontrado'}), 404
             if current_user.estudiante_id != estudiante_id:
                 return jsonify({'message': 'Solo puedes ver tu propio estudiante'}), 403
         
@@ -2,62 +2,65 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required
 from src.extensions import db
 from src.models.mensaje import Mensaje
+from src.models.curso import Curso
 from src.models.usuario import Usuario
-from src.utils.auth_helpers import get_current_user
+from src.services.mensajes import query_mensajes_con_nombres, difundir_a_curso, notificar_mensajes, notificar_no_leidos
+from src.services.conversaciones import registrar_mensajes, marcar_conversacion_leida, no_leidos_de
+from src.services.lecturas import buffer_lecturas, marcar_leidos
+from src.utils.auth_helpers import role_required, get_current_user, get_current_user_id
+from src.utils.pagination import paginate_from_request
+from src.cache import cache
 from datetime import datetime
 
 mensajes_bp = Blueprint('mensajes', __name__, url_prefix='/mensajes')
 
 @mensajes_bp.route('/', methods=['GET'])
 @jwt_required()
+@cache.depende_de(['mensajes', 'usuarios'])
 def list_mensajes():
     """Listar mensajes del usuario actual"""
     try:
-        current_user = get_current_user()
+        current_user_id = get_current_user_id()
         
         # Filtros
         tipo = request.args.get('tipo', 'recibidos')  # 'enviados', 'recibidos', 'todos'
-        page = request.args.get('page', 1, type=int)
-        per_page = min(request.args.get('per_page', 20, type=int), 100)
         
-        query = Mensaje.query
+        query = query_mensajes_con_nombres()
         
         if tipo == 'enviados':
-            query = query.filter_by(emisor_id=current_user.id)
+            query = query.filter(Mensaje.emisor_id == current_user_id)
         elif tipo == 'recibidos':
-            query = query.filter_by(receptor_id=current_user.id)
+            query = query.filter(Mensaje.receptor_id == current_user_id)
         else:  # todos
             query = query.filter(
-                (Mensaje.emisor_id == current_user.id) | 
-                (Mensaje.receptor_id == current_user.id)
+                (Mensaje.emisor_id == current_user_id) | 
+                (Mensaje.receptor_id == current_user_id)
             )
         
-        mensajes = query.order_by(
-            Mensaje.fecha.desc()
-        ).paginate(page=page, per_page=per_page, error_out=False)
+        try:
+            mensajes, pagination = paginate_from_request(
+                query, [(Mensaje.fecha, 'desc'), (Mensaje.id, 'desc')]
+            )
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
         
         # Incluir información de emisor y receptor
         result = []
-        for mensaje in mensajes.items:
-            msg_dict = mensaje.to_dict()
+        for fila in mensajes:
+            msg_dict = fila.Mensaje.to_dict()
             msg_dict['emisor'] = {
-                'id': mensaje.emisor.id,
-                'nombre': mensaje.emisor.nombre
+                'id': fila.Mensaje.emisor_id,
+                'nombre': fila.emisor_nombre
             }
             msg_dict['receptor'] = {
-                'id': mensaje.receptor.id,
-                'nombre': mensaje.receptor.nombre
+                'id': fila.Mensaje.receptor_id,
+                'nombre': fila.receptor_nombre
             }
             result.append(msg_dict)
         
         return jsonify({
             'mensajes': result,
-            'pagination': {
-                'page': mensajes.page,
-                'pages': mensajes.pages,
-                'per_page': mensajes.per_page,
-                'total': mensajes.total
-            }
+            'pagination': pagination
         }), 200
     except Exception as e:
         return jsonify({'message': 'Error al obtener mensajes', 'error': str(e)}), 500
@@ -68,6 +71,8 @@ def create_mensaje():
     """Enviar nuevo mensaje"""
     try:
         current_user = get_current_user()
+        if not current_user:
+            return jsonify({'message': 'Usuario no encontrado'}), 404
         data = request.get_json()
         
         required_fields = ['receptor_id', 'asunto', 'cuerpo']
@@ -91,7 +96,10 @@ def create_mensaje():
         )
         
         db.session.add(mensaje)
+        db.session.flush()
+        registrar_mensajes([mensaje])
         db.session.commit()
+        notificar_mensajes([mensaje])
         
         result = mensaje.to_dict()
         result['emisor'] = {'id': current_user.id, 'nombre': current_user.nombre}
@@ -106,20 +114,58 @@ def create_mensaje():
         db.session.rollback()
         return jsonify({'message': 'Error al enviar mensaje', 'error': str(e)}), 500
 
+@mensajes_bp.route('/difundir', methods=['POST'])
+@role_required('docente', 'admin')
+def difundir_mensaje():
+    """Enviar un mensaje a todas las familias de un curso"""
+    try:
+        current_user = get_current_user()
+        if not current_user:
+            return jsonify({'message': 'Usuario no encontrado'}), 404
+        data = request.get_json()
+        
+        required_fields = ['curso_id', 'asunto', 'cuerpo']
+        if not data or not all(k in data for k in required_fields):
+            return jsonify({'message': f'Faltan campos: {required_fields}'}), 400
+        
+        if not db.session.get(Curso, data['curso_id']):
+            return jsonify({'message': 'Curso no encontrado'}), 404
+        
+        mensajes = difundir_a_curso(current_user.id, data['curso_id'], data['asunto'], data['cuerpo'])
+        db.session.commit()
+        notificar_mensajes(mensajes)
+        
+        return jsonify({
+            'message': f'Mensaje enviado a {len(mensajes)} familias',
+            'enviados': len(mensajes),
+            'mensaje_ids': [m.id for m in mensajes]
+        }), 201
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': 'Error al difundir mensaje', 'error': str(e)}), 500
+
 @mensajes_bp.route('/<int:mensaje_id>/marcar-leido', methods=['PUT'])
 @jwt_required()
 def marcar_leido(mensaje_id):
     """Marcar mensaje como leído"""
     try:
-        current_user = get_current_user()
-        mensaje = Mensaje.query.get_or_404(mensaje_id)
-        
-        # Solo el receptor puede marcar como leído
-        if mensaje.receptor_id != current_user.id:
-            return jsonify({'message': 'Solo el receptor puede marcar como leído'}), 403
-        
-        mensaje.leido = True
+        if buffer_lecturas.activo:
+            # Write-behind: la verificación del receptor se aplica al escribir el lote
+            buffer_lecturas.agregar(mensaje_id, get_current_user_id())
+            return jsonify({'message': 'Mensaje marcado como leído'}), 202
+        
+        # Solo marca si el usuario es el receptor y el mensaje sigue sin leer (fila bloqueada)
+        current_user_id = get_current_user_id()
+        marcados = marcar_leidos([(mensaje_id, current_user_id)])
         db.session.commit()
+        notificar_no_leidos(marcados)
+        
+        if not marcados:
+            mensaje = Mensaje.query.get_or_404(mensaje_id)
+            # Solo el receptor puede marcar como leído
+            if mensaje.receptor_id != current_user_id:
+                return jsonify({'message': 'Solo el receptor puede marcar como leído'}), 403
         
         return jsonify({'message': 'Mensaje marcado como leído'}), 200
         
@@ -127,25 +173,49 @@ def marcar_leido(mensaje_id):
         db.session.rollback()
         return jsonify({'message': 'Error al marcar mensaje', 'error': str(e)}), 500
 
+@mensajes_bp.route('/conversacion/<int:usuario_id>/marcar-leida', methods=['PUT'])
+@jwt_required()
+def marcar_conversacion_leida_hasta(usuario_id):
+    """Marcar como leídos los mensajes recibidos de un usuario (hasta hasta_mensaje_id)"""
+    try:
+        current_user_id = get_current_user_id()
+        data = request.get_json(silent=True) or {}
+        
+        marcados = marcar_conversacion_leida(current_user_id, usuario_id, data.get('hasta_mensaje_id'))
+        db.session.commit()
+        if marcados:
+            notificar_no_leidos([current_user_id])
+        
+        return jsonify({
+            'message': f'{marcados} mensajes marcados como leídos',
+            'marcados': marcados,
+            'no_leidos': no_leidos_de(current_user_id)
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': 'Error al marcar conversación', 'error': str(e)}), 500
+
 @mensajes_bp.route('/conversacion/<int:usuario_id>', methods=['GET'])
 @jwt_required()
+@cache.depende_de(['mensajes', 'usuarios'])
 def get_conversacion(usuario_id):
     """Obtener conversación con un usuario específico"""
     try:
-        current_user = get_current_user()
+        current_user_id = get_current_user_id()
         
         # Verificar que el usuario existe
         usuario = Usuario.query.get_or_404(usuario_id)
         
         mensajes = Mensaje.query.filter(
-            ((Mensaje.emisor_id == current_user.id) & (Mensaje.receptor_id == usuario_id)) |
-            ((Mensaje.emisor_id == usuario_id) & (Mensaje.receptor_id == current_user.id))
+            ((Mensaje.emisor_id == current_user_id) & (Mensaje.receptor_id == usuario_id)) |
+            ((Mensaje.emisor_id == usuario_id) & (Mensaje.receptor_id == current_user_id))
         ).order_by(Mensaje.fecha.asc()).all()
         
         result = []
         for mensaje in mensajes:
             msg_dict = mensaje.to_dict()
-            msg_dict['es_mio'] = mensaje.emisor_id == current_user.id
+            msg_dict['es_mio'] = mensaje.emisor_id == current_user_id
             result.append(msg_dict)
         
         return jsonify({
@@ -1,36 +1,48 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required
+from sqlalchemy.orm import joinedload
 from src.extensions import db
 from src.models.observacion import Observacion
 from src.models.estudiante import Estudiante
-from src.utils.auth_helpers import role_required, get_current_user
+from src.utils.auth_helpers import role_required, get_current_user, get_current_rol, get_current_user_id
+from src.utils.pagination import paginate_from_request
+from src.cache import cache
+from src.instrumentacion import presupuesto_consultas
 from datetime import datetime, date
 
 observaciones_bp = Blueprint('observaciones', __name__, url_prefix='/observaciones')
 
 @observaciones_bp.route('/', methods=['GET'])
+@presupuesto_consultas(3)
 @jwt_required()
+@cache.depende_de(['observaciones', 'usuarios'])
 def list_observaciones():
     """Listar observaciones según permisos"""
     try:
-        current_user = get_current_user()
+        rol = get_current_rol()
         
         # Parámetros
         estudiante_id = request.args.get('estudiante_id', type=int)
         tipo = request.args.get('tipo')
         fecha_inicio = request.args.get('fecha_inicio')
         fecha_fin = request.args.get('fecha_fin')
-        page = request.args.get('page', 1, type=int)
-        per_page = min(request.args.get('per_page', 20, type=int), 100)
         
-        query = Observacion.query
+        # Estudiante y docente en el mismo SELECT (evita dos consultas por observación)
+        query = Observacion.query.options(
+            joinedload(Observacion.estudiante),
+            joinedload(Observacion.docente)
+        )
         
         # Filtros según rol
-        if current_user.rol == 'familia':
+        if rol == 'familia':
+            # Solo las familias necesitan el usuario completo (estudiante_id)
+            current_user = get_current_user()
+            if not current_user:
+                return jsonify({'message': 'Usuario no encontrado'}), 404
             if not estudiante_id or current_user.estudiante_id != estudiante_id:
                 return jsonify({'message': 'Solo puedes ver observaciones de tu estudiante'}), 403
             query = query.filter_by(estudiante_id=estudiante_id)
-        elif current_user.rol == 'docente':
+        elif rol == 'docente':
             # Los docentes pueden ver todas las observaciones
             if estudiante_id:
                 query = query.filter_by(estudiante_id=estudiante_id)
@@ -56,13 +68,16 @@ def list_observaciones():
             except ValueError:
                 return jsonify({'message': 'Formato de fecha inválido (usar YYYY-MM-DD)'}), 400
         
-        observaciones = query.order_by(
-            Observacion.fecha.desc()
-        ).paginate(page=page, per_page=per_page, error_out=False)
+        try:
+            observaciones, pagination = paginate_from_request(
+                query, [(Observacion.fecha, 'desc'), (Observacion.id, 'desc')]
+            )
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
         
         # Incluir información del estudiante y docente
         result = []
-        for obs in observaciones.items:
+        for obs in observaciones:
             obs_dict = obs.to_dict()
             obs_dict['estudiante'] = {
                 'id': obs.estudiante.id,
@@ -76,12 +91,7 @@ def list_observaciones():
         
         return jsonify({
             'observaciones': result,
-            'pagination': {
-                'page': observaciones.page,
-                'pages': observaciones.pages,
-                'per_page': observaciones.per_page,
-                'total': observaciones.total
-            }
+            'pagination': pagination
         }), 200
     except Exception as e:
         return jsonify({'message': 'Error al obtener observaciones', 'error': str(e)}), 500
@@ -92,6 +102,8 @@ def create_observacion():
     """Crear nueva observación"""
     try:
         current_user = get_current_user()
+        if not current_user:
+            return jsonify({'message': 'Usuario no encontrado'}), 404
         data = request.get_json()
         
         required_fields = ['estudiante_id', 'tipo', 'detalle']
@@ -145,11 +157,10 @@ def create_observacion():
 def update_observacion(observacion_id):
     """Actualizar observación (solo el autor o admin)"""
     try:
-        current_user = get_current_user()
         observacion = Observacion.query.get_or_404(observacion_id)
         
         # Solo el docente que creó la observación o admin puede editarla
-        if current_user.rol != 'admin' and observacion.docente_id != current_user.id:
+        if get_current_rol() != 'admin' and observacion.docente_id != get_current_user_id():
             return jsonify({'message': 'Solo puedes editar tus propias observaciones'}), 403
         
         data = request.get_json()
@@ -182,6 +193,7 @@ def update_observacion(observacion_id):
 
 @observaciones_bp.route('/tipos', methods=['GET'])
 @jwt_required()
+@cache.depende_de([])
 def list_tipos():
     """Obtener tipos de observaciones disponibles"""
     return jsonify({
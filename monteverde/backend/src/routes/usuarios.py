@@ -2,12 +2,14 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from src.extensions import db
 from src.models.usuario import Usuario
-from src.utils.auth_helpers import role_required, get_current_user
+from src.utils.auth_helpers import role_required, get_current_rol, get_current_user_id
+from src.cache import cache
 
 usuarios_bp = Blueprint('usuarios', __name__, url_prefix='/usuarios')
 
 @usuarios_bp.route('/', methods=['GET'])
 @role_required('admin', 'docente')
+@cache.depende_de(['usuarios'])
 def list_usuarios():
     """Listar usuarios (solo admin y docentes)"""
     try:
@@ -20,13 +22,14 @@ def list_usuarios():
 
 @usuarios_bp.route('/<int:user_id>', methods=['GET'])
 @jwt_required()
+@cache.depende_de(['usuarios'])
 def get_usuario(user_id):
     """Obtener usuario específico"""
     try:
-        current_user = get_current_user()
+        rol = get_current_rol()
         
         # Solo admins pueden ver cualquier usuario, otros solo a sí mismos
-        if current_user.rol != 'admin' and current_user.id != user_id:
+        if rol != 'admin' and get_current_user_id() != user_id:
             return jsonify({'message': 'Acceso denegado'}), 403
         
         usuario = Usuario.query.get_or_404(user_id)
@@ -41,10 +44,10 @@ def get_usuario(user_id):
 def update_usuario(user_id):
     """Actualizar usuario"""
     try:
-        current_user = get_current_user()
+        rol = get_current_rol()
         
         # Solo admins pueden editar cualquier usuario, otros solo a sí mismos
-        if current_user.rol != 'admin' and current_user.id != user_id:
+        if rol != 'admin' and get_current_user_id() != user_id:
             return jsonify({'message': 'Acceso denegado'}), 403
         
         usuario = Usuario.query.get_or_404(user_id)
@@ -53,7 +56,7 @@ def update_usuario(user_id):
         # Actualizar campos permitidos
         if 'nombre' in data:
             usuario.nombre = data['nombre']
-        if 'email' in data and current_user.rol == 'admin':
+        if 'email' in data and rol == 'admin':
             # Solo admins pueden cambiar email
             usuario.email = data['email']
         if 'password' in data:
@@ -0,0 +1,163 @@
+from flask import current_app
+from sqlalchemy import func, case
+from sqlalchemy.dialects.mysql import insert
+from src.extensions import db
+from src.models.asistencia import Asistencia
+from src.models.asistencia_diaria import AsistenciaDiaria
+from src.models.estudiante import Estudiante
+from datetime import datetime
+
+ESTADOS_VALIDOS = ['PRESENTE', 'AUSENTE', 'TARDE', 'JUSTIFICADO']
+# Columna del resumen diario para cada estado
+COLUMNAS_ESTADO = {
+    'PRESENTE': 'presentes',
+    'AUSENTE': 'ausentes',
+    'TARDE': 'tardes',
+    'JUSTIFICADO': 'justificados'
+}
+CHUNK_SIZE_DEFAULT = 500
+
+def parsear_fecha(valor, cache):
+    """Parsear 'YYYY-MM-DD' una sola vez por valor distinto (lanza ValueError)"""
+    if valor not in cache:
+        cache[valor] = datetime.strptime(valor, '%Y-%m-%d').date()
+    return cache[valor]
+
+def normalizar_id(valor):
+    """Convertir un id recibido en JSON a int (None si no es válido)"""
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        return None
+
+def estudiantes_existentes(ids):
+    """Retorna {estudiante_id: curso_id} de los ids que existen, con una sola consulta IN"""
+    ids_validos = {normalizar_id(estudiante_id) for estudiante_id in ids} - {None}
+    if not ids_validos:
+        return {}
+    filas = db.session.query(Estudiante.id, Estudiante.curso_id).filter(Estudiante.id.in_(ids_validos)).all()
+    return {fila.id: fila.curso_id for fila in filas}
+
+def upsert_asistencias(marcas, cursos=None, chunk_size=None):
+    """Insertar/actualizar asistencia en bloque.
+
+    Cada marca es un dict con estudiante_id (int), fecha (date) y estado.
+    Lee de una vez los registros ya existentes y escribe el lote con
+    INSERT ... ON DUPLICATE KEY UPDATE sobre UNIQUE (estudiante_id, fecha).
+    También ajusta el resumen diario por curso; cursos es el dict
+    {estudiante_id: curso_id} de estudiantes_existentes() (se consulta si falta).
+    No hace commit: la transacción la controla quien llama.
+
+    Retorna un resultado por marca, en el mismo orden, con 'estudiante_id',
+    'accion' ('creado' o 'actualizado') y 'asistencia'.
+    """
+    if not marcas:
+        return []
+    chunk_size = chunk_size or current_app.config.get('BULK_CHUNK_SIZE', CHUNK_SIZE_DEFAULT)
+
+    # Registros existentes para los pares (estudiante_id, fecha) del lote
+    ids = {m['estudiante_id'] for m in marcas}
+    fechas = {m['fecha'] for m in marcas}
+    existentes = {
+        (a.estudiante_id, a.fecha): a
+        for a in db.session.query(Asistencia.id, Asistencia.estudiante_id, Asistencia.fecha, Asistencia.estado).filter(
+            Asistencia.estudiante_id.in_(ids),
+            Asistencia.fecha.in_(fechas)
+        ).with_for_update()
+    }
+
+    resultados = []
+    por_llave = {}
+    for marca in marcas:
+        llave = (marca['estudiante_id'], marca['fecha'])
+        # Una llave repetida en el mismo lote actualiza la marca anterior
+        accion = 'actualizado' if llave in existentes or llave in por_llave else 'creado'
+        por_llave[llave] = marca
+        resultados.append({
+            'estudiante_id': marca['estudiante_id'],
+            'accion': accion,
+            'asistencia': {
+                'id': existentes[llave].id if llave in existentes else None,
+                'estudiante_id': marca['estudiante_id'],
+                'fecha': marca['fecha'].isoformat(),
+                'estado': marca['estado']
+            }
+        })
+
+    valores = [
+        {'estudiante_id': m['estudiante_id'], 'fecha': m['fecha'], 'estado': m['estado']}
+        for m in por_llave.values()
+    ]
+    for inicio in range(0, len(valores), chunk_size):
+        stmt = insert(Asistencia.__table__).values(valores[inicio:inicio + chunk_size])
+        stmt = stmt.on_duplicate_key_update(estado=stmt.inserted.estado)
+        db.session.execute(stmt)
+
+    # Deltas del resumen diario: -1 al estado anterior, +1 al nuevo
+    if cursos is None:
+        cursos = estudiantes_existentes(ids)
+    deltas = {}
+    for llave, marca in por_llave.items():
+        anterior = existentes[llave].estado if llave in existentes else None
+        if anterior == marca['estado']:
+            continue
+        fila = deltas.setdefault((cursos[marca['estudiante_id']], marca['fecha']), dict.fromkeys(COLUMNAS_ESTADO.values(), 0))
+        fila[COLUMNAS_ESTADO[marca['estado']]] += 1
+        if anterior:
+            fila[COLUMNAS_ESTADO[anterior]] -= 1
+    aplicar_deltas_diarios(deltas)
+
+    return resultados
+
+def aplicar_deltas_diarios(deltas):
+    """Sumar deltas {(curso_id, fecha): {columna: delta}} al resumen diario en un solo upsert"""
+    if not deltas:
+        return
+    valores = [
+        dict(curso_id=curso_id, fecha=fecha, **conteos)
+        for (curso_id, fecha), conteos in deltas.items()
+    ]
+    tabla = AsistenciaDiaria.__table__
+    stmt = insert(tabla).values(valores)
+    stmt = stmt.on_duplicate_key_update({
+        columna: tabla.c[columna] + stmt.inserted[columna] for columna in COLUMNAS_ESTADO.values()
+    })
+    db.session.execute(stmt)
+
+def query_resumen_diario(curso_id, desde, hasta):
+    """Resumen diario de un curso entre dos fechas (inclusive): O(días)"""
+    return AsistenciaDiaria.query.filter(
+        AsistenciaDiaria.curso_id == curso_id,
+        AsistenciaDiaria.fecha >= desde,
+        AsistenciaDiaria.fecha <= hasta
+    ).order_by(AsistenciaDiaria.fecha)
+
+def reconstruir_asistencia_diaria(desde=None, hasta=None):
+    """Recalcular el resumen diario desde asistencia (backfill), opcionalmente por rango"""
+    conteos = [
+        func.sum(case((Asistencia.estado == estado, 1), else_=0)).label(columna)
+        for estado, columna in COLUMNAS_ESTADO.items()
+    ]
+    resumen = db.session.query(
+        Estudiante.curso_id,
+        Asistencia.fecha,
+        *conteos
+    ).join(Estudiante, Estudiante.id == Asistencia.estudiante_id)
+
+    tabla = AsistenciaDiaria.__table__
+    borrar = tabla.delete()
+    if desde:
+        resumen = resumen.filter(Asistencia.fecha >= desde)
+        borrar = borrar.where(tabla.c.fecha >= desde)
+    if hasta:
+        resumen = resumen.filter(Asistencia.fecha <= hasta)
+        borrar = borrar.where(tabla.c.fecha <= hasta)
+    resumen = resumen.group_by(Estudiante.curso_id, Asistencia.fecha)
+
+    db.session.execute(borrar)
+    resultado = db.session.execute(tabla.insert().from_select(
+        ['curso_id', 'fecha'] + list(COLUMNAS_ESTADO.values()),
+        resumen.statement
+    ))
+    db.session.commit()
+    return resultado.rowcount
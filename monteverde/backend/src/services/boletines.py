@@ -0,0 +1,204 @@
+import json
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from flask import current_app
+from jinja2 import Environment
+from sqlalchemy import func
+from src.extensions import db
+from src.models.asistencia import Asistencia
+from src.models.calificacion import Calificacion
+from src.models.curso import Curso
+from src.models.estudiante import Estudiante
+from src.models.observacion import Observacion
+from src.models.usuario import Usuario
+
+FORMATOS = ('json', 'html', 'pdf')
+# Con menos boletines que esto no vale la pena levantar procesos
+MIN_PARA_POOL = 20
+
+PLANTILLA_HTML = """<!DOCTYPE html>
+<html lang="es">
+<head>
+<meta charset="utf-8">
+<title>Boletín {{ b.estudiante.nombre }} - {{ b.periodo }}</title>
+<style>
+body { font-family: sans-serif; margin: 2em; }
+table { border-collapse: collapse; width: 100%; margin-bottom: 1.5em; }
+th, td { border: 1px solid #ccc; padding: 4px 8px; text-align: left; }
+</style>
+</head>
+<body>
+<h1>Boletín de {{ b.estudiante.nombre }}</h1>
+<p>Curso {{ b.curso.nombre }} &middot; Periodo {{ b.periodo }} ({{ b.desde }} a {{ b.hasta }})</p>
+<h2>Calificaciones</h2>
+<table>
+<tr><th>Asignatura</th><th>Nota</th></tr>
+{% for c in b.calificaciones %}<tr><td>{{ c.asignatura }}</td><td>{{ '%.1f' % c.nota }}</td></tr>
+{% else %}<tr><td colspan="2">Sin calificaciones</td></tr>
+{% endfor %}</table>
+<p><strong>Promedio:</strong> {{ '%.2f' % b.promedio if b.promedio is not none else '-' }}</p>
+<h2>Asistencia</h2>
+<p>{{ b.asistencia.dias_presentes }} de {{ b.asistencia.total_dias }} días presentes
+({{ '%.1f' % b.asistencia.porcentaje }}%) &middot; Ausencias: {{ b.asistencia.por_estado.get('AUSENTE', 0) }}
+&middot; Atrasos: {{ b.asistencia.por_estado.get('TARDE', 0) }}</p>
+<h2>Observaciones</h2>
+<ul>
+{% for o in b.observaciones %}<li>{{ o.fecha }} ({{ o.tipo }}, {{ o.docente_nombre }}): {{ o.detalle }}</li>
+{% else %}<li>Sin observaciones</li>
+{% endfor %}</ul>
+</body>
+</html>
+"""
+
+_plantilla = None
+
+def rango_periodo(periodo):
+    """Fechas del periodo para asistencia y observaciones.
+
+    Usa PERIODOS_FECHAS {'2025-P1': ('2025-03-01', '2025-07-15'), ...} si
+    está configurado; si no, el año del prefijo del periodo completo.
+    """
+    fechas = (current_app.config.get('PERIODOS_FECHAS') or {}).get(periodo)
+    if fechas:
+        return date.fromisoformat(fechas[0]), date.fromisoformat(fechas[1])
+    try:
+        anio = int(periodo[:4])
+    except (TypeError, ValueError):
+        raise ValueError(f'No se puede deducir el rango de fechas del periodo {periodo}')
+    return date(anio, 1, 1), date(anio, 12, 31)
+
+def cargar_boletines(curso_id, periodo, desde=None, hasta=None):
+    """Calcular los boletines de todo un curso con consultas por conjunto.
+
+    Una consulta para curso y estudiantes y una por cada fuente (notas del
+    periodo, asistencia agregada por estado y observaciones del rango),
+    todas filtradas por curso; nunca una consulta por estudiante.
+    Retorna una lista de dicts serializables (uno por estudiante).
+    """
+    if desde is None or hasta is None:
+        desde, hasta = rango_periodo(periodo)
+
+    curso = db.session.get(Curso, curso_id)
+    if curso is None:
+        raise LookupError('Curso no encontrado')
+    estudiantes = db.session.query(Estudiante.id, Estudiante.nombre).filter(
+        Estudiante.curso_id == curso_id
+    ).order_by(Estudiante.nombre).all()
+
+    notas = db.session.query(
+        Calificacion.estudiante_id, Calificacion.asignatura, Calificacion.nota
+    ).join(
+        Estudiante, Calificacion.estudiante_id == Estudiante.id
+    ).filter(
+        Estudiante.curso_id == curso_id,
+        Calificacion.periodo == periodo
+    ).order_by(Calificacion.asignatura).all()
+
+    asistencia = db.session.query(
+        Asistencia.estudiante_id, Asistencia.estado, func.count(Asistencia.id)
+    ).join(
+        Estudiante, Asistencia.estudiante_id == Estudiante.id
+    ).filter(
+        Estudiante.curso_id == curso_id,
+        Asistencia.fecha.between(desde, hasta)
+    ).group_by(Asistencia.estudiante_id, Asistencia.estado).all()
+
+    observaciones = db.session.query(
+        Observacion.estudiante_id, Observacion.fecha, Observacion.tipo, Observacion.detalle,
+        func.coalesce(Usuario.nombre, 'Desconocido').label('docente_nombre')
+    ).join(
+        Estudiante, Observacion.estudiante_id == Estudiante.id
+    ).outerjoin(
+        Usuario, Observacion.docente_id == Usuario.id
+    ).filter(
+        Estudiante.curso_id == curso_id,
+        Observacion.fecha.between(desde, hasta)
+    ).order_by(Observacion.fecha).all()
+
+    boletines = {
+        e.id: {
+            'estudiante': {'id': e.id, 'nombre': e.nombre},
+            'curso': {'id': curso.id, 'nombre': curso.nombre, 'nivel': curso.nivel, 'letra': curso.letra},
+            'periodo': periodo,
+            'desde': desde.isoformat(),
+            'hasta': hasta.isoformat(),
+            'calificaciones': [],
+            'asistencia': {'por_estado': {}},
+            'observaciones': []
+        } for e in estudiantes
+    }
+    for estudiante_id, asignatura, nota in notas:
+        boletines[estudiante_id]['calificaciones'].append({'asignatura': asignatura, 'nota': float(nota)})
+    for estudiante_id, estado, cantidad in asistencia:
+        boletines[estudiante_id]['asistencia']['por_estado'][estado] = cantidad
+    for fila in observaciones:
+        boletines[fila.estudiante_id]['observaciones'].append({
+            'fecha': fila.fecha.isoformat(),
+            'tipo': fila.tipo,
+            'detalle': fila.detalle,
+            'docente_nombre': fila.docente_nombre
+        })
+
+    for boletin in boletines.values():
+        notas_estudiante = [c['nota'] for c in boletin['calificaciones']]
+        boletin['promedio'] = round(sum(notas_estudiante) / len(notas_estudiante), 2) if notas_estudiante else None
+        por_estado = boletin['asistencia']['por_estado']
+        total_dias = sum(por_estado.values())
+        presentes = por_estado.get('PRESENTE', 0)
+        boletin['asistencia'].update({
+            'total_dias': total_dias,
+            'dias_presentes': presentes,
+            'porcentaje': (presentes / total_dias * 100) if total_dias > 0 else 100
+        })
+    return list(boletines.values())
+
+def renderizar_boletin(boletin, formato):
+    """Renderizar un boletín; corre en los procesos del pool (sin app ni BD).
+
+    Retorna (nombre_de_archivo, bytes).
+    """
+    global _plantilla
+    nombre = f"boletin-{boletin['periodo']}-{boletin['estudiante']['id']}"
+    if formato == 'json':
+        return f'{nombre}.json', json.dumps(boletin, ensure_ascii=False, indent=2).encode('utf-8')
+
+    if _plantilla is None:
+        _plantilla = Environment(autoescape=True).from_string(PLANTILLA_HTML)
+    html = _plantilla.render(b=boletin)
+    if formato == 'html':
+        return f'{nombre}.html', html.encode('utf-8')
+
+    from weasyprint import HTML
+    return f'{nombre}.pdf', HTML(string=html).write_pdf()
+
+def _renderizar(argumentos):
+    return renderizar_boletin(*argumentos)
+
+def generar_boletines(curso_id, periodo, formato='html', procesos=None, desde=None, hasta=None):
+    """Job completo de boletines de un curso: carga por conjunto + render.
+
+    Por defecto renderiza en el mismo proceso, que es lo que corresponde
+    dentro de un request. El comando generar-boletines pasa procesos para
+    repartir el render (HTML/JSON, o PDF si weasyprint está instalado) en un
+    pool cuando hay suficientes boletines; los procesos se crean con 'spawn',
+    nunca con fork de un proceso que ya tiene hilos y conexiones abiertas.
+    Retorna una lista de (nombre_de_archivo, bytes) en el orden del curso.
+    """
+    if formato not in FORMATOS:
+        raise ValueError(f"formato debe ser uno de: {', '.join(FORMATOS)}")
+    if formato == 'pdf':
+        try:
+            import weasyprint  # noqa: F401
+        except ImportError:
+            raise ValueError('Los boletines PDF requieren weasyprint (pip install weasyprint)')
+
+    boletines = cargar_boletines(curso_id, periodo, desde, hasta)
+    procesos = procesos or 1
+    trabajos = [(boletin, formato) for boletin in boletines]
+
+    if procesos <= 1 or len(trabajos) < MIN_PARA_POOL:
+        return [_renderizar(trabajo) for trabajo in trabajos]
+    with ProcessPoolExecutor(max_workers=procesos, mp_context=multiprocessing.get_context('spawn')) as pool:
+        chunksize = max(1, len(trabajos) // (procesos * 4))
+        return list(pool.map(_renderizar, trabajos, chunksize=chunksize))
@@ -0,0 +1,68 @@
+from flask import current_app
+from sqlalchemy import select, tuple_
+from sqlalchemy.dialects.mysql import insert
+from src.extensions import db
+from src.models.calificacion import Calificacion
+from datetime import datetime
+
+CHUNK_SIZE_DEFAULT = 500
+
+def upsert_calificaciones(filas, chunk_size=None):
+    """Insertar/actualizar calificaciones en bloque.
+
+    Cada fila es un dict con estudiante_id, asignatura, periodo y nota.
+    Se envía un único INSERT ... ON DUPLICATE KEY UPDATE por bloque,
+    apoyado en la llave UNIQUE (estudiante_id, asignatura, periodo), precedido
+    de un SELECT de las llaves ya existentes para separar creadas y actualizadas.
+    No hace commit: la transacción la controla quien llama.
+
+    Retorna un dict con 'creadas' y 'actualizadas'.
+    """
+    chunk_size = chunk_size or current_app.config.get('BULK_CHUNK_SIZE', CHUNK_SIZE_DEFAULT)
+    ahora = datetime.now()
+
+    # Deduplicar por llave única: la última fila gana, igual que al procesar en orden
+    por_llave = {}
+    for fila in filas:
+        llave = (fila['estudiante_id'], fila['asignatura'], fila['periodo'])
+        por_llave[llave] = {
+            'estudiante_id': fila['estudiante_id'],
+            'asignatura': fila['asignatura'],
+            'periodo': fila['periodo'],
+            'nota': fila['nota'],
+            'fecha_registro': ahora
+        }
+    valores = list(por_llave.values())
+
+    creadas = 0
+    actualizadas = 0
+    for inicio in range(0, len(valores), chunk_size):
+        bloque = valores[inicio:inicio + chunk_size]
+        # rowcount no sirve para contar: con CLIENT_FOUND_ROWS (siempre activo en
+        # los dialectos MySQL) una fila reescrita con la misma nota en el mismo
+        # segundo de fecha_registro cuenta 1, igual que una inserción
+        llave = tuple_(Calificacion.estudiante_id, Calificacion.asignatura, Calificacion.periodo)
+        # La collation de la tabla no distingue mayúsculas: comparar igual aquí
+        existentes = {
+            (estudiante_id, asignatura.lower(), periodo.lower())
+            for estudiante_id, asignatura, periodo in db.session.execute(
+                select(Calificacion.estudiante_id, Calificacion.asignatura, Calificacion.periodo).where(
+                    llave.in_([(v['estudiante_id'], v['asignatura'], v['periodo']) for v in bloque])
+                )
+            )
+        }
+        bloque_actualizadas = sum(
+            (v['estudiante_id'], v['asignatura'].lower(), v['periodo'].lower()) in existentes for v in bloque
+        )
+
+        stmt = insert(Calificacion.__table__).values(bloque)
+        stmt = stmt.on_duplicate_key_update(
+            nota=stmt.inserted.nota,
+            fecha_registro=stmt.inserted.fecha_registro
+        )
+        db.session.execute(stmt)
+
+        actualizadas += bloque_actualizadas
+        creadas += len(bloque) - bloque_actualizadas
+
+    return {'creadas': creadas, 'actualizadas': actualizadas}
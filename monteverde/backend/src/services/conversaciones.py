@@ -0,0 +1,157 @@
+from sqlalchemy import func, case
+from sqlalchemy.dialects.mysql import insert
+from src.extensions import db
+from src.models.conversacion import Conversacion
+from src.models.contador_mensajes import ContadorMensajes
+from src.models.mensaje import Mensaje
+from src.models.usuario import Usuario
+
+def par_usuarios(usuario1, usuario2):
+    """Llave no ordenada de la conversación: (menor, mayor)"""
+    return (usuario1, usuario2) if usuario1 < usuario2 else (usuario2, usuario1)
+
+def registrar_mensajes(mensajes):
+    """Actualizar resumen de conversación y contadores para mensajes recién insertados.
+
+    Debe llamarse después de flush() (los mensajes necesitan id y fecha) y
+    antes del commit, para quedar en la misma transacción. Un solo
+    INSERT ... ON DUPLICATE KEY UPDATE por tabla para todo el lote.
+    """
+    if not mensajes:
+        return
+    valores = []
+    no_leidos_por_receptor = {}
+    for mensaje in mensajes:
+        receptor_id = int(mensaje.receptor_id)
+        a, b = par_usuarios(int(mensaje.emisor_id), receptor_id)
+        no_leido = 0 if mensaje.leido else 1
+        no_leidos_por_receptor[receptor_id] = no_leidos_por_receptor.get(receptor_id, 0) + no_leido
+        valores.append({
+            'usuario_a_id': a,
+            'usuario_b_id': b,
+            'ultimo_mensaje_id': mensaje.id,
+            'ultima_fecha': mensaje.fecha,
+            'no_leidos_a': no_leido if receptor_id == a else 0,
+            'no_leidos_b': no_leido if receptor_id == b else 0
+        })
+
+    tabla = Conversacion.__table__
+    stmt = insert(tabla).values(valores)
+    stmt = stmt.on_duplicate_key_update(
+        ultimo_mensaje_id=stmt.inserted.ultimo_mensaje_id,
+        ultima_fecha=stmt.inserted.ultima_fecha,
+        no_leidos_a=tabla.c.no_leidos_a + stmt.inserted.no_leidos_a,
+        no_leidos_b=tabla.c.no_leidos_b + stmt.inserted.no_leidos_b
+    )
+    db.session.execute(stmt)
+
+    contadores = [
+        {'usuario_id': usuario_id, 'no_leidos': cantidad}
+        for usuario_id, cantidad in no_leidos_por_receptor.items() if cantidad
+    ]
+    if contadores:
+        tabla = ContadorMensajes.__table__
+        stmt = insert(tabla).values(contadores)
+        stmt = stmt.on_duplicate_key_update(no_leidos=tabla.c.no_leidos + stmt.inserted.no_leidos)
+        db.session.execute(stmt)
+
+def descontar_no_leidos(receptor_id, emisor_id, cantidad=1):
+    """Restar mensajes leídos de los contadores del receptor (sin bajar de 0)"""
+    if cantidad <= 0:
+        return
+    a, b = par_usuarios(receptor_id, emisor_id)
+    columna = 'no_leidos_a' if receptor_id == a else 'no_leidos_b'
+    tabla = Conversacion.__table__
+    db.session.execute(
+        tabla.update()
+        .where(tabla.c.usuario_a_id == a, tabla.c.usuario_b_id == b)
+        .values({columna: func.greatest(tabla.c[columna] - cantidad, 0)})
+    )
+    tabla = ContadorMensajes.__table__
+    db.session.execute(
+        tabla.update()
+        .where(tabla.c.usuario_id == receptor_id)
+        .values(no_leidos=func.greatest(tabla.c.no_leidos - cantidad, 0))
+    )
+
+def marcar_conversacion_leida(receptor_id, emisor_id, hasta_mensaje_id=None):
+    """Marcar como leídos los mensajes de emisor a receptor hasta un id (inclusive).
+
+    Un solo UPDATE sobre mensajes más el ajuste de contadores; no hace commit.
+    Retorna cuántos mensajes pasaron a leídos.
+    """
+    tabla = Mensaje.__table__
+    stmt = tabla.update().where(
+        tabla.c.receptor_id == receptor_id,
+        tabla.c.emisor_id == emisor_id,
+        tabla.c.leido == False
+    ).values(leido=True)
+    if hasta_mensaje_id is not None:
+        stmt = stmt.where(tabla.c.id <= hasta_mensaje_id)
+
+    marcados = db.session.execute(stmt).rowcount
+    descontar_no_leidos(receptor_id, emisor_id, marcados)
+    return marcados
+
+def no_leidos_de(usuario_id):
+    """Total de mensajes sin leer del usuario (lectura por llave primaria)"""
+    contador = db.session.get(ContadorMensajes, usuario_id)
+    return contador.no_leidos if contador else 0
+
+def query_bandeja(usuario_id):
+    """Bandeja de entrada leída solo del resumen de conversaciones.
+
+    Une dos consultas indexadas (usuario en el lado a o en el lado b) en
+    lugar de un OR, cada una con el nombre del otro participante.
+    """
+    lado_a = db.session.query(
+        Conversacion,
+        Usuario.id.label('otro_usuario_id'),
+        Usuario.nombre.label('otro_usuario_nombre'),
+        Conversacion.no_leidos_a.label('no_leidos')
+    ).join(
+        Usuario, Usuario.id == Conversacion.usuario_b_id
+    ).filter(Conversacion.usuario_a_id == usuario_id)
+
+    lado_b = db.session.query(
+        Conversacion,
+        Usuario.id.label('otro_usuario_id'),
+        Usuario.nombre.label('otro_usuario_nombre'),
+        Conversacion.no_leidos_b.label('no_leidos')
+    ).join(
+        Usuario, Usuario.id == Conversacion.usuario_a_id
+    ).filter(Conversacion.usuario_b_id == usuario_id)
+
+    return lado_a.union_all(lado_b).order_by(Conversacion.ultima_fecha.desc())
+
+def reconstruir_conversaciones():
+    """Recalcular conversaciones y contadores de no leídos desde mensajes (backfill)"""
+    a = func.least(Mensaje.emisor_id, Mensaje.receptor_id)
+    b = func.greatest(Mensaje.emisor_id, Mensaje.receptor_id)
+    no_leido = Mensaje.leido.is_(False) | Mensaje.leido.is_(None)
+    resumen = db.session.query(
+        a.label('usuario_a_id'),
+        b.label('usuario_b_id'),
+        func.max(Mensaje.id).label('ultimo_mensaje_id'),
+        func.max(Mensaje.fecha).label('ultima_fecha'),
+        func.sum(case(((Mensaje.receptor_id == a) & no_leido, 1), else_=0)).label('no_leidos_a'),
+        func.sum(case(((Mensaje.receptor_id == b) & no_leido, 1), else_=0)).label('no_leidos_b')
+    ).group_by(a, b)
+
+    tabla = Conversacion.__table__
+    db.session.execute(tabla.delete())
+    db.session.execute(tabla.insert().from_select(
+        ['usuario_a_id', 'usuario_b_id', 'ultimo_mensaje_id', 'ultima_fecha', 'no_leidos_a', 'no_leidos_b'],
+        resumen.statement
+    ))
+
+    contadores = db.session.query(
+        Mensaje.receptor_id,
+        func.count(Mensaje.id)
+    ).filter(no_leido).group_by(Mensaje.receptor_id)
+
+    tabla = ContadorMensajes.__table__
+    db.session.execute(tabla.delete())
+    db.session.execute(tabla.insert().from_select(['usuario_id', 'no_leidos'], contadores.statement))
+    db.session.commit()
+    return db.session.query(Conversacion).count()
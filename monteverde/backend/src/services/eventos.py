@@ -0,0 +1,157 @@
+import json
+import queue
+import threading
+
+class _SuscripcionMemoria:
+    """Cola de eventos de un usuario para un cliente conectado"""
+
+    def __init__(self, bus, usuario_id, capacidad):
+        self._bus = bus
+        self.usuario_id = usuario_id
+        self.cola = queue.Queue(maxsize=capacidad)
+
+    def obtener(self, timeout):
+        """Siguiente evento o None si no llega ninguno en timeout segundos"""
+        try:
+            return self.cola.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def cerrar(self):
+        self._bus._quitar(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+class BusMemoria:
+    """Pub/sub dentro del proceso: una cola por cliente conectado.
+
+    Solo entrega a los clientes conectados a este mismo worker; con varios
+    workers hay que usar BusRedis. Si un cliente no consume y su cola se
+    llena, los eventos nuevos para él se descartan (al reconectar recupera
+    los mensajes desde la base con Last-Event-ID).
+    """
+
+    def __init__(self, capacidad=256):
+        self.capacidad = capacidad
+        self._suscripciones = {}
+        self._lock = threading.Lock()
+
+    def publicar(self, usuario_id, evento):
+        with self._lock:
+            destinos = list(self._suscripciones.get(usuario_id, ()))
+        for suscripcion in destinos:
+            try:
+                suscripcion.cola.put_nowait(evento)
+            except queue.Full:
+                pass
+
+    def suscribir(self, usuario_id):
+        suscripcion = _SuscripcionMemoria(self, usuario_id, self.capacidad)
+        with self._lock:
+            self._suscripciones.setdefault(usuario_id, set()).add(suscripcion)
+        return suscripcion
+
+    def _quitar(self, suscripcion):
+        with self._lock:
+            activas = self._suscripciones.get(suscripcion.usuario_id)
+            if activas is not None:
+                activas.discard(suscripcion)
+                if not activas:
+                    del self._suscripciones[suscripcion.usuario_id]
+
+class _SuscripcionRedis:
+    def __init__(self, pubsub):
+        self._pubsub = pubsub
+
+    def obtener(self, timeout):
+        mensaje = self._pubsub.get_message(ignore_subscribe_messages=True, timeout=timeout)
+        if mensaje is None:
+            return None
+        return json.loads(mensaje['data'])
+
+    def cerrar(self):
+        self._pubsub.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+class BusRedis:
+    """Pub/sub entre procesos sobre Redis (un canal por usuario)"""
+
+    def __init__(self, url, prefijo='monteverde:eventos:'):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError('EVENTOS_BACKEND = "redis" requiere redis (pip install redis)')
+        self._redis = redis.Redis.from_url(url)
+        self.prefijo = prefijo
+
+    def publicar(self, usuario_id, evento):
+        self._redis.publish(f'{self.prefijo}{usuario_id}', json.dumps(evento, default=str))
+
+    def suscribir(self, usuario_id):
+        pubsub = self._redis.pubsub()
+        pubsub.subscribe(f'{self.prefijo}{usuario_id}')
+        return _SuscripcionRedis(pubsub)
+
+class Eventos:
+    """Eventos en vivo por usuario (mensajes nuevos, contador de no leídos).
+
+    Las rutas de escritura publican después del commit y los endpoints SSE /
+    long-poll se suscriben. El transporte se elige con EVENTOS_BACKEND:
+    'memoria' (por proceso), 'redis' (entre workers) o 'ninguno'.
+    """
+
+    def __init__(self, app=None):
+        self.bus = None
+        self.keepalive = 15.0
+        self.espera_max = 25.0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        tipo = app.config.get('EVENTOS_BACKEND', 'memoria')
+        self.keepalive = app.config.get('EVENTOS_KEEPALIVE', 15.0)
+        self.espera_max = app.config.get('EVENTOS_ESPERA_MAX', 25.0)
+        if tipo == 'memoria':
+            self.bus = BusMemoria(app.config.get('EVENTOS_CAPACIDAD', 256))
+        elif tipo == 'redis':
+            self.bus = BusRedis(app.config['EVENTOS_REDIS_URL'])
+        elif tipo == 'ninguno':
+            self.bus = None
+        else:
+            raise ValueError(f'EVENTOS_BACKEND desconocido: {tipo}')
+
+    @property
+    def activo(self):
+        return self.bus is not None
+
+    def publicar(self, usuario_id, tipo, datos, evento_id=None):
+        """Publicar sin propagar errores: un fallo del bus no debe romper la escritura"""
+        if self.bus is None:
+            return
+        try:
+            self.bus.publicar(int(usuario_id), {'tipo': tipo, 'id': evento_id, 'datos': datos})
+        except Exception as e:
+            print(f"⚠️ Error publicando evento {tipo}: {e}")
+
+    def suscribir(self, usuario_id):
+        return self.bus.suscribir(int(usuario_id))
+
+def formato_sse(evento):
+    """Serializar un evento como bloque text/event-stream"""
+    lineas = []
+    if evento.get('id') is not None:
+        lineas.append(f"id: {evento['id']}")
+    lineas.append(f"event: {evento['tipo']}")
+    lineas.append(f"data: {json.dumps(evento['datos'], ensure_ascii=False, default=str)}")
+    return '\n'.join(lineas) + '\n\n'
+
+eventos = Eventos()
@@ -0,0 +1,117 @@
+import csv
+import io
+import json
+from flask import current_app
+from sqlalchemy import func
+from sqlalchemy.orm import aliased
+from src.extensions import db
+from src.models.asistencia import Asistencia
+from src.models.calificacion import Calificacion
+from src.models.estudiante import Estudiante
+from src.models.observacion import Observacion
+from src.models.usuario import Usuario
+from src.utils.serialization import RowEncoder
+
+FORMATOS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv'
+}
+LOTE_DEFAULT = 1000
+
+ENCODER_CALIFICACIONES = RowEncoder([
+    ('id', Calificacion.id),
+    ('estudiante_id', Calificacion.estudiante_id),
+    ('estudiante_nombre', Estudiante.nombre),
+    ('curso_id', Estudiante.curso_id),
+    ('asignatura', Calificacion.asignatura),
+    ('periodo', Calificacion.periodo),
+    ('nota', Calificacion.nota),
+    ('fecha_registro', Calificacion.fecha_registro)
+])
+ENCODER_ASISTENCIA = RowEncoder([
+    ('id', Asistencia.id),
+    ('estudiante_id', Asistencia.estudiante_id),
+    ('estudiante_nombre', Estudiante.nombre),
+    ('curso_id', Estudiante.curso_id),
+    ('fecha', Asistencia.fecha),
+    ('estado', Asistencia.estado)
+])
+_docente = aliased(Usuario)
+ENCODER_OBSERVACIONES = RowEncoder([
+    ('id', Observacion.id),
+    ('estudiante_id', Observacion.estudiante_id),
+    ('estudiante_nombre', Estudiante.nombre),
+    ('curso_id', Estudiante.curso_id),
+    ('docente_id', Observacion.docente_id),
+    ('docente_nombre', func.coalesce(_docente.nombre, 'Desconocido')),
+    ('fecha', Observacion.fecha),
+    ('tipo', Observacion.tipo),
+    ('detalle', Observacion.detalle)
+])
+
+def query_export_calificaciones(curso_id=None, periodo=None, asignatura=None):
+    query = ENCODER_CALIFICACIONES.query(db.session).join(
+        Estudiante, Calificacion.estudiante_id == Estudiante.id
+    )
+    if curso_id:
+        query = query.filter(Estudiante.curso_id == curso_id)
+    if periodo:
+        query = query.filter(Calificacion.periodo == periodo)
+    if asignatura:
+        query = query.filter(Calificacion.asignatura == asignatura)
+    return ENCODER_CALIFICACIONES, query.order_by(Calificacion.id)
+
+def query_export_asistencia(curso_id=None, desde=None, hasta=None):
+    query = ENCODER_ASISTENCIA.query(db.session).join(
+        Estudiante, Asistencia.estudiante_id == Estudiante.id
+    )
+    if curso_id:
+        query = query.filter(Estudiante.curso_id == curso_id)
+    if desde:
+        query = query.filter(Asistencia.fecha >= desde)
+    if hasta:
+        query = query.filter(Asistencia.fecha <= hasta)
+    return ENCODER_ASISTENCIA, query.order_by(Asistencia.id)
+
+def query_export_observaciones(curso_id=None, desde=None, hasta=None):
+    query = ENCODER_OBSERVACIONES.query(db.session).join(
+        Estudiante, Observacion.estudiante_id == Estudiante.id
+    ).outerjoin(
+        _docente, Observacion.docente_id == _docente.id
+    )
+    if curso_id:
+        query = query.filter(Estudiante.curso_id == curso_id)
+    if desde:
+        query = query.filter(Observacion.fecha >= desde)
+    if hasta:
+        query = query.filter(Observacion.fecha <= hasta)
+    return ENCODER_OBSERVACIONES, query.order_by(Observacion.id)
+
+def generar_export(encoder, query, formato, lote=None):
+    """Generador de la exportación en NDJSON o CSV, en trozos de 'lote' filas.
+
+    La consulta se ejecuta con cursor del lado del servidor (yield_per activa
+    stream_results), así que la memoria no depende del total de filas.
+    """
+    lote = lote or current_app.config.get('EXPORTACION_LOTE', LOTE_DEFAULT)
+    filas = query.yield_per(lote)
+    buffer = io.StringIO()
+
+    if formato == 'csv':
+        writer = csv.writer(buffer)
+        writer.writerow(encoder.keys)
+        escribir = lambda datos: writer.writerow([datos[clave] for clave in encoder.keys])
+    else:
+        escribir = lambda datos: buffer.write(json.dumps(datos, ensure_ascii=False, separators=(',', ':')) + '\n')
+
+    pendientes = 0
+    for fila in filas:
+        escribir(encoder(fila))
+        pendientes += 1
+        if pendientes >= lote:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pendientes = 0
+    if buffer.tell():
+        yield buffer.getvalue()
@@ -0,0 +1,172 @@
+import csv
+import io
+import itertools
+from flask import current_app
+from src.extensions import db
+from src.models.calificacion import Calificacion
+from src.services.asistencia import estudiantes_existentes, normalizar_id
+from src.services.calificaciones import upsert_calificaciones
+
+NOTA_MIN = 0.0
+NOTA_MAX = 5.0
+LOTE_DEFAULT = 1000
+MAX_ERRORES_DEFAULT = 1000
+
+# Encabezados aceptados (en minúsculas, sin espacios) -> campo
+COLUMNAS = {
+    'estudiante_id': 'estudiante_id',
+    'estudianteid': 'estudiante_id',
+    'asignatura': 'asignatura',
+    'periodo': 'periodo',
+    'nota': 'nota'
+}
+
+def _normalizar_encabezados(encabezados):
+    campos = [COLUMNAS.get(str(e or '').strip().lower().replace(' ', '')) for e in encabezados]
+    faltantes = set(COLUMNAS.values()) - set(campos)
+    if faltantes:
+        raise ValueError(f"Faltan columnas: {', '.join(sorted(faltantes))}")
+    return campos
+
+def _filas_csv(archivo):
+    texto = io.TextIOWrapper(archivo, encoding='utf-8-sig', newline='')
+    primera = texto.readline()
+    # Excel en español exporta con ';'
+    delimitador = ';' if primera.count(';') > primera.count(',') else ','
+    lector = csv.reader(itertools.chain([primera], texto), delimiter=delimitador)
+    campos = _normalizar_encabezados(next(lector, []))
+    for numero, valores in enumerate(lector, start=2):
+        if any(v.strip() for v in valores):
+            yield numero, dict(zip(campos, valores))
+
+def _filas_xlsx(archivo):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ValueError('Importar XLSX requiere openpyxl (pip install openpyxl)')
+    libro = load_workbook(archivo, read_only=True, data_only=True)
+    try:
+        filas = libro.active.iter_rows(values_only=True)
+        campos = _normalizar_encabezados(next(filas, []))
+        for numero, valores in enumerate(filas, start=2):
+            if any(v not in (None, '') for v in valores):
+                yield numero, dict(zip(campos, valores))
+    finally:
+        libro.close()
+
+def leer_filas(archivo, nombre):
+    """Iterar (número_de_fila, dict) de un CSV o XLSX sin cargarlo completo.
+
+    El número de fila es el de la planilla (el encabezado es la fila 1).
+    Lanza ValueError si el formato o los encabezados no son válidos.
+    """
+    extension = nombre.rsplit('.', 1)[-1].lower() if '.' in nombre else ''
+    if extension == 'csv':
+        return _filas_csv(archivo)
+    if extension == 'xlsx':
+        return _filas_xlsx(archivo)
+    raise ValueError('El archivo debe ser .csv o .xlsx')
+
+def catalogos():
+    """Asignaturas y periodos conocidos.
+
+    Se usan ASIGNATURAS_VALIDAS / PERIODOS_VALIDOS si están configurados; si
+    no, los valores que ya existen en calificaciones. Un catálogo vacío
+    (base nueva) acepta cualquier valor.
+    """
+    asignaturas = current_app.config.get('ASIGNATURAS_VALIDAS')
+    periodos = current_app.config.get('PERIODOS_VALIDOS')
+    if asignaturas is None:
+        asignaturas = [a for (a,) in db.session.query(Calificacion.asignatura).distinct()]
+    if periodos is None:
+        periodos = [p for (p,) in db.session.query(Calificacion.periodo).distinct()]
+    return set(asignaturas), set(periodos)
+
+def _parsear_nota(valor):
+    if isinstance(valor, (int, float)):
+        return float(valor)
+    return float(str(valor).strip().replace(',', '.'))
+
+def validar_lote(lote, asignaturas, periodos):
+    """Validar un lote de filas con una sola consulta de estudiantes.
+
+    Retorna (validas, errores): validas son dicts listos para
+    upsert_calificaciones(); errores es una lista de {'fila', 'errores'}.
+    """
+    existentes = estudiantes_existentes(datos.get('estudiante_id') for _, datos in lote)
+    validas = []
+    errores = []
+    for numero, datos in lote:
+        problemas = []
+        estudiante_id = normalizar_id(datos.get('estudiante_id'))
+        if estudiante_id is None:
+            problemas.append('estudiante_id inválido')
+        elif estudiante_id not in existentes:
+            problemas.append(f'Estudiante {estudiante_id} no existe')
+
+        asignatura = str(datos.get('asignatura') or '').strip()
+        if not asignatura:
+            problemas.append('asignatura vacía')
+        elif asignaturas and asignatura not in asignaturas:
+            problemas.append(f'Asignatura desconocida: {asignatura}')
+
+        periodo = str(datos.get('periodo') or '').strip()
+        if not periodo:
+            problemas.append('periodo vacío')
+        elif periodos and periodo not in periodos:
+            problemas.append(f'Periodo desconocido: {periodo}')
+
+        try:
+            nota = _parsear_nota(datos.get('nota'))
+            if not (NOTA_MIN <= nota <= NOTA_MAX):
+                problemas.append(f'La nota debe estar entre {NOTA_MIN} y {NOTA_MAX}')
+        except (TypeError, ValueError):
+            problemas.append('nota no es un número válido')
+
+        if problemas:
+            errores.append({'fila': numero, 'errores': problemas})
+        else:
+            validas.append({
+                'estudiante_id': estudiante_id,
+                'asignatura': asignatura,
+                'periodo': periodo,
+                'nota': nota
+            })
+    return validas, errores
+
+def importar_calificaciones(filas, lote=None, max_errores=None):
+    """Importar calificaciones por lotes; generador de eventos de progreso.
+
+    Cada lote se valida, se escribe con upsert_calificaciones() y se
+    confirma con su propio commit, así nunca hay una transacción gigante y
+    reintentar la importación es idempotente. Tras cada lote se emite
+    {'procesadas', 'creadas', 'actualizadas', 'con_error'}; el último evento
+    agrega 'terminado': True y 'errores' (hasta max_errores filas).
+    """
+    lote = lote or current_app.config.get('IMPORTACION_LOTE', LOTE_DEFAULT)
+    max_errores = max_errores or current_app.config.get('IMPORTACION_MAX_ERRORES', MAX_ERRORES_DEFAULT)
+    asignaturas, periodos = catalogos()
+    resumen = {'procesadas': 0, 'creadas': 0, 'actualizadas': 0, 'con_error': 0}
+    errores = []
+
+    filas = iter(filas)
+    while True:
+        bloque = list(itertools.islice(filas, lote))
+        if not bloque:
+            break
+        validas, errores_bloque = validar_lote(bloque, asignaturas, periodos)
+        if validas:
+            try:
+                conteo = upsert_calificaciones(validas)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+            resumen['creadas'] += conteo['creadas']
+            resumen['actualizadas'] += conteo['actualizadas']
+        resumen['procesadas'] += len(bloque)
+        resumen['con_error'] += len(errores_bloque)
+        errores.extend(errores_bloque[:max_errores - len(errores)])
+        yield dict(resumen)
+
+    yield dict(resumen, terminado=True, errores=errores)
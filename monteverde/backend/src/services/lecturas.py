@@ -0,0 +1,133 @@
+import atexit
+import threading
+from src.extensions import db
+from src.models.mensaje import Mensaje
+from src.services.conversaciones import descontar_no_leidos
+from src.services.mensajes import notificar_no_leidos
+
+def marcar_leidos(entradas):
+    """Marcar como leídos varios mensajes con un solo UPDATE ... WHERE id IN (...).
+
+    entradas es un iterable de (mensaje_id, receptor_id); si receptor_id no es
+    None, solo se marca si el mensaje pertenece a ese receptor. Bloquea las
+    filas (SELECT ... FOR UPDATE) para ajustar los contadores sin carreras:
+    de dos marcas concurrentes del mismo mensaje solo una lo descuenta.
+    No hace commit. Retorna el receptor de cada mensaje que pasó a leído
+    (una entrada por mensaje; vacía si no se marcó ninguno).
+    """
+    receptor_esperado = {}
+    for mensaje_id, receptor_id in entradas:
+        receptor_esperado[mensaje_id] = receptor_id
+    if not receptor_esperado:
+        return []
+
+    filas = db.session.query(Mensaje.id, Mensaje.emisor_id, Mensaje.receptor_id).filter(
+        Mensaje.id.in_(receptor_esperado.keys()),
+        Mensaje.leido == False
+    ).with_for_update().all()
+
+    filas = [
+        f for f in filas
+        if receptor_esperado[f.id] is None or receptor_esperado[f.id] == f.receptor_id
+    ]
+    if not filas:
+        return []
+
+    tabla = Mensaje.__table__
+    db.session.execute(
+        tabla.update().where(tabla.c.id.in_([f.id for f in filas])).values(leido=True)
+    )
+
+    por_par = {}
+    for f in filas:
+        por_par[(f.receptor_id, f.emisor_id)] = por_par.get((f.receptor_id, f.emisor_id), 0) + 1
+    for (receptor_id, emisor_id), cantidad in por_par.items():
+        descontar_no_leidos(receptor_id, emisor_id, cantidad)
+
+    return [f.receptor_id for f in filas]
+
+class BufferLecturas:
+    """Buffer en memoria para confirmaciones de lectura (write-behind).
+
+    Las marcas se acumulan y se escriben en lote cuando se alcanza
+    LECTURAS_LOTE_MAX o pasan LECTURAS_DEMORA_MAX segundos, y al apagar
+    el proceso. Solo se activa con LECTURAS_DIFERIDAS = True.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.activo = False
+        self._pendientes = {}
+        self._lock = threading.Lock()
+        self._despertar = threading.Event()
+        self._detenido = threading.Event()
+        self._hilo = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.activo = app.config.get('LECTURAS_DIFERIDAS', False)
+        self.lote_max = app.config.get('LECTURAS_LOTE_MAX', 200)
+        self.demora_max = app.config.get('LECTURAS_DEMORA_MAX', 2.0)
+        if self.activo:
+            atexit.register(self.detener)
+
+    def agregar(self, mensaje_id, receptor_id=None):
+        """Encolar una marca de lectura; retorna de inmediato"""
+        with self._lock:
+            self._pendientes[mensaje_id] = receptor_id
+            lleno = len(self._pendientes) >= self.lote_max
+        self._iniciar_hilo()
+        if lleno:
+            self._despertar.set()
+
+    def flush(self):
+        """Escribir todas las marcas pendientes en un lote"""
+        with self._lock:
+            pendientes, self._pendientes = self._pendientes, {}
+        if not pendientes:
+            return 0
+
+        with self.app.app_context():
+            try:
+                receptores = marcar_leidos(pendientes.items())
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                print(f"❌ Error escribiendo lecturas diferidas: {e}")
+                # Reencolar para el próximo intento sin pisar marcas nuevas
+                with self._lock:
+                    for mensaje_id, receptor_id in pendientes.items():
+                        self._pendientes.setdefault(mensaje_id, receptor_id)
+                return 0
+            try:
+                notificar_no_leidos(receptores)
+            except Exception as e:
+                print(f"⚠️ Error notificando lecturas diferidas: {e}")
+            return len(receptores)
+
+    def detener(self):
+        """Detener el hilo y escribir lo pendiente (se llama al apagar)"""
+        self._detenido.set()
+        self._despertar.set()
+        if self._hilo is not None:
+            self._hilo.join(timeout=self.demora_max * 2)
+        self.flush()
+
+    def _iniciar_hilo(self):
+        if self._hilo is not None or self._detenido.is_set():
+            return
+        with self._lock:
+            if self._hilo is None:
+                self._hilo = threading.Thread(target=self._ciclo, name='buffer-lecturas', daemon=True)
+                self._hilo.start()
+
+    def _ciclo(self):
+        while not self._detenido.is_set():
+            self._despertar.wait(self.demora_max)
+            self._despertar.clear()
+            if not self._detenido.is_set():
+                self.flush()
+
+buffer_lecturas = BufferLecturas()
@@ -0,0 +1,124 @@
+from datetime import datetime
+from sqlalchemy.orm import aliased
+from src.extensions import db
+from src.models.contador_mensajes import ContadorMensajes
+from src.models.estudiante import Estudiante
+from src.models.mensaje import Mensaje
+from src.models.usuario import Usuario
+from src.services.conversaciones import registrar_mensajes
+from src.services.eventos import eventos
+
+def query_mensajes_con_nombres():
+    """Consulta de mensajes con el nombre de emisor y receptor en un solo JOIN.
+
+    Cada fila trae (Mensaje, emisor_nombre, receptor_nombre); se usan dos
+    alias de Usuario para no cargar las relaciones fila por fila.
+    """
+    emisor = aliased(Usuario, name='emisor')
+    receptor = aliased(Usuario, name='receptor')
+    return db.session.query(
+        Mensaje,
+        emisor.nombre.label('emisor_nombre'),
+        receptor.nombre.label('receptor_nombre')
+    ).outerjoin(
+        emisor, Mensaje.emisor_id == emisor.id
+    ).outerjoin(
+        receptor, Mensaje.receptor_id == receptor.id
+    )
+
+def mensaje_con_nombres(fila):
+    """Serializar una fila de query_mensajes_con_nombres()"""
+    msg_dict = fila.Mensaje.to_dict()
+    msg_dict['emisor_nombre'] = fila.emisor_nombre
+    msg_dict['receptor_nombre'] = fila.receptor_nombre
+    return msg_dict
+
+def familias_de_curso(curso_id):
+    """Ids de los usuarios familia con algún estudiante en el curso (una consulta)"""
+    filas = db.session.query(Usuario.id).join(
+        Estudiante, Usuario.estudiante_id == Estudiante.id
+    ).filter(
+        Usuario.rol == 'familia',
+        Estudiante.curso_id == curso_id
+    ).distinct().order_by(Usuario.id)
+    return [usuario_id for (usuario_id,) in filas]
+
+def difundir_a_curso(emisor_id, curso_id, asunto, cuerpo):
+    """Enviar el mismo mensaje a todas las familias de un curso.
+
+    Destinatarios en una consulta, todos los mensajes en un solo INSERT de
+    varias filas y conversaciones/contadores con registrar_mensajes() (un
+    upsert por tabla). No hace commit: el llamador confirma todo junto.
+    Retorna la lista de mensajes insertados (filas con id, receptor_id, ...).
+    """
+    receptores = [r for r in familias_de_curso(curso_id) if r != emisor_id]
+    if not receptores:
+        return []
+
+    # Sin microsegundos: DATETIME los descarta y la fecha sirve para releer el lote
+    fecha = datetime.now().replace(microsecond=0)
+    tabla = Mensaje.__table__
+    db.session.execute(tabla.insert().values([
+        {
+            'emisor_id': emisor_id,
+            'receptor_id': receptor_id,
+            'asunto': asunto,
+            'cuerpo': cuerpo,
+            'fecha': fecha,
+            'leido': False
+        } for receptor_id in receptores
+    ]))
+
+    # MySQL no tiene RETURNING: los ids se releen por (emisor, fecha, receptor)
+    # con el índice de emisor; ante un reenvío en el mismo segundo gana el último
+    mensajes = {}
+    for fila in db.session.execute(
+        tabla.select().where(
+            tabla.c.emisor_id == emisor_id,
+            tabla.c.fecha == fecha,
+            tabla.c.receptor_id.in_(receptores)
+        ).order_by(tabla.c.id)
+    ):
+        mensajes[fila.receptor_id] = fila
+    mensajes = list(mensajes.values())
+    registrar_mensajes(mensajes)
+    return mensajes
+
+def mensaje_evento(mensaje):
+    """Datos de un mensaje (modelo o fila) con la forma de Mensaje.to_dict()"""
+    datos = {campo: getattr(mensaje, campo) for campo in Mensaje.CAMPOS_DICT}
+    datos['fecha'] = datos['fecha'].isoformat() if datos['fecha'] else None
+    datos['leido'] = bool(datos['leido'])
+    return datos
+
+def mensajes_nuevos(receptor_id, desde_id, limite=100):
+    """Mensajes recibidos con id > desde_id, en orden (recuperación al reconectar)"""
+    filas = db.session.query(Mensaje).filter(
+        Mensaje.receptor_id == receptor_id,
+        Mensaje.id > desde_id
+    ).order_by(Mensaje.id).limit(limite)
+    return [mensaje_evento(m) for m in filas]
+
+def notificar_no_leidos(usuario_ids):
+    """Publicar el contador de no leídos de varios usuarios (una consulta)"""
+    usuario_ids = set(int(u) for u in usuario_ids)
+    if not usuario_ids or not eventos.activo:
+        return
+    totales = dict.fromkeys(usuario_ids, 0)
+    totales.update(db.session.query(ContadorMensajes.usuario_id, ContadorMensajes.no_leidos).filter(
+        ContadorMensajes.usuario_id.in_(usuario_ids)
+    ))
+    for usuario_id, total in totales.items():
+        eventos.publicar(usuario_id, 'no_leidos', {'total': total})
+
+def notificar_mensajes(mensajes):
+    """Publicar los mensajes recién confirmados a sus receptores.
+
+    Se llama después del commit. Cada receptor recibe un evento 'mensaje'
+    por mensaje (con el id como id de evento) y uno 'no_leidos' al final.
+    """
+    if not mensajes or not eventos.activo:
+        return
+    for mensaje in mensajes:
+        eventos.publicar(mensaje.receptor_id, 'mensaje', mensaje_evento(mensaje), evento_id=mensaje.id)
+    notificar_no_leidos(m.receptor_id for m in mensajes)
@@ -0,0 +1,88 @@
+import os
+import re
+import sys
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import text
+from src.extensions import db
+
+# backend/src/services -> monteverde/database/migraciones
+DIRECTORIO_DEFAULT = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', 'database', 'migraciones'
+)
+_FIN_SENTENCIA = re.compile(r';\s*$', re.MULTILINE)
+
+def _directorio():
+    return current_app.config.get('MIGRACIONES_DIRECTORIO') or DIRECTORIO_DEFAULT
+
+def _sentencias(ruta):
+    """Sentencias de un archivo .sql (sin líneas de comentario, separadas por ';' al final de línea)"""
+    with open(ruta, encoding='utf-8') as archivo:
+        contenido = '\n'.join(l for l in archivo.read().splitlines() if not l.lstrip().startswith('--'))
+    return [s.strip() for s in _FIN_SENTENCIA.split(contenido) if s.strip()]
+
+def migraciones_disponibles():
+    """Versiones (nombre del archivo sin .sql) en orden de aplicación"""
+    directorio = _directorio()
+    if not os.path.isdir(directorio):
+        return []
+    return sorted(nombre[:-4] for nombre in os.listdir(directorio) if nombre.endswith('.sql'))
+
+def migraciones_aplicadas():
+    db.session.execute(text(
+        'CREATE TABLE IF NOT EXISTS schema_migraciones ('
+        'version VARCHAR(100) NOT NULL PRIMARY KEY, '
+        'aplicada DATETIME NOT NULL)'
+    ))
+    db.session.commit()
+    return {version for (version,) in db.session.execute(text('SELECT version FROM schema_migraciones'))}
+
+def migraciones_pendientes():
+    aplicadas = migraciones_aplicadas()
+    return [version for version in migraciones_disponibles() if version not in aplicadas]
+
+def verificar_migraciones(app):
+    """Fallar al arrancar si la base MySQL tiene migraciones sin aplicar.
+
+    Los modelos ya mapean las columnas nuevas, así que con migraciones
+    pendientes las consultas fallarían con 'Unknown column'. No se verifica
+    con otros motores (db.create_all crea el esquema completo), ni al correr
+    el propio comando migrar, ni si la base no responde todavía.
+    """
+    if not app.config.get('MIGRACIONES_VERIFICAR', True) or 'migrar' in sys.argv[1:]:
+        return
+    with app.app_context():
+        if db.engine.dialect.name != 'mysql':
+            return
+        try:
+            pendientes = migraciones_pendientes()
+        except Exception as e:
+            print(f"⚠️ No se pudieron verificar las migraciones: {e}")
+            return
+    if pendientes:
+        raise RuntimeError(
+            f"Migraciones pendientes: {', '.join(pendientes)}. "
+            "Aplicarlas con: flask --app app migrar (desde backend/)"
+        )
+
+def aplicar_migraciones():
+    """Aplicar en orden las migraciones pendientes de database/migraciones.
+
+    Cada archivo se registra en schema_migraciones al terminar. Los ALTER
+    TABLE confirman solos, así que si una sentencia falla las anteriores del
+    mismo archivo quedan aplicadas; por eso las migraciones se escriben
+    idempotentes (ADD/DROP ... IF [NOT] EXISTS de MariaDB) y basta corregir
+    la causa y volver a correr el comando, que repite el archivo completo.
+    Retorna las versiones aplicadas.
+    """
+    aplicadas = []
+    for version in migraciones_pendientes():
+        for sentencia in _sentencias(os.path.join(_directorio(), f'{version}.sql')):
+            db.session.execute(text(sentencia))
+        db.session.execute(
+            text('INSERT INTO schema_migraciones (version, aplicada) VALUES (:version, :aplicada)'),
+            {'version': version, 'aplicada': datetime.now()}
+        )
+        db.session.commit()
+        aplicadas.append(version)
+    return aplicadas
@@ -0,0 +1,261 @@
+import json
+import os
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import create_engine, select
+from src.extensions import db
+from src.models.asistencia import Asistencia
+from src.models.calificacion import Calificacion
+from src.models.observacion import Observacion
+
+ARCHIVO_ESTADO = '_snapshot.json'
+LOTE_DEFAULT = 5000
+SOLAPAMIENTO_DEFAULT = 600
+
+def _por_mes(columna):
+    return lambda fila: getattr(fila, columna).strftime('%Y-%m')
+
+# Columnas exportadas por tabla: (nombre, tipo). 'categoria' se escribe
+# dictionary-encoded. La partición se calcula por fila y va en la ruta
+# (estilo Hive: tabla/clave=valor/), no dentro del archivo. 'actualizado'
+# es la marca de agua: una fila modificada reaparece en una parte nueva y
+# los lectores se quedan con la de mayor 'actualizado' por id.
+TABLAS = {
+    'calificaciones': {
+        'modelo': Calificacion,
+        'columnas': [
+            ('id', 'int64'),
+            ('estudiante_id', 'int64'),
+            ('asignatura', 'categoria'),
+            ('nota', 'float64'),
+            ('fecha_registro', 'timestamp'),
+            ('actualizado', 'timestamp')
+        ],
+        'particion': ('periodo', lambda fila: fila.periodo),
+        'extra': ['periodo']
+    },
+    'asistencia': {
+        'modelo': Asistencia,
+        'columnas': [
+            ('id', 'int64'),
+            ('estudiante_id', 'int64'),
+            ('fecha', 'date'),
+            ('estado', 'categoria'),
+            ('actualizado', 'timestamp')
+        ],
+        'particion': ('mes', _por_mes('fecha')),
+        'extra': []
+    },
+    'observaciones': {
+        'modelo': Observacion,
+        'columnas': [
+            ('id', 'int64'),
+            ('estudiante_id', 'int64'),
+            ('docente_id', 'int64'),
+            ('fecha', 'date'),
+            ('tipo', 'categoria'),
+            ('detalle', 'string'),
+            ('actualizado', 'timestamp')
+        ],
+        'particion': ('mes', _por_mes('fecha')),
+        'extra': []
+    }
+}
+
+def _pyarrow():
+    """Importar pyarrow solo cuando se usa (dependencia opcional)"""
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError('Los snapshots requieren pyarrow (pip install pyarrow)')
+    return pyarrow, pyarrow.parquet
+
+def _tipo_arrow(pa, tipo):
+    return {
+        'int64': pa.int64(),
+        'float64': pa.float64(),
+        'string': pa.string(),
+        'categoria': pa.dictionary(pa.int32(), pa.string()),
+        'timestamp': pa.timestamp('us'),
+        'date': pa.date32()
+    }[tipo]
+
+def _leer_estado(destino):
+    ruta = os.path.join(destino, ARCHIVO_ESTADO)
+    if not os.path.exists(ruta):
+        return {}
+    with open(ruta, encoding='utf-8') as archivo:
+        return json.load(archivo)
+
+def _guardar_estado(destino, estado):
+    """Escritura atómica del estado (tmp + rename)"""
+    ruta = os.path.join(destino, ARCHIVO_ESTADO)
+    with open(ruta + '.tmp', 'w', encoding='utf-8') as archivo:
+        json.dump(estado, archivo, indent=2, sort_keys=True)
+    os.replace(ruta + '.tmp', ruta)
+
+class _EscritorParticiones:
+    """Un ParquetWriter abierto por partición durante la corrida.
+
+    Los archivos se escriben como .tmp y solo se renombran en cerrar(), así
+    una corrida interrumpida no deja partes a medias visibles para lectores.
+    """
+
+    def __init__(self, pa, pq, directorio, schema, particion, sufijo):
+        self.pa, self.pq = pa, pq
+        self.directorio = directorio
+        self.schema = schema
+        self.particion = particion
+        self.sufijo = sufijo
+        self._escritores = {}
+
+    def escribir(self, valor, columnas):
+        if valor not in self._escritores:
+            carpeta = os.path.join(self.directorio, f'{self.particion}={valor}')
+            os.makedirs(carpeta, exist_ok=True)
+            ruta = os.path.join(carpeta, f'parte-{self.sufijo}.parquet')
+            self._escritores[valor] = (self.pq.ParquetWriter(ruta + '.tmp', self.schema, compression='zstd'), ruta)
+        arrays = []
+        for campo, valores in zip(self.schema, columnas):
+            if self.pa.types.is_dictionary(campo.type):
+                arrays.append(self.pa.array(valores, self.pa.string()).dictionary_encode())
+            else:
+                arrays.append(self.pa.array(valores, campo.type))
+        self._escritores[valor][0].write_batch(self.pa.RecordBatch.from_arrays(arrays, schema=self.schema))
+
+    def cerrar(self, confirmar=True):
+        archivos = []
+        for escritor, ruta in self._escritores.values():
+            escritor.close()
+            if confirmar:
+                os.replace(ruta + '.tmp', ruta)
+                archivos.append(ruta)
+            else:
+                os.remove(ruta + '.tmp')
+        return archivos
+
+def _descartar_anteriores(directorio, vigentes):
+    """Borrar las partes de corridas anteriores (modo completo)"""
+    vigentes = set(vigentes)
+    for carpeta, _, archivos in os.walk(directorio, topdown=False):
+        for archivo in archivos:
+            ruta = os.path.join(carpeta, archivo)
+            if archivo.endswith('.parquet') and ruta not in vigentes:
+                os.remove(ruta)
+        if carpeta != directorio and not os.listdir(carpeta):
+            os.rmdir(carpeta)
+
+def _exportar_tabla(conexion, pa, pq, nombre, directorio, desde, vistos, solapamiento, sufijo):
+    """Leer en trozos las filas con actualizado >= desde - solapamiento y escribirlas por partición.
+
+    El solapamiento cubre transacciones que se confirman después de la
+    corrida anterior con un 'actualizado' anterior a su marca; las filas ya
+    exportadas con el mismo (id, actualizado), guardadas en 'vistos', se
+    omiten. Retorna (escritor, filas_exportadas, nuevo_desde, nuevos_vistos);
+    los archivos quedan pendientes hasta escritor.cerrar().
+    """
+    spec = TABLAS[nombre]
+    modelo = spec['modelo']
+    schema = pa.schema([(columna, _tipo_arrow(pa, tipo)) for columna, tipo in spec['columnas']])
+    clave, particion_de = spec['particion']
+    escritor = _EscritorParticiones(pa, pq, directorio, schema, clave, sufijo)
+
+    nombres = [columna for columna, _ in spec['columnas']] + spec['extra']
+    stmt = select(*[getattr(modelo, columna) for columna in nombres]).order_by(modelo.actualizado, modelo.id)
+    if desde is not None:
+        stmt = stmt.where(modelo.actualizado >= desde - timedelta(seconds=solapamiento))
+
+    total = 0
+    leidas = {}
+    try:
+        for filas in conexion.execute(stmt).partitions():
+            # Agrupar el trozo por partición y escribir un batch por grupo
+            grupos = {}
+            for fila in filas:
+                marca = fila.actualizado.isoformat()
+                leidas[str(fila.id)] = marca
+                if vistos.get(str(fila.id)) == marca:
+                    continue
+                grupos.setdefault(particion_de(fila), []).append(fila)
+                total += 1
+            for valor, grupo in grupos.items():
+                escritor.escribir(valor, [[getattr(fila, columna) for fila in grupo] for columna, _ in spec['columnas']])
+            desde = filas[-1].actualizado
+    except Exception:
+        escritor.cerrar(confirmar=False)
+        raise
+
+    # Todo lo que la próxima corrida vuelva a leer se leyó en esta
+    corte = (desde - timedelta(seconds=solapamiento)).isoformat() if desde is not None else ''
+    return escritor, total, desde, {id_: marca for id_, marca in leidas.items() if marca >= corte}
+
+def exportar_snapshots(destino, tablas=None, completo=False, lote=None):
+    """Escribir snapshots Parquet incrementales de las tablas analíticas.
+
+    Todas las tablas se leen en una sola transacción REPEATABLE READ, así que
+    reflejan el mismo instante. Cada corrida agrega como archivos nuevos por
+    partición las filas insertadas o modificadas desde la marca de agua
+    ('actualizado', guardada en _snapshot.json) menos SNAPSHOT_SOLAPAMIENTO
+    segundos, sin repetir las que ya se exportaron sin cambios. Los borrados
+    no se propagan: completo=True reescribe la tabla desde cero y borra las
+    partes anteriores al terminar (también se hace solo si el estado es de
+    una versión anterior). Si ANALITICA_DATABASE_URI está configurada (p.ej.
+    una réplica), se lee de ahí y no de la base principal.
+
+    Retorna {tabla: filas_exportadas}.
+    """
+    pa, pq = _pyarrow()
+    tablas = tablas or list(TABLAS)
+    lote = lote or current_app.config.get('SNAPSHOT_LOTE', LOTE_DEFAULT)
+    solapamiento = current_app.config.get('SNAPSHOT_SOLAPAMIENTO', SOLAPAMIENTO_DEFAULT)
+    uri = current_app.config.get('ANALITICA_DATABASE_URI')
+    engine = create_engine(uri) if uri else db.engine
+
+    os.makedirs(destino, exist_ok=True)
+    estado = _leer_estado(destino)
+    sufijo = datetime.now().strftime('%Y%m%dT%H%M%S%f')
+    resultado = {}
+    escritores = {}
+    completas = set()
+
+    opciones = {'yield_per': lote}
+    if engine.dialect.name == 'mysql':
+        opciones['isolation_level'] = 'REPEATABLE READ'
+    try:
+        with engine.connect() as conexion:
+            conexion.execution_options(**opciones)
+            with conexion.begin():
+                for nombre in tablas:
+                    anterior = estado.get(nombre, {})
+                    # Estados con 'ultimo_id' (marca por id) se reemplazan con un snapshot completo
+                    if completo or 'desde' not in anterior:
+                        completas.add(nombre)
+                        desde, vistos = None, {}
+                    else:
+                        desde = datetime.fromisoformat(anterior['desde']) if anterior['desde'] else None
+                        vistos = anterior.get('vistos', {})
+                    escritor, total, desde, vistos = _exportar_tabla(
+                        conexion, pa, pq, nombre, os.path.join(destino, nombre), desde, vistos, solapamiento, sufijo
+                    )
+                    escritores[nombre] = escritor
+                    resultado[nombre] = total
+                    estado[nombre] = {
+                        'desde': desde.isoformat() if desde is not None else None,
+                        'vistos': vistos,
+                        'actualizado': datetime.now().isoformat()
+                    }
+    except Exception:
+        for escritor in escritores.values():
+            escritor.cerrar(confirmar=False)
+        raise
+    finally:
+        if uri:
+            engine.dispose()
+
+    for nombre, escritor in escritores.items():
+        archivos = escritor.cerrar()
+        if nombre in completas:
+            _descartar_anteriores(escritor.directorio, archivos)
+    _guardar_estado(destino, estado)
+    return resultado
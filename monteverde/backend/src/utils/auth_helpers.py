@@ -1,37 +1,52 @@
 from functools import wraps
-from flask import jsonify, request
+from flask import jsonify, request, g
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
 from src.models.usuario import Usuario
 
 def role_required(*allowed_roles):
-    """Decorador para proteger rutas por roles"""
+    """Decorador para proteger rutas por roles (usa el claim 'rol' del token)"""
     def decorator(f):
         @wraps(f)
         @jwt_required()
         def decorated_function(*args, **kwargs):
-            current_user_id = get_jwt_identity()
-            
-            # Obtener usuario actual
-            user = Usuario.query.get(current_user_id)
-            if not user:
+            rol = get_current_rol()
+            if not rol:
                 return jsonify({'message': 'Usuario no encontrado'}), 404
-            
+
             # Verificar rol
-            if user.rol not in allowed_roles:
+            if rol not in allowed_roles:
                 return jsonify({
                     'message': 'Acceso denegado',
                     'required_roles': list(allowed_roles),
-                    'user_role': user.rol
+                    'user_role': rol
                 }), 403
-            
+
             return f(*args, **kwargs)
         return decorated_function
     return decorator
 
-def get_current_user():
-    """Obtener usuario actual desde JWT"""
+def get_current_user_id():
+    """Obtener id del usuario actual desde JWT (sin consultar la BD)"""
+    identity = get_jwt_identity()
     try:
-        current_user_id = get_jwt_identity()
-        return Usuario.query.get(current_user_id)
-    except:
-        return None
+        return int(identity)
+    except (TypeError, ValueError):
+        return identity
+
+def get_current_rol():
+    """Obtener rol del usuario actual desde el claim 'rol' del JWT"""
+    rol = get_jwt().get('rol')
+    if rol is None:
+        # Tokens sin claim 'rol': recurrir al usuario de la BD
+        user = get_current_user()
+        rol = user.rol if user else None
+    return rol
+
+def get_current_user():
+    """Obtener usuario actual desde JWT (se carga una sola vez por request)"""
+    if '_current_user' not in g:
+        try:
+            g._current_user = Usuario.query.get(get_current_user_id())
+        except:
+            return None
+    return g._current_user
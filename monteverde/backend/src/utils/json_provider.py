@@ -0,0 +1,76 @@
+import math
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # Dependencia opcional
+    orjson = None
+
+def _floats_compatibles(obj):
+    """False si hay un float que orjson escribe distinto que json.dumps.
+
+    orjson no usa exponente entre 1e-7 y 1e-4, escribe 1e16 / 1e-7 donde el
+    estándar escribe 1e+16 / 1e-07, y NaN/Infinity como null. Entre 1e-4 y
+    1e16 (y el cero) ambos dan la representación más corta, idéntica.
+    """
+    if isinstance(obj, float):
+        return obj == 0 or (math.isfinite(obj) and 1e-4 <= abs(obj) < 1e16)
+    if isinstance(obj, dict):
+        return all(_floats_compatibles(v) for v in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return all(_floats_compatibles(v) for v in obj)
+    # Dataclasses pasan por default() y podrían traer floats adentro
+    return not hasattr(obj, '__dataclass_fields__')
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Proveedor JSON de Flask respaldado por orjson.
+
+    Produce los mismos bytes que DefaultJSONProvider en modo compacto: llaves
+    ordenadas, salida ASCII con escapes \\uXXXX y fechas/Decimal/UUID por el
+    mismo default() de Flask. Delega en la implementación estándar en modo
+    debug (salida indentada), si orjson no puede serializar el objeto (p.ej.
+    enteros de más de 64 bits o llaves que no son texto) y en los casos raros en que el escape rápido
+    no es exacto: textos con barra invertida, DEL o caracteres fuera del BMP,
+    y floats que orjson formatea distinto (exponentes, NaN/Infinity).
+    """
+
+    def __init__(self, app):
+        super().__init__(app)
+        # Sin OPT_NON_STR_KEYS: orjson ordena llaves int numéricamente y el estándar
+        # como texto ({"10":..,"9":..} vs {"9":..,"10":..}); esas respuestas caen al estándar
+        self._options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+        if self.sort_keys:
+            self._options |= orjson.OPT_SORT_KEYS
+
+    def response(self, *args, **kwargs):
+        if (self.compact is None and self._app.debug) or self.compact is False or not self.ensure_ascii:
+            return super().response(*args, **kwargs)
+
+        obj = self._prepare_response_obj(args, kwargs)
+        if not _floats_compatibles(obj):
+            return super().response(*args, **kwargs)
+        try:
+            body = orjson.dumps(obj, default=self.default, option=self._options)
+        except orjson.JSONEncodeError:
+            return super().response(*args, **kwargs)
+
+        if not body.isascii():
+            # backslashreplace escapa solo lo no-ASCII: \xe9 -> \u00e9, \u2019 queda igual
+            if b'\\\\' in body:
+                return super().response(*args, **kwargs)
+            body = body.decode('utf-8').encode('ascii', 'backslashreplace')
+            if b'\\U' in body:
+                return super().response(*args, **kwargs)
+            body = body.replace(b'\\x', b'\\u00')
+        if b'\x7f' in body:
+            return super().response(*args, **kwargs)
+        return self._app.response_class(body + b'\n', mimetype=self.mimetype)
+
+def init_json_provider(app):
+    """Usar OrjsonProvider si JSON_ORJSON está activo y orjson está instalado"""
+    if not app.config.get('JSON_ORJSON', False):
+        return
+    if orjson is None:
+        print("⚠️ JSON_ORJSON activo pero orjson no está instalado; se usa el JSON estándar")
+        return
+    app.json = OrjsonProvider(app)
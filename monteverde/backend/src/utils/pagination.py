@@ -0,0 +1,89 @@
+import base64
+import json
+from datetime import date, datetime
+from flask import request
+from sqlalchemy import and_, or_
+from sqlalchemy.engine import Row
+
+def encode_cursor(values):
+    """Codificar los valores de la llave de orden en un token opaco"""
+    raw = json.dumps([v.isoformat() if isinstance(v, (date, datetime)) else v for v in values])
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(token, sort_keys):
+    """Decodificar un cursor; lanza ValueError si no es válido"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except Exception:
+        raise ValueError('Cursor inválido')
+
+    if not isinstance(values, list) or len(values) != len(sort_keys):
+        raise ValueError('Cursor inválido')
+
+    decoded = []
+    for (column, _), value in zip(sort_keys, values):
+        python_type = column.type.python_type
+        if value is not None and python_type in (date, datetime):
+            value = python_type.fromisoformat(value)
+        decoded.append(value)
+    return decoded
+
+def _key_value(item, column):
+    """Leer el valor de una columna de orden desde un modelo o una fila"""
+    if isinstance(item, Row):
+        try:
+            return item._mapping[column]
+        except KeyError:
+            item = item[0]
+    return getattr(item, column.key)
+
+def _after(sort_keys, values):
+    """Predicado keyset: filas estrictamente posteriores a 'values'"""
+    conditions = []
+    for i, (column, direction) in enumerate(sort_keys):
+        equal = [c == v for (c, _), v in zip(sort_keys[:i], values[:i])]
+        step = column < values[i] if direction == 'desc' else column > values[i]
+        conditions.append(and_(*equal, step))
+    return or_(*conditions)
+
+def keyset_paginate(query, sort_keys, cursor=None, per_page=20, include_total=False):
+    """Paginar por cursor (keyset) en lugar de OFFSET.
+
+    sort_keys es una lista de (columna, 'asc'|'desc') que debe terminar en
+    una columna única (normalmente el id), p.ej. [(Mensaje.fecha, 'desc'),
+    (Mensaje.id, 'desc')]. El COUNT(*) solo se ejecuta si include_total.
+
+    Retorna (items, pagination).
+    """
+    base_query = query
+    if cursor:
+        query = query.filter(_after(sort_keys, decode_cursor(cursor, sort_keys)))
+
+    order = [column.desc() if direction == 'desc' else column.asc() for column, direction in sort_keys]
+    items = query.order_by(*order).limit(per_page + 1).all()
+
+    has_next = len(items) > per_page
+    items = items[:per_page]
+
+    pagination = {
+        'per_page': per_page,
+        'has_next': has_next,
+        'next_cursor': encode_cursor([_key_value(items[-1], c) for c, _ in sort_keys]) if has_next else None
+    }
+    if include_total:
+        pagination['total'] = base_query.order_by(None).count()
+
+    return items, pagination
+
+def paginate_from_request(query, sort_keys, default_per_page=20, max_per_page=100):
+    """keyset_paginate() con los parámetros cursor, per_page e include_total del request"""
+    per_page = min(request.args.get('per_page', default_per_page, type=int), max_per_page)
+    include_total = request.args.get('include_total', 'false').lower() in ('1', 'true', 'yes')
+    return keyset_paginate(
+        query,
+        sort_keys,
+        cursor=request.args.get('cursor'),
+        per_page=max(per_page, 1),
+        include_total=include_total
+    )
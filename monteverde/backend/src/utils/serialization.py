@@ -0,0 +1,47 @@
+from datetime import date, datetime
+
+def _is_temporal(expression):
+    """True si la expresión es de tipo Date/DateTime (se serializa con isoformat)"""
+    try:
+        return issubclass(expression.type.python_type, (date, datetime))
+    except (AttributeError, NotImplementedError):
+        return False
+
+class RowEncoder:
+    """Serializador de filas de consultas por columnas, sin hidratar modelos.
+
+    fields es una lista de (clave, expresión SQL). Las claves, y qué
+    posiciones son fechas, se resuelven una sola vez al construirlo; por fila
+    solo queda un zip() y el isoformat() de las fechas, igual que to_dict().
+
+        encoder = RowEncoder([('id', Calificacion.id), ('estudiante_nombre', Estudiante.nombre)])
+        data = encoder.all(db.session.query(*encoder.columns).join(...))
+    """
+
+    def __init__(self, fields):
+        self.keys = tuple(key for key, _ in fields)
+        self.columns = tuple(expression for _, expression in fields)
+        self._temporal = tuple(key for key, expression in fields if _is_temporal(expression))
+
+    def __call__(self, row):
+        data = dict(zip(self.keys, row))
+        for key in self._temporal:
+            value = data[key]
+            data[key] = value.isoformat() if value else None
+        return data
+
+    def all(self, query):
+        """Ejecutar la consulta y serializar todas sus filas"""
+        return [self(row) for row in query]
+
+    def query(self, session):
+        """Consulta base que selecciona exactamente las columnas del encoder"""
+        return session.query(*self.columns)
+
+def model_encoder(model, *extra):
+    """RowEncoder con los campos de model.to_dict() (model.CAMPOS_DICT) más extra.
+
+    extra son pares (clave, expresión) adicionales, p.ej. columnas de un join.
+    """
+    fields = [(name, getattr(model, name)) for name in model.CAMPOS_DICT]
+    return RowEncoder(fields + list(extra))
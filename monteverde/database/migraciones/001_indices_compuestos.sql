@@ -0,0 +1,29 @@
+-- 001: índices compuestos para los predicados más usados
+-- Aplicar con: flask --app app migrar (desde backend/)
+-- Cada migración usa IF [NOT] EXISTS (MariaDB) para poder reintentarse entera
+
+-- Mensajes no leídos de un usuario (dashboard, marcar leídos) ordenables por fecha
+-- y conversación entre dos usuarios; los compuestos reemplazan a los simples de
+-- receptor y emisor (sus prefijos) también para las claves foráneas
+ALTER TABLE `mensajes`
+  ADD KEY IF NOT EXISTS `receptor_leido_fecha` (`receptor_id`,`leido`,`fecha`),
+  ADD KEY IF NOT EXISTS `emisor_receptor_fecha` (`emisor_id`,`receptor_id`,`fecha`),
+  DROP KEY IF EXISTS `emisor_id`,
+  DROP KEY IF EXISTS `receptor_id`;
+
+-- Observaciones de un estudiante por rango de fechas / ordenadas por fecha
+ALTER TABLE `observaciones`
+  ADD KEY IF NOT EXISTS `estudiante_fecha` (`estudiante_id`,`fecha`),
+  DROP KEY IF EXISTS `estudiante_id`;
+
+-- Asistencia de un día (el UNIQUE existente empieza por estudiante_id)
+ALTER TABLE `asistencia`
+  ADD KEY IF NOT EXISTS `fecha_estudiante` (`fecha`,`estudiante_id`);
+
+-- Búsqueda de calificaciones por asignatura y periodo; cubre el join a estudiantes
+ALTER TABLE `calificaciones`
+  ADD KEY IF NOT EXISTS `asignatura_periodo` (`asignatura`,`periodo`,`estudiante_id`);
+
+-- Listados de familias / docentes ordenados por nombre
+ALTER TABLE `usuarios`
+  ADD KEY IF NOT EXISTS `rol_nombre` (`rol`,`nombre`);
@@ -0,0 +1,16 @@
+-- 002: columna `actualizado` como marca de agua de los snapshots analíticos
+-- Aplicar con: flask --app app migrar (desde backend/)
+-- Las filas existentes quedan con la hora de la migración: el primer snapshot
+-- incremental posterior las vuelve a exportar (los lectores deduplican por id)
+
+ALTER TABLE `asistencia`
+  ADD COLUMN IF NOT EXISTS `actualizado` timestamp NOT NULL DEFAULT current_timestamp() ON UPDATE current_timestamp(),
+  ADD KEY IF NOT EXISTS `asistencia_actualizado` (`actualizado`);
+
+ALTER TABLE `calificaciones`
+  ADD COLUMN IF NOT EXISTS `actualizado` timestamp NOT NULL DEFAULT current_timestamp() ON UPDATE current_timestamp(),
+  ADD KEY IF NOT EXISTS `calificaciones_actualizado` (`actualizado`);
+
+ALTER TABLE `observaciones`
+  ADD COLUMN IF NOT EXISTS `actualizado` timestamp NOT NULL DEFAULT current_timestamp() ON UPDATE current_timestamp(),
+  ADD KEY IF NOT EXISTS `observaciones_actualizado` (`actualizado`);
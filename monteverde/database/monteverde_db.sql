@@ -31,7 +31,8 @@ CREATE TABLE `asistencia` (
   `id` int(11) NOT NULL,
   `estudiante_id` int(11) NOT NULL,
   `fecha` date NOT NULL,
-  `estado` enum('PRESENTE','AUSENTE','TARDE','JUSTIFICADO') NOT NULL
+  `estado` enum('PRESENTE','AUSENTE','TARDE','JUSTIFICADO') NOT NULL,
+  `actualizado` timestamp NOT NULL DEFAULT current_timestamp() ON UPDATE current_timestamp()
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
 
 --
@@ -62,6 +63,22 @@ INSERT INTO `asistencia` (`id`, `estudiante_id`, `fecha`, `estado`) VALUES
 
 -- --------------------------------------------------------
 
+--
+-- Estructura de tabla para la tabla `asistencia_diaria`
+--
+
+CREATE TABLE `asistencia_diaria` (
+  `id` int(11) NOT NULL,
+  `curso_id` int(11) NOT NULL,
+  `fecha` date NOT NULL,
+  `presentes` int(11) NOT NULL DEFAULT 0,
+  `ausentes` int(11) NOT NULL DEFAULT 0,
+  `tardes` int(11) NOT NULL DEFAULT 0,
+  `justificados` int(11) NOT NULL DEFAULT 0
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+-- --------------------------------------------------------
+
 --
 -- Estructura de tabla para la tabla `calificaciones`
 --
@@ -72,7 +89,8 @@ CREATE TABLE `calificaciones` (
   `asignatura` varchar(50) NOT NULL,
   `periodo` varchar(20) NOT NULL,
   `nota` decimal(3,2) NOT NULL CHECK (`nota` >= 0.00 and `nota` <= 5.00),
-  `fecha_registro` timestamp NOT NULL DEFAULT current_timestamp()
+  `fecha_registro` timestamp NOT NULL DEFAULT current_timestamp(),
+  `actualizado` timestamp NOT NULL DEFAULT current_timestamp() ON UPDATE current_timestamp()
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
 
 --
@@ -104,6 +122,33 @@ INSERT INTO `calificaciones` (`id`, `estudiante_id`, `asignatura`, `periodo`, `n
 
 -- --------------------------------------------------------
 
+--
+-- Estructura de tabla para la tabla `contadores_mensajes`
+--
+
+CREATE TABLE `contadores_mensajes` (
+  `usuario_id` int(11) NOT NULL,
+  `no_leidos` int(11) NOT NULL DEFAULT 0
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+-- --------------------------------------------------------
+
+--
+-- Estructura de tabla para la tabla `conversaciones`
+--
+
+CREATE TABLE `conversaciones` (
+  `id` int(11) NOT NULL,
+  `usuario_a_id` int(11) NOT NULL,
+  `usuario_b_id` int(11) NOT NULL,
+  `ultimo_mensaje_id` int(11) NOT NULL,
+  `ultima_fecha` datetime NOT NULL,
+  `no_leidos_a` int(11) NOT NULL DEFAULT 0,
+  `no_leidos_b` int(11) NOT NULL DEFAULT 0
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+-- --------------------------------------------------------
+
 --
 -- Estructura de tabla para la tabla `cursos`
 --
@@ -191,7 +236,8 @@ CREATE TABLE `observaciones` (
   `docente_id` int(11) NOT NULL,
   `fecha` date NOT NULL DEFAULT curdate(),
   `tipo` varchar(20) NOT NULL,
-  `detalle` text NOT NULL
+  `detalle` text NOT NULL,
+  `actualizado` timestamp NOT NULL DEFAULT current_timestamp() ON UPDATE current_timestamp()
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
 
 --
@@ -207,6 +253,25 @@ INSERT INTO `observaciones` (`id`, `estudiante_id`, `docente_id`, `fecha`, `tipo
 
 -- --------------------------------------------------------
 
+--
+-- Estructura de tabla para la tabla `schema_migraciones`
+--
+
+CREATE TABLE `schema_migraciones` (
+  `version` varchar(100) NOT NULL,
+  `aplicada` datetime NOT NULL DEFAULT current_timestamp()
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+--
+-- Volcado de datos para la tabla `schema_migraciones`
+--
+
+INSERT INTO `schema_migraciones` (`version`, `aplicada`) VALUES
+('001_indices_compuestos', '2026-10-18 00:00:00'),
+('002_actualizado_snapshots', '2026-10-18 00:00:00');
+
+-- --------------------------------------------------------
+
 --
 -- Estructura de tabla para la tabla `usuarios`
 --
@@ -238,14 +303,41 @@ INSERT INTO `usuarios` (`id`, `rol`, `nombre`, `email`, `password`, `estudiante_
 --
 ALTER TABLE `asistencia`
   ADD PRIMARY KEY (`id`),
-  ADD UNIQUE KEY `estudiante_id` (`estudiante_id`,`fecha`);
+  ADD UNIQUE KEY `estudiante_id` (`estudiante_id`,`fecha`),
+  ADD KEY `fecha_estudiante` (`fecha`,`estudiante_id`),
+  ADD KEY `asistencia_actualizado` (`actualizado`);
+
+--
+-- Indices de la tabla `asistencia_diaria`
+--
+ALTER TABLE `asistencia_diaria`
+  ADD PRIMARY KEY (`id`),
+  ADD UNIQUE KEY `curso_fecha` (`curso_id`,`fecha`);
 
 --
 -- Indices de la tabla `calificaciones`
 --
 ALTER TABLE `calificaciones`
   ADD PRIMARY KEY (`id`),
-  ADD UNIQUE KEY `estudiante_id` (`estudiante_id`,`asignatura`,`periodo`);
+  ADD UNIQUE KEY `estudiante_id` (`estudiante_id`,`asignatura`,`periodo`),
+  ADD KEY `asignatura_periodo` (`asignatura`,`periodo`,`estudiante_id`),
+  ADD KEY `calificaciones_actualizado` (`actualizado`);
+
+--
+-- Indices de la tabla `contadores_mensajes`
+--
+ALTER TABLE `contadores_mensajes`
+  ADD PRIMARY KEY (`usuario_id`);
+
+--
+-- Indices de la tabla `conversaciones`
+--
+ALTER TABLE `conversaciones`
+  ADD PRIMARY KEY (`id`),
+  ADD UNIQUE KEY `par_usuarios` (`usuario_a_id`,`usuario_b_id`),
+  ADD KEY `bandeja_a` (`usuario_a_id`,`ultima_fecha`),
+  ADD KEY `bandeja_b` (`usuario_b_id`,`ultima_fecha`),
+  ADD KEY `ultimo_mensaje_id` (`ultimo_mensaje_id`);
 
 --
 -- Indices de la tabla `cursos`
@@ -265,16 +357,23 @@ ALTER TABLE `estudiantes`
 --
 ALTER TABLE `mensajes`
   ADD PRIMARY KEY (`id`),
-  ADD KEY `emisor_id` (`emisor_id`),
-  ADD KEY `receptor_id` (`receptor_id`);
+  ADD KEY `receptor_leido_fecha` (`receptor_id`,`leido`,`fecha`),
+  ADD KEY `emisor_receptor_fecha` (`emisor_id`,`receptor_id`,`fecha`);
 
 --
 -- Indices de la tabla `observaciones`
 --
 ALTER TABLE `observaciones`
   ADD PRIMARY KEY (`id`),
-  ADD KEY `estudiante_id` (`estudiante_id`),
-  ADD KEY `docente_id` (`docente_id`);
+  ADD KEY `estudiante_fecha` (`estudiante_id`,`fecha`),
+  ADD KEY `docente_id` (`docente_id`),
+  ADD KEY `observaciones_actualizado` (`actualizado`);
+
+--
+-- Indices de la tabla `schema_migraciones`
+--
+ALTER TABLE `schema_migraciones`
+  ADD PRIMARY KEY (`version`);
 
 --
 -- Indices de la tabla `usuarios`
@@ -282,7 +381,8 @@ ALTER TABLE `observaciones`
 ALTER TABLE `usuarios`
   ADD PRIMARY KEY (`id`),
   ADD UNIQUE KEY `email` (`email`),
-  ADD KEY `estudiante_id` (`estudiante_id`);
+  ADD KEY `estudiante_id` (`estudiante_id`),
+  ADD KEY `rol_nombre` (`rol`,`nombre`);
 
 --
 -- AUTO_INCREMENT de las tablas volcadas
@@ -294,12 +394,24 @@ ALTER TABLE `usuarios`
 ALTER TABLE `asistencia`
   MODIFY `id` int(11) NOT NULL AUTO_INCREMENT, AUTO_INCREMENT=21;
 
+--
+-- AUTO_INCREMENT de la tabla `asistencia_diaria`
+--
+ALTER TABLE `asistencia_diaria`
+  MODIFY `id` int(11) NOT NULL AUTO_INCREMENT;
+
 --
 -- AUTO_INCREMENT de la tabla `calificaciones`
 --
 ALTER TABLE `calificaciones`
   MODIFY `id` int(11) NOT NULL AUTO_INCREMENT, AUTO_INCREMENT=31;
 
+--
+-- AUTO_INCREMENT de la tabla `conversaciones`
+--
+ALTER TABLE `conversaciones`
+  MODIFY `id` int(11) NOT NULL AUTO_INCREMENT;
+
 --
 -- AUTO_INCREMENT de la tabla `cursos`
 --
@@ -340,12 +452,32 @@ ALTER TABLE `usuarios`
 ALTER TABLE `asistencia`
   ADD CONSTRAINT `asistencia_ibfk_1` FOREIGN KEY (`estudiante_id`) REFERENCES `estudiantes` (`id`) ON DELETE CASCADE;
 
+--
+-- Filtros para la tabla `asistencia_diaria`
+--
+ALTER TABLE `asistencia_diaria`
+  ADD CONSTRAINT `asistencia_diaria_ibfk_1` FOREIGN KEY (`curso_id`) REFERENCES `cursos` (`id`) ON DELETE CASCADE;
+
 --
 -- Filtros para la tabla `calificaciones`
 --
 ALTER TABLE `calificaciones`
   ADD CONSTRAINT `calificaciones_ibfk_1` FOREIGN KEY (`estudiante_id`) REFERENCES `estudiantes` (`id`) ON DELETE CASCADE;
 
+--
+-- Filtros para la tabla `contadores_mensajes`
+--
+ALTER TABLE `contadores_mensajes`
+  ADD CONSTRAINT `contadores_mensajes_ibfk_1` FOREIGN KEY (`usuario_id`) REFERENCES `usuarios` (`id`) ON DELETE CASCADE;
+
+--
+-- Filtros para la tabla `conversaciones`
+--
+ALTER TABLE `conversaciones`
+  ADD CONSTRAINT `conversaciones_ibfk_1` FOREIGN KEY (`usuario_a_id`) REFERENCES `usuarios` (`id`) ON DELETE CASCADE,
+  ADD CONSTRAINT `conversaciones_ibfk_2` FOREIGN KEY (`usuario_b_id`) REFERENCES `usuarios` (`id`) ON DELETE CASCADE,
+  ADD CONSTRAINT `conversaciones_ibfk_3` FOREIGN KEY (`ultimo_mensaje_id`) REFERENCES `mensajes` (`id`) ON DELETE CASCADE;
+
 --
 -- Filtros para la tabla `estudiantes`
 --